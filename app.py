@@ -1,11 +1,22 @@
 import streamlit as st
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
-from matplotlib.patches import FancyArrowPatch, Rectangle, Circle, Arrow
 from constants import *
 from physics import *
 from visualization import *
+from control_vectors import control_vectors
+from simulation import SIM_DT, FixedStepClock, power_to_thrust
+from integrators import INTEGRATORS, get_integrator
+from response_table import load_response_table, table_path
+from thrust_allocation import allocate, capability_envelope
+from renderer import CenterPanelRenderer
+from track import TrackHistory
+from profiling import StageProfiler
+from timeline import Timeline
+from lookahead import LookAhead
+from scene import CONTACT, SCENARIOS, Scene
+from manoeuvres import fast_side_step_settings, slow_side_step_settings, turn_on_the_spot_settings
+import os
 import time
 
 st.set_page_config(page_title="ASD Centurion sim", layout="wide")
@@ -29,10 +40,37 @@ st.markdown("""
 if "physics" not in st.session_state:
     st.session_state.physics = PhysicsEngine()
     st.session_state.last_time = time.time()
-    st.session_state.history_x = []
-    st.session_state.history_y = []
+    st.session_state.sim_clock = FixedStepClock(SIM_DT)
+    st.session_state.timeline = Timeline(st.session_state.physics, SIM_DT)
+    st.session_state.track = TrackHistory()
     st.session_state.update({"p1": 50, "a1": 0, "p2": 50, "a2": 0})
 
+if "scene" not in st.session_state:
+    # Scena di porto: il rimorchiatore dell'app piu' gli ostacoli dello scenario
+    st.session_state.scene = Scene()
+    st.session_state.scene.add_engine("Rimorchiatore", st.session_state.physics)
+
+if "sim_client" not in st.session_state:
+    # Server di simulazione condiviso (sim_server.py), se indicato in SIM_SERVER:
+    # la fisica della predizione gira li', la sessione manda comandi e legge stati
+    st.session_state.sim_client = None
+    st.session_state.sim_client_error = None
+    if os.environ.get("SIM_SERVER"):
+        from sim_server import SimClient
+        try:
+            st.session_state.sim_client = SimClient.connect(os.environ["SIM_SERVER"])
+        except (OSError, ValueError) as e:
+            st.session_state.sim_client_error = str(e)
+sim_client = st.session_state.sim_client
+
+if "lookahead" not in st.session_state:
+    st.session_state.lookahead = LookAhead()
+
+if "profiler" not in st.session_state:
+    st.session_state.profiler = StageProfiler()
+profiler = st.session_state.profiler
+rerun_t0 = time.perf_counter()
+
 if "zoom_level" not in st.session_state:
     st.session_state.zoom_level = 80.0
 
@@ -41,6 +79,17 @@ if "pp_manual_x" not in st.session_state:
 if "pp_manual_y" not in st.session_state:
     st.session_state.pp_manual_y = DEFAULT_PP_Y
 
+@st.cache_resource(show_spinner="Caricamento tabella di regime...")
+def _cached_response_table(vessel, mtime):
+    # mtime nella chiave: una tabella ricalcolata fuori dall'app si ricarica
+    return load_response_table(vessel=vessel, build_if_missing=False)
+
+def get_response_table(vessel):
+    # La tabella si calcola offline (python response_table.py --build), mai
+    # dentro un rerun: se manca i valori a regime non sono disponibili
+    path = table_path(vessel)
+    return _cached_response_table(vessel, os.path.getmtime(path) if os.path.exists(path) else None)
+
 def set_engine_state(p1, a1, p2, a2):
     st.session_state.p1, st.session_state.a1 = p1, a1
     st.session_state.p2, st.session_state.a2 = p2, a2
@@ -48,13 +97,15 @@ def set_engine_state(p1, a1, p2, a2):
 def reset_engines(): 
     set_engine_state(50, 0, 50, 0)
     st.session_state.physics.reset()
-    st.session_state.history_x = []
-    st.session_state.history_y = []
+    st.session_state.sim_clock.reset()
+    st.session_state.timeline.reset()
+    st.session_state.track.clear()
 
 def full_reset_sim():
     st.session_state.physics.reset()
-    st.session_state.history_x = []
-    st.session_state.history_y = []
+    st.session_state.sim_clock.reset()
+    st.session_state.timeline.reset()
+    st.session_state.track.clear()
     st.session_state.zoom_level = 80.0
     reset_pivot_point()
 
@@ -68,91 +119,180 @@ def update_zoom(delta):
     if new_zoom > 300: new_zoom = 300
     st.session_state.zoom_level = new_zoom
 
-# --- SOLVER FAST SIDE STEP ---
+# --- AVANTI VELOCE / RIAVVOLGIMENTO ---
+def _sync_clock_to_timeline():
+    clock = st.session_state.sim_clock
+    clock.sim_time = st.session_state.timeline.time
+    clock.accumulator = 0.0
+    st.session_state.last_time = time.time()
+
+def _active_recorder():
+    return st.session_state.get("recorder") if st.session_state.get("recording_on") else None
+
+def _record_controls(recorder):
+    recorder.set_controls(st.session_state.p1, st.session_state.a1, st.session_state.p2, st.session_state.a2,
+                          st.session_state.pp_manual_x, st.session_state.pp_manual_y)
+
+def _seek_sim(t):
+    # Linea temporale, traccia e registrazione all'istante t (all'indietro)
+    timeline = st.session_state.timeline
+    step = timeline.step
+    timeline.seek(t)
+    st.session_state.track.drop_last(step - timeline.step)
+    recorder = _active_recorder()
+    if recorder is not None and recorder.truncate(timeline.time) == 0:
+        # Riavvolto prima dell'inizio della registrazione: riparte da qui
+        _record_controls(recorder)
+        recorder.extend(st.session_state.physics.state[None])
+    _sync_clock_to_timeline()
+
+def _settle_animation():
+    # Tratto animato ancora in riproduzione nel browser: la simulazione
+    # torna al punto mostrato, non alla fine del tratto gia' calcolato
+    chunk = st.session_state.pop("anim_chunk", None)
+    if chunk is not None:
+        played = time.time() - chunk["shown_at"]
+        if played < chunk["seconds"]:
+            _seek_sim(chunk["t0"] + played)
+
+def fast_forward_sim():
+    _settle_animation()
+    traj = st.session_state.timeline.fast_forward(st.session_state.seek_seconds,
+                                                  power_to_thrust(st.session_state.p1, st.session_state.physics.vessel), st.session_state.a1,
+                                                  power_to_thrust(st.session_state.p2, st.session_state.physics.vessel), st.session_state.a2,
+                                                  st.session_state.pp_manual_x, st.session_state.pp_manual_y)
+    st.session_state.track.extend(traj.states[1:])
+    recorder = _active_recorder()
+    if recorder is not None:
+        _record_controls(recorder)
+        recorder.extend(traj.states[1:])
+    _sync_clock_to_timeline()
+
+def rewind_sim():
+    _settle_animation()
+    _seek_sim(st.session_state.timeline.time - st.session_state.seek_seconds)
+
+@st.fragment(run_every=0.5)
+def next_chunk_timer():
+    # Vista animata: quando il tratto e' finito nel browser, rerun completo
+    # per calcolare e mostrare il successivo
+    chunk = st.session_state.get("anim_chunk")
+    if chunk is not None and time.time() >= chunk["shown_at"] + chunk["seconds"]:
+        st.rerun()
+
+# --- VENTO E CORRENTE ---
+def set_environment(current_kn, current_dir, current_file, wind_kn, wind_dir):
+    # Ricostruisce l'ambiente del motore solo quando cambiano i parametri
+    key = (current_kn, current_dir, current_file, wind_kn, wind_dir)
+    if st.session_state.get("environment_key") == key:
+        return
+    st.session_state.environment_key = key
+    st.session_state.environment_error = None
+    if not current_file and current_kn <= 0 and wind_kn <= 0:
+        # Senza vento ne' corrente resta il percorso veloce (kernel compilato)
+        st.session_state.physics.environment = None
+        return
+    # Import al primo uso: l'avvio senza ambiente non lo paga
+    from environment import Environment, load_field, uniform_from_nautical
+    current = None
+    if current_file:
+        try:
+            current = load_field(current_file)
+        except (OSError, ValueError, KeyError) as e:
+            st.session_state.environment_error = f"Campo di corrente non caricato: {e}"
+    elif current_kn > 0:
+        current = uniform_from_nautical(current_kn, current_dir)
+    wind = uniform_from_nautical(wind_kn, wind_dir, coming_from=True) if wind_kn > 0 else None
+    environment = Environment(current, wind) if current is not None or wind is not None else None
+    st.session_state.physics.environment = environment
+
+def set_scenario(name):
+    if st.session_state.get("scenario_name") == name:
+        return
+    scene = st.session_state.scene
+    scene.clear_obstacles()
+    for obstacle in SCENARIOS[name]():
+        scene.add_obstacle(obstacle)
+    st.session_state.scenario_name = name
+
+def sim_time():
+    # Istante simulato: linea temporale locale o sessione sul server (la
+    # linea temporale non avanza in modalita' client)
+    return sim_client.drain_time if sim_client is not None else st.session_state.timeline.time
+
+def show_scene_events(states, times):
+    # Contatti e avvicinamenti lungo gli stati appena integrati (o ricevuti
+    # dal server) del rimorchiatore; senza stati nuovi, allo stato attuale
+    scene = st.session_state.scene
+    scene.time = sim_time()
+    events = scene.check_path(0, states, times) if len(states) else scene.check()
+    for event in events:
+        if event.kind == CONTACT:
+            st.error(f"💥 CONTATTO con {event.b} (t = {event.t:.1f} s)")
+        else:
+            st.warning(f"⚠️ {event.b} a {event.distance:.1f} m")
+
+# --- AUTOPILOTA DP ---
+def parse_waypoints(text):
+    # "x,y; x,y; ..." in metri (coordinate mondo della predizione)
+    points = []
+    for item in text.split(";"):
+        if item.strip():
+            x, y = item.split(",")
+            points.append((float(x), float(y)))
+    return points
+
+def set_autopilot(mode, waypoints_text):
+    # Nuovo obiettivo solo quando cambiano modo o waypoint
+    key = (mode, waypoints_text)
+    if st.session_state.get("autopilot_key") == key:
+        return
+    st.session_state.autopilot_key = key
+    st.session_state.autopilot_error = None
+    if "autopilot" not in st.session_state:
+        from autopilot import DPAutopilot
+        st.session_state.autopilot = DPAutopilot(st.session_state.physics.vessel)
+    autopilot = st.session_state.autopilot
+    autopilot.reset()
+    state = st.session_state.physics.state
+    if mode == "Mantieni posizione":
+        autopilot.hold(state[0], state[1], state[2])
+    elif mode == "Waypoint":
+        try:
+            points = parse_waypoints(waypoints_text)
+        except ValueError:
+            points = []
+        if points:
+            autopilot.follow(points)
+        else:
+            st.session_state.autopilot_error = "Waypoint non validi (formato: x,y; x,y)"
+
+def run_autopilot():
+    # Un tick: i comandi calcolati diventano quelli dei cursori
+    physics = st.session_state.physics
+    state = physics.state
+    env = physics.environment.sample(state[0], state[1]) if physics.environment is not None else None
+    controls = st.session_state.autopilot.solve(state, env, st.session_state.pp_manual_x, st.session_state.pp_manual_y)
+    if controls is not None:
+        p1, a1, p2, a2 = controls
+        set_engine_state(int(round(p1)), int(round(a1)) % 360, int(round(p2)), int(round(a2)) % 360)
+
+# --- MANOVRE PREIMPOSTATE (solver in manoeuvres.py) ---
 def solve_fast_side_step(mode):
-    Y_target = st.session_state.pp_manual_y
-    dy = POS_THRUSTERS_Y - Y_target
-    if abs(dy) < 0.1: dy = -0.1
-    
-    dx_sx = -POS_THRUSTERS_X
-    dx_dx = POS_THRUSTERS_X
-    
-    if mode == "DRITTA":
-        p_m, a_m = 50.0, 50.0
-        rad_m = np.radians(a_m)
-        Fy_m = p_m * np.cos(rad_m)
-        Fx_m = p_m * np.sin(rad_m)
-        M_m = (dx_sx * Fy_m) - (dy * Fx_m)
-        
-        Fy_s = -Fy_m 
-        Fx_s = (M_m + dx_dx * Fy_s) / dy
-        
-        p_s = np.sqrt(Fx_s**2 + Fy_s**2)
-        rad_s = np.arctan2(Fx_s, Fy_s)
-        a_s = np.degrees(rad_s) % 360
-        set_engine_state(int(p_m), int(a_m), int(p_s), int(a_s))
-    else: 
-        p_m, a_m = 50.0, 310.0
-        rad_m = np.radians(a_m)
-        Fy_m = p_m * np.cos(rad_m)
-        Fx_m = p_m * np.sin(rad_m)
-        M_m = (dx_dx * Fy_m) - (dy * Fx_m)
-        Fy_s = -Fy_m
-        Fx_s = (M_m + dx_sx * Fy_s) / dy
-        p_s = np.sqrt(Fx_s**2 + Fy_s**2)
-        rad_s = np.arctan2(Fx_s, Fy_s)
-        a_s = np.degrees(rad_s) % 360
-        set_engine_state(int(p_s), int(a_s), int(p_m), int(a_m))
-
-# --- SOLVER SLOW SIDE STEP ---
+    set_engine_state(*fast_side_step_settings(mode, st.session_state.pp_manual_y, st.session_state.physics.vessel))
+
 def apply_slow_side_step(direction):
-    Y_pp = st.session_state.pp_manual_y
-    dy = Y_pp - POS_THRUSTERS_Y 
-    dx = POS_THRUSTERS_X 
-    
-    if abs(dy) < 0.1: dy = 0.1
-    
-    # Angolo rispetto alla prua
-    alpha_deg = np.degrees(np.arctan(dx / dy))
-    
-    if dy < 0: alpha_deg = 180 + alpha_deg
-
-    if direction == "DRITTA":
-        az_sx = alpha_deg
-        az_dx = 180 - alpha_deg
-    else: 
-        az_dx = 360 - alpha_deg
-        az_sx = 180 + alpha_deg
-        
-    set_engine_state(50, int(az_sx % 360), 50, int(az_dx % 360))
+    set_engine_state(*slow_side_step_settings(direction, st.session_state.pp_manual_y, st.session_state.physics.vessel))
 
-# --- TURNING ON THE SPOT ---
 def apply_turn_on_the_spot(direction):
-    if direction == "DRITTA":
-        set_engine_state(50, 330, 50, 210)
-    else:
-        set_engine_state(50, 150, 50, 30)
-
-def check_wash_hit(origin, wash_vec, target_pos, threshold=2.0):
-    wash_len = np.linalg.norm(wash_vec)
-    if wash_len < 0.1: return False
-    wash_dir = wash_vec / wash_len
-    to_target = target_pos - origin
-    proj_length = np.dot(to_target, wash_dir)
-    if proj_length > 0: 
-        perp_dist = np.linalg.norm(to_target - (proj_length * wash_dir))
-        return perp_dist < threshold
-    return False
-
-def intersect_lines(p1, angle1_deg, p2, angle2_deg):
-    th1, th2 = np.radians(90 - angle1_deg), np.radians(90 - angle2_deg)
-    v1, v2 = np.array([np.cos(th1), np.sin(th1)]), np.array([np.cos(th2), np.sin(th2)])
-    matrix = np.column_stack((v1, -v2))
-    if abs(np.linalg.det(matrix)) < 1e-4: return None
-    try:
-        t = np.linalg.solve(matrix, p2 - p1)[0]
-        return p1 + t * v1
-    except: return None
+    set_engine_state(*turn_on_the_spot_settings(direction))
+
+# --- ALLOCAZIONE INVERSA (Fx, Fy, N) ---
+def apply_force_allocation():
+    p1, a1, p2, a2, achieved = allocate(st.session_state.alloc_fx, st.session_state.alloc_fy, st.session_state.alloc_n,
+                                        st.session_state.pp_manual_x, st.session_state.pp_manual_y, st.session_state.physics.vessel)
+    set_engine_state(int(round(p1)), int(round(a1)) % 360, int(round(p2)), int(round(a2)) % 360)
+    st.session_state.alloc_achieved = achieved
 
 # --- UI HEADER ---
 st.markdown("<h1 style='text-align: center;'>⚓ ASD Centurion sim ⚓</h1>", unsafe_allow_html=True)
@@ -169,6 +309,27 @@ with st.sidebar:
     st.markdown("### 👁️ Visualizzazione")
     show_wash = st.checkbox("Mostra Propeller Wash", value=True)
     show_prediction = st.checkbox("Predizione Movimento (BETA)", value=False)
+    if sim_client is not None:
+        st.caption(f"Fisica sul server {os.environ['SIM_SERVER']} (sessione {sim_client.id}): {sim_client.vessel_name}, "
+                   f"integratore {sim_client.integrator}, senza vento né corrente")
+        if sim_client.vessel_name != st.session_state.physics.vessel.name:
+            st.warning(f"Il server simula {sim_client.vessel_name}: previsione e autopilota usano {st.session_state.physics.vessel.name}")
+    elif st.session_state.sim_client_error:
+        st.warning(f"Server di simulazione non raggiungibile: {st.session_state.sim_client_error}")
+    show_ghosts = st.checkbox("Sagome future (+10/+20/+30 s)", value=True, help="Traccia prevista a comandi invariati, in predizione")
+    # Con la fisica sul server la vista animata (calcolata in locale) e la
+    # scelta dell'integratore (quello del server) non sono disponibili
+    animated_view = st.checkbox("Vista animata (Plotly)", value=False, help="Calcola alcuni secondi di traiettoria e li riproduce nel browser",
+                                disabled=sim_client is not None) and sim_client is None
+    integrators = list(INTEGRATORS)
+    if sim_client is not None and sim_client.integrator in INTEGRATORS:
+        integrator_name = st.selectbox("Integratore", integrators, index=integrators.index(sim_client.integrator), disabled=True,
+                                       key="integrator_server")
+    else:
+        integrator_name = st.selectbox("Integratore", integrators, index=0)
+    if st.session_state.get("integrator_name") != integrator_name:
+        st.session_state.integrator_name = integrator_name
+        st.session_state.physics.integrator = get_integrator(integrator_name)
     
     st.markdown("**Regolazione Zoom:**")
     z1, z2, z3 = st.columns([1, 1, 2])
@@ -176,6 +337,55 @@ with st.sidebar:
     z2.button("➖", on_click=update_zoom, args=(10,), help="Zoom Out", use_container_width=True)
     z3.metric("Raggio", f"{int(st.session_state.zoom_level)} m", label_visibility="collapsed")
     show_construction = st.checkbox("Costruzione Vettoriale", value=False)
+    show_capability = st.checkbox("Diagramma di Capacità", value=False)
+    profiler.enabled = st.checkbox("Profilazione (debug)", value=False, help="Tempi per fase del rerun, con percentili")
+    if show_prediction:
+        timeline = st.session_state.timeline
+        if sim_client is not None:
+            st.markdown(f"**Tempo simulato:** {sim_time():.1f} s")
+        else:
+            st.markdown(f"**Tempo simulato:** {timeline.time:.1f} s / {timeline.duration:.1f} s")
+        sk1, sk2, sk3 = st.columns([1.2, 1, 1])
+        sk1.number_input("Secondi", min_value=1.0, max_value=600.0, value=30.0, step=5.0, key="seek_seconds", label_visibility="collapsed")
+        sk2.button("⏪", on_click=rewind_sim, help="Riavvolgi", use_container_width=True, disabled=sim_client is not None)
+        sk3.button("⏩", on_click=fast_forward_sim, help="Avanti veloce (comandi attuali)", use_container_width=True,
+                   disabled=sim_client is not None)
+        with st.expander("🌊 Vento e corrente"):
+            # Il server integra senza vento ne' corrente: con la fisica sul
+            # server anche previsione e autopilota restano senza ambiente
+            env_off = sim_client is not None
+            if env_off:
+                st.caption("Non disponibili con la fisica sul server")
+            ec1, ec2 = st.columns(2)
+            current_kn = ec1.number_input("Corrente (kn)", min_value=0.0, max_value=6.0, value=0.0, step=0.1, disabled=env_off)
+            current_dir = ec2.number_input("Verso (°)", min_value=0, max_value=359, value=0, step=5, help="Direzione verso cui va la corrente",
+                                           disabled=env_off)
+            current_file = st.text_input("Campo di corrente (.npy/.npz)", "", help="File sul server; sostituisce la corrente uniforme",
+                                         disabled=env_off)
+            ew1, ew2 = st.columns(2)
+            wind_kn = ew1.number_input("Vento (kn)", min_value=0.0, max_value=60.0, value=0.0, step=1.0, disabled=env_off)
+            wind_dir = ew2.number_input("Da (°)", min_value=0, max_value=359, value=0, step=5, help="Direzione da cui proviene il vento",
+                                        disabled=env_off)
+            if env_off:
+                current_kn, current_file, wind_kn = 0.0, "", 0.0
+            set_environment(current_kn, current_dir, current_file.strip(), wind_kn, wind_dir)
+            if st.session_state.environment_error:
+                st.error(st.session_state.environment_error)
+        scenario_name = st.selectbox("Scenario", list(SCENARIOS), help="Ostacoli fissi rispetto alla partenza, con avvisi di contatto e distanza")
+        set_scenario(scenario_name)
+        with st.expander("🧭 Autopilota DP"):
+            autopilot_mode = st.radio("Modo", ["Spento", "Mantieni posizione", "Waypoint"], horizontal=True,
+                                      help="Controllo predittivo: a ogni rerun sceglie potenze e azimuth")
+            waypoints_text = st.text_input("Waypoint (x,y; x,y)", "0,100; 50,150", help="Metri, Est e Nord dalla partenza")
+            set_autopilot(autopilot_mode, waypoints_text if autopilot_mode == "Waypoint" else "")
+            if st.session_state.autopilot_error:
+                st.error(st.session_state.autopilot_error)
+            elif autopilot_mode != "Spento":
+                run_autopilot()
+                ap_report = st.session_state.autopilot.report()
+                if ap_report["ticks"]:
+                    st.caption(f"MPC: {ap_report['p50_ms']:.1f} ms (p95 {ap_report['p95_ms']:.1f}) su {ap_report['budget_ms']:.0f} ms, "
+                               f"oltre budget {ap_report['over_budget_pct']:.0f}%, {ap_report['rollouts']} rollout")
     
     st.markdown("---")
     st.markdown("### ↕️ Longitudinali")
@@ -201,6 +411,70 @@ with st.sidebar:
     ts1.button("🔄 Ruota SX", on_click=apply_turn_on_the_spot, args=("SINISTRA",), use_container_width=True)
     ts2.button("🔄 Ruota DX", on_click=apply_turn_on_the_spot, args=("DRITTA",), use_container_width=True)
     
+    st.markdown("---")
+    st.markdown("### 🎯 Allocazione Spinta")
+    fa1, fa2, fa3 = st.columns(3)
+    fa1.number_input("Fx (t)", value=0.0, step=1.0, key="alloc_fx", help="Longitudinale, + = avanti")
+    fa2.number_input("Fy (t)", value=0.0, step=1.0, key="alloc_fy", help="Trasversale, + = dritta")
+    fa3.number_input("N (t*m)", value=0.0, step=10.0, key="alloc_n", help="Momento al pivot, + = accosta a dritta")
+    st.button("Applica Allocazione", on_click=apply_force_allocation, use_container_width=True)
+    if st.session_state.get("alloc_achieved", 1.0) < 0.999:
+        st.warning(f"Richiesta oltre i limiti: realizzato {st.session_state.alloc_achieved * 100:.0f}%")
+    
+    st.markdown("---")
+    st.markdown("### ⏺️ Registrazione")
+    recording_on = st.checkbox("Registra sessione", value=False, key="recording_on", help="Comandi e stato ad ogni passo, in predizione")
+    if recording_on and st.session_state.get("recorder") is None:
+        from recording import Recorder
+        clock = st.session_state.sim_clock
+        st.session_state.recorder = Recorder(clock.dt, clock.sim_time)
+        _record_controls(st.session_state.recorder)
+        st.session_state.recorder.extend(st.session_state.physics.state[None])
+        st.session_state.recording_bytes = None
+    recorder = st.session_state.get("recorder") if recording_on else None
+    if recording_on:
+        st.session_state.recording_bytes = None
+    if not recording_on and st.session_state.get("recorder") is not None:
+        # Registrazione chiusa: il file si prepara una volta sola
+        if st.session_state.recording_bytes is None:
+            st.session_state.recording_bytes = st.session_state.recorder.to_bytes()
+        st.download_button("💾 Scarica registrazione", st.session_state.recording_bytes, file_name="sessione.rec",
+                           mime="application/octet-stream", use_container_width=True)
+        if st.button("Scarta registrazione", use_container_width=True):
+            st.session_state.recorder = None
+            st.session_state.recording_bytes = None
+
+    replay = None
+    replay_file = st.file_uploader("Replay da file", type=["rec"])
+    if replay_file is not None:
+        if st.session_state.get("replay_id") != replay_file.file_id:
+            # Nuovo file: si legge una volta; file rotti o troppo corti
+            # restano segnalati finche' non se ne carica un altro
+            st.session_state.replay_id = replay_file.file_id
+            st.session_state.replay_recording = None
+            from recording import Recording
+            try:
+                loaded = Recording(replay_file.getvalue())
+            except (ValueError, KeyError) as e:
+                st.session_state.replay_error = f"File di registrazione non valido: {e}"
+            else:
+                if loaded.n_steps < 2:
+                    st.session_state.replay_error = "Registrazione troppo corta per il replay (meno di due passi)"
+                else:
+                    st.session_state.replay_recording = loaded
+                    st.session_state.replay_track = TrackHistory(archive_capacity=0)
+                    st.session_state.replay_error = None
+        rec = st.session_state.replay_recording
+        if rec is None:
+            st.error(st.session_state.replay_error)
+        else:
+            replay_t = st.slider("Tempo replay (s)", rec.t0, rec.t0 + rec.duration, rec.t0, step=rec.dt, format="%.2f")
+            # I comandi registrati sostituiscono quelli manuali
+            ctrl = rec.controls_at(replay_t)
+            set_engine_state(int(ctrl["p1"]), int(ctrl["a1"]), int(ctrl["p2"]), int(ctrl["a2"]))
+            st.session_state.pp_manual_x, st.session_state.pp_manual_y = ctrl["pp_x"], ctrl["pp_y"]
+            replay = (rec, replay_t)
+
     st.markdown("---")
     st.markdown("### 📍 Pivot Point Manuale")
     pp_c1, pp_c2 = st.columns(2)
@@ -208,34 +482,16 @@ with st.sidebar:
     st.session_state.pp_manual_y = pp_c2.number_input("Pos. Y (m)", value=float(st.session_state.pp_manual_y), step=0.1, min_value=-16.0, max_value=16.0)
     st.button("Reset PP Default", on_click=reset_pivot_point, use_container_width=True)
 
-pos_sx, pos_dx = np.array([-POS_THRUSTERS_X, POS_THRUSTERS_Y]), np.array([POS_THRUSTERS_X, POS_THRUSTERS_Y])
+vessel = st.session_state.physics.vessel
+pos_sx, pos_dx = np.array(vessel.pos_sx), np.array(vessel.pos_dx)
 
 # --- CALCOLI VETTORIALI UI ---
-ton1_set = (st.session_state.p1/100)*BOLLARD_PULL_PER_ENGINE
-ton2_set = (st.session_state.p2/100)*BOLLARD_PULL_PER_ENGINE
-rad1, rad2 = np.radians(st.session_state.a1), np.radians(st.session_state.a2)
-
-F_sx_eff_v = np.array([ton1_set*np.sin(rad1), ton1_set*np.cos(rad1)])
-F_dx_eff_v = np.array([ton2_set*np.sin(rad2), ton2_set*np.cos(rad2)])
-
-wash_sx_hits_dx = check_wash_hit(pos_sx, -F_sx_eff_v, pos_dx)
-wash_dx_hits_sx = check_wash_hit(pos_dx, -F_dx_eff_v, pos_sx)
-eff_sx, eff_dx = (0.8 if wash_dx_hits_sx else 1.0), (0.8 if wash_sx_hits_dx else 1.0)
-
-F_sx_eff = F_sx_eff_v * eff_sx
-F_dx_eff = F_dx_eff_v * eff_dx
-ton1_eff, ton2_eff = ton1_set * eff_sx, ton2_set * eff_dx
-
-res_u_total = (F_sx_eff[0] + F_dx_eff[0])
-res_v_total = (F_sx_eff[1] + F_dx_eff[1])
-res_ton = np.sqrt(res_u_total**2 + res_v_total**2)
-direzione_nautica = np.degrees(np.arctan2(res_u_total, res_v_total)) % 360
-
-inter = intersect_lines(pos_sx, st.session_state.a1, pos_dx, st.session_state.a2)
-use_weighted = True
-if inter is not None:
-    if np.linalg.norm(inter) <= 50.0: use_weighted = False
-origin_res = inter if not use_weighted else np.array([(ton1_eff * pos_sx[0] + ton2_eff * pos_dx[0]) / (ton1_eff + ton2_eff + 0.001), POS_THRUSTERS_Y])
+# In cache per comandi (control_vectors.py): a comandi invariati nessun ricalcolo
+cv = control_vectors(st.session_state.p1, st.session_state.a1, st.session_state.p2, st.session_state.a2,
+                     st.session_state.pp_manual_x, st.session_state.pp_manual_y, vessel)
+ton1_eff, ton2_eff = cv.ton1_eff, cv.ton2_eff
+F_sx_eff, F_dx_eff = cv.F_sx_eff, cv.F_dx_eff
+wash_sx_hits_dx, wash_dx_hits_sx = cv.wash_sx_hits_dx, cv.wash_dx_hits_sx
 
 # --- VISUALIZZAZIONE GUI ---
 col_l, col_c, col_r = st.columns([1.2, 2.6, 1.2])
@@ -244,163 +500,218 @@ with col_l:
     st.slider("Potenza SX", 0, 100, key="p1", format="%d%%")
     st.metric("Spinta SX", f"{ton1_eff:.1f} t")
     st.slider("Azimuth SX", 0, 360, key="a1", format="%03d°")
-    st.pyplot(plot_clock(st.session_state.a1, 'red'))
+    with profiler.stage("quadranti"):
+        st.image(clock_png(st.session_state.a1, 'red'), use_container_width=True)
     
 with col_r:
     st.slider("Potenza DX", 0, 100, key="p2", format="%d%%")
     st.metric("Spinta DX", f"{ton2_eff:.1f} t")
     st.slider("Azimuth DX", 0, 360, key="a2", format="%03d°")
-    st.pyplot(plot_clock(st.session_state.a2, 'green'))
+    with profiler.stage("quadranti"):
+        st.image(clock_png(st.session_state.a2, 'green'), use_container_width=True)
 
 with col_c:
     if wash_dx_hits_sx:
-        st.error("⚠️ ATTENZIONE: Flusso DX investe SX -> Perdita 20% spinta SX")
+        st.error(f"⚠️ ATTENZIONE: Flusso DX investe SX -> Perdita {cv.loss_sx:.0%} spinta SX")
     if wash_sx_hits_dx:
-        st.error("⚠️ ATTENZIONE: Flusso SX investe DX -> Perdita 20% spinta DX")
-
-    fig, ax = plt.subplots(figsize=(10, 12))
-    ax.set_facecolor(COLOR_SEA) 
-    
-    if show_wash:
-        draw_wash(ax, pos_sx, st.session_state.a1, st.session_state.p1)
-        draw_wash(ax, pos_dx, st.session_state.a2, st.session_state.p2)
-    
-    draw_static_elements(ax, pos_sx, pos_dx)
-    ax.scatter(st.session_state.pp_manual_x, st.session_state.pp_manual_y, c='yellow', s=150, zorder=20, edgecolors='black', label="Pivot")
-    
-    sc = 0.7 
-    ax.arrow(pos_sx[0], pos_sx[1], F_sx_eff[0]*sc, F_sx_eff[1]*sc, fc='red', ec='red', width=0.15, head_width=min(0.5, np.linalg.norm(F_sx_eff)*sc*0.4), head_length=min(0.7, np.linalg.norm(F_sx_eff)*sc*0.5), zorder=25, alpha=0.9, length_includes_head=True)
-    ax.arrow(pos_dx[0], pos_dx[1], F_dx_eff[0]*sc, F_dx_eff[1]*sc, fc='green', ec='green', width=0.15, head_width=min(0.5, np.linalg.norm(F_dx_eff)*sc*0.4), head_length=min(0.7, np.linalg.norm(F_dx_eff)*sc*0.5), zorder=25, alpha=0.9, length_includes_head=True)
+        st.error(f"⚠️ ATTENZIONE: Flusso SX investe DX -> Perdita {cv.loss_dx:.0%} spinta DX")
+
+    animating = show_prediction and animated_view and replay is None
+    if not animating and "anim_chunk" in st.session_state:
+        _settle_animation()
+    if animating:
+        # Vista animata: un tratto di traiettoria calcolato in blocco e
+        # riprodotto dal browser. Il tratto successivo si calcola quando
+        # questo finisce (timer) o quando cambiano comandi o ambiente; gli
+        # altri rerun (zoom, opzioni) lasciano continuare quello in corso
+        from plotly_view import CHUNK_SECONDS, trajectory_figure, trajectory_html
+        physics = st.session_state.physics
+        chunk_key = (st.session_state.p1, st.session_state.a1, st.session_state.p2, st.session_state.a2,
+                     st.session_state.pp_manual_x, st.session_state.pp_manual_y, physics.integrator, physics.environment)
+        chunk = st.session_state.get("anim_chunk")
+        if chunk is None or chunk["key"] != chunk_key or time.time() >= chunk["shown_at"] + chunk["seconds"]:
+            _settle_animation()
+            clock = st.session_state.sim_clock
+            thrust_l = power_to_thrust(st.session_state.p1, vessel)
+            thrust_r = power_to_thrust(st.session_state.p2, vessel)
+            track = st.session_state.track
+            past = np.concatenate([track.archive(), track.recent()])
+            t0 = st.session_state.timeline.time
+            with profiler.stage("fisica"):
+                traj = st.session_state.timeline.fast_forward(CHUNK_SECONDS, thrust_l, st.session_state.a1, thrust_r, st.session_state.a2,
+                                                              st.session_state.pp_manual_x, st.session_state.pp_manual_y)
+            clock.advance(len(traj.t) - 1)
+            track.extend(traj.states[1:])
+            show_scene_events(traj.states[1:], traj.t[1:])
+            if recorder is not None:
+                _record_controls(recorder)
+                recorder.extend(traj.states[1:])
+            with profiler.stage("figura"):
+                fig_anim = trajectory_figure(traj, pos_sx, pos_dx, F_sx_eff, F_dx_eff, past[:, 0], past[:, 1], vessel=vessel,
+                                             obstacles=[ob.polygon for ob in st.session_state.scene.obstacles])
+                chunk = {"key": chunk_key, "t0": t0, "seconds": CHUNK_SECONDS, "html": trajectory_html(fig_anim)}
+            st.session_state.last_time = chunk["shown_at"] = time.time()
+            st.session_state.anim_chunk = chunk
+        with profiler.stage("st.iframe"):
+            st.iframe(chunk["html"], height=820)
+        next_chunk_timer()
+    else:
+        # Scena persistente: gli artisti vengono solo aggiornati
+        if "renderer" not in st.session_state:
+            st.session_state.renderer = CenterPanelRenderer(pos_sx, pos_dx, vessel)
+        renderer = st.session_state.renderer
+        scene_t0 = time.perf_counter()
     
-    if res_ton > 0.1:
-        v_res_len = res_ton * sc
-        ax.arrow(origin_res[0], origin_res[1], res_u_total*sc, res_v_total*sc, fc='blue', ec='blue', width=0.3, head_width=min(0.8, v_res_len*0.4), head_length=min(1.2, v_res_len*0.5), alpha=0.7, zorder=26, length_includes_head=True)
-
-    if show_construction and inter is not None and res_ton > 0.1:
-        ax.plot([pos_sx[0], inter[0]], [pos_sx[1], inter[1]], color='red', linestyle='--', linewidth=1.5, alpha=0.5, zorder=23)
-        ax.plot([pos_dx[0], inter[0]], [pos_dx[1], inter[1]], color='green', linestyle='--', linewidth=1.5, alpha=0.5, zorder=23)
-        tip_sx_trans = inter + F_sx_eff * sc
-        tip_dx_trans = inter + F_dx_eff * sc
-        ax.arrow(inter[0], inter[1], F_sx_eff[0]*sc, F_sx_eff[1]*sc, color='red', ls='--', lw=1.5, alpha=0.6, head_width=0, zorder=24)
-        ax.arrow(inter[0], inter[1], F_dx_eff[0]*sc, F_dx_eff[1]*sc, color='green', ls='--', lw=1.5, alpha=0.6, head_width=0, zorder=24)
-        pRES_tip = inter + np.array([res_u_total, res_v_total]) * sc
-        ax.plot([tip_sx_trans[0], pRES_tip[0]], [tip_sx_trans[1], pRES_tip[1]], color='green', linestyle='--', linewidth=2.0, alpha=0.8, zorder=24)
-        ax.plot([tip_dx_trans[0], pRES_tip[0]], [tip_dx_trans[1], pRES_tip[1]], color='red', linestyle='--', linewidth=2.0, alpha=0.8, zorder=24)
+        renderer.update_wash(st.session_state.a1, st.session_state.p1, st.session_state.a2, st.session_state.p2, show=show_wash)
+        renderer.update_pivot(st.session_state.pp_manual_x, st.session_state.pp_manual_y)
+        renderer.update_arrows(F_sx_eff, F_dx_eff, cv.origin_res, cv.res_vec)
+        renderer.update_construction(cv.inter, F_sx_eff, F_dx_eff, cv.res_vec, show_construction)
     
-    # 1. Update fisica se Predizione Attiva
-    if show_prediction:
-        current_time = time.time()
-        dt = current_time - st.session_state.last_time
-        st.session_state.last_time = current_time
-        if dt > 0.1: dt = 0.1
-
-        thrust_l = (st.session_state.p1 / 100.0) * MAX_THRUST
-        thrust_r = (st.session_state.p2 / 100.0) * MAX_THRUST
-        
-        st.session_state.physics.update(dt, thrust_l, st.session_state.a1, thrust_r, st.session_state.a2, 
-                                        st.session_state.pp_manual_x, st.session_state.pp_manual_y)
-        
-        state = st.session_state.physics.state
-        st.session_state.history_x.append(state[0])
-        st.session_state.history_y.append(state[1])
-        if len(st.session_state.history_x) > 1000:
-            st.session_state.history_x.pop(0)
-            st.session_state.history_y.pop(0)
-
-        ship_x, ship_y = state[0], state[1]
-        ship_heading = state[2]
+        if replay is not None:
+            # Replay: stato letto dalla registrazione, nessuna integrazione
+            rec, replay_t = replay
+            replay_track = st.session_state.replay_track
+            replay_track.clear()
+            replay_track.extend(rec.window(replay_t, TRACK_CAPACITY * rec.dt))
+            renderer.update_prediction(rec.state_at(replay_t), replay_track, st.session_state.zoom_level)
+            renderer.update_propellers(st.session_state.a1, st.session_state.a2, show=False)
+            renderer.set_mode(True, st.session_state.zoom_level)
+
+        # 1. Update fisica se Predizione Attiva
+        elif show_prediction:
+            current_time = time.time()
+            elapsed = current_time - st.session_state.last_time
+            st.session_state.last_time = current_time
+
+            # Passi fissi: il tempo reale decide solo quanti passi fare
+            clock = st.session_state.sim_clock
+            n_steps = clock.consume(elapsed)
+
+            thrust_l = power_to_thrust(st.session_state.p1, vessel)
+            thrust_r = power_to_thrust(st.session_state.p2, vessel)
         
-        rot_angle = -(ship_heading - np.pi/2)
-        c, s = np.cos(rot_angle), np.sin(rot_angle)
-            
-        if len(st.session_state.history_x) > 1:
-            hx = np.array(st.session_state.history_x)
-            hy = np.array(st.session_state.history_y)
-            dx = hx - ship_x
-            dy = hy - ship_y
-            tx = dx * c - dy * s
-            ty = dx * s + dy * c
-            ax.plot(tx, ty, color='#333333', linewidth=2, alpha=0.4, zorder=0)
-
-        grid_spacing = 50.0 
-        view_radius = st.session_state.zoom_level * 2.5 
+            with profiler.stage("fisica"):
+                if sim_client is not None:
+                    if not st.session_state.get("sim_client_live"):
+                        # Predizione appena accesa: gli stati pubblicati dal
+                        # server nel frattempo (fermo all'origine) si scartano
+                        sim_client.drain()
+                        st.session_state.sim_client_live = True
+                    # Fisica sul server: solo comandi in uscita e stati ricevuti
+                    sim_client.set_controls(st.session_state.p1, st.session_state.a1, st.session_state.p2, st.session_state.a2,
+                                            st.session_state.pp_manual_x, st.session_state.pp_manual_y)
+                    new_states = sim_client.drain()
+                    new_times = sim_time() - SIM_DT * np.arange(len(new_states) - 1, -1, -1)
+                    if len(new_states):
+                        st.session_state.physics.state[:] = new_states[-1]
+                else:
+                    traj = st.session_state.timeline.run(n_steps, thrust_l, st.session_state.a1, thrust_r, st.session_state.a2,
+                                                         st.session_state.pp_manual_x, st.session_state.pp_manual_y)
+                    new_states = traj.states[1:]
+                    new_times = traj.t[1:]
         
-        offset_x = ship_x % grid_spacing
-        offset_y = ship_y % grid_spacing
+            state = st.session_state.physics.state
+            st.session_state.track.extend(new_states)
+            show_scene_events(new_states, new_times)
+            if recorder is not None:
+                _record_controls(recorder)
+                recorder.extend(new_states)
+
+            renderer.set_obstacles(ob.polygon for ob in st.session_state.scene.obstacles)
+            renderer.update_prediction(state, st.session_state.track, st.session_state.zoom_level)
+            renderer.update_propellers(st.session_state.a1, st.session_state.a2, show=False)
+            renderer.set_mode(True, st.session_state.zoom_level)
+            lookahead = st.session_state.lookahead
+            if show_ghosts:
+                # Riusa la previsione del frame prima se i comandi non cambiano
+                with profiler.stage("previsione"):
+                    lookahead.update(st.session_state.physics, len(new_states), thrust_l, st.session_state.a1,
+                                     thrust_r, st.session_state.a2, st.session_state.pp_manual_x, st.session_state.pp_manual_y)
+                renderer.update_lookahead(lookahead.states(), lookahead.marks())
+            else:
+                lookahead.invalidate()
+                renderer.update_lookahead(None, None, show=False)
+
+        else:
+            # Reset stato fisico se non in predizione
+            st.session_state.physics.reset()
+            st.session_state.last_time = time.time() 
+            st.session_state.sim_clock.reset()
+            st.session_state.timeline.reset()
+            st.session_state.physics.current_pp_y = st.session_state.pp_manual_y
+            if sim_client is not None:
+                sim_client.reset()
+                sim_client.drain()
+                st.session_state.sim_client_live = False
         
-        nx = int(view_radius / grid_spacing) + 2
-        x_range = np.linspace(-view_radius, view_radius, nx * 2)
-        y_range = np.linspace(-view_radius, view_radius, nx * 2)
-        gx, gy = np.meshgrid(x_range, y_range)
-        
-        gx -= offset_x
-        gy -= offset_y
-        
-        gx_r = gx * c - gy * s
-        gy_r = gx * s + gy * c
-        
-        ax.scatter(gx_r, gy_r, c='black', s=20, alpha=0.5, zorder=0)
+            renderer.update_propellers(st.session_state.a1, st.session_state.a2)
+            renderer.set_mode(False)
 
-        math_deg = np.degrees(ship_heading)
-        naut_hdg = (90 - math_deg) % 360
-        speed_kn = np.sqrt(state[3]**2 + state[4]**2) * 1.94
-        rot_deg_min = np.degrees(state[5]) * 60
-        
-        info_text = (
-            f"Pr : {naut_hdg:05.1f}°\n"
-            f"V  : {speed_kn:5.1f} kn\n"
-            f"RoT: {rot_deg_min:5.1f} °/m"
-        )
-        ax.text(-st.session_state.zoom_level*0.9, st.session_state.zoom_level*0.75, info_text, 
-                color='black', fontsize=12, family='monospace', fontweight='bold',
-                bbox=dict(facecolor='white', alpha=0.8, edgecolor='black'))
-        
-        zoom = st.session_state.zoom_level
-        ax.set_xlim(-zoom, zoom)
-        ax.set_ylim(-zoom, zoom)
-
-    else:
-        # Reset stato fisico se non in predizione
-        st.session_state.physics.reset()
-        st.session_state.last_time = time.time() 
-        st.session_state.physics.current_pp_y = st.session_state.pp_manual_y
-        
-        draw_propeller(ax, pos_sx, st.session_state.a1, color='red')
-        draw_propeller(ax, pos_dx, st.session_state.a2, color='green')
-        
-        ax.set_xlim(-30, 30)
-        ax.set_ylim(-40, 40)
-
-    ax.set_aspect('equal')
-    ax.axis('off')
-    st.pyplot(fig)
+        # "scena" comprende anche la fisica quando la predizione e' attiva
+        profiler.record("scena", time.perf_counter() - scene_t0)
+        with profiler.stage("st.pyplot"):
+            st.pyplot(renderer.fig)
 
 # --- TABELLA (Renderizzata sempre alla fine) ---
+telemetry_t0 = time.perf_counter()
 st.write("---")
 st.subheader("📋 Telemetria di Manovra (Pivot Manuale)")
-PP_MAN = np.array([st.session_state.pp_manual_x, st.session_state.pp_manual_y])
-arm_sx = pos_sx - PP_MAN
-arm_dx = pos_dx - PP_MAN
-M_sx = arm_sx[0]*F_sx_eff[1] - arm_sx[1]*F_sx_eff[0]
-M_dx = arm_dx[0]*F_dx_eff[1] - arm_dx[1]*F_dx_eff[0]
-M_tm_PP = M_sx + M_dx
-M_tm_PP = -M_tm_PP
-M_knm = M_tm_PP * G_ACCEL
-
 c1, c2, c3, c4 = st.columns(4)
-c1.metric("Spinta Risultante", f"{res_ton:.1f} t")
-c2.metric("Direzione Spinta", f"{int(direzione_nautica)}°")
-c3.metric("Momento (PP)", f"{int(M_tm_PP)} t*m")
-c4.metric("Momento (kNm)", f"{int(M_knm)} kNm")
-
-df_engines = pd.DataFrame({
-    "Parametro": ["Potenza (%)", "Azimuth (°)", "Spinta Teorica (t)", "Wash Penalty", "Spinta Effettiva (t)"],
-    "Propulsore SX": [st.session_state.p1, st.session_state.a1, f"{(ton1_set):.1f}", "SÌ (-20%)" if wash_dx_hits_sx else "NO", f"{ton1_eff:.1f}"],
-    "Propulsore DX": [st.session_state.p2, st.session_state.a2, f"{(ton2_set):.1f}", "SÌ (-20%)" if wash_sx_hits_dx else "NO", f"{ton2_eff:.1f}"]
-})
-st.table(df_engines)
+c1.metric("Spinta Risultante", f"{cv.res_ton:.1f} t")
+c2.metric("Direzione Spinta", f"{int(cv.direction)}°")
+c3.metric("Momento (PP)", f"{int(cv.M_tm_PP)} t*m")
+c4.metric("Momento (kNm)", f"{int(cv.M_knm)} kNm")
+
+# Regime stimato dalla tabella precalcolata (nessuna simulazione): solo con
+# il pivot X della tabella e nelle celle in cui l'interpolazione e' affidabile
+response_table = get_response_table(vessel)
+regime_note = None
+if response_table is None:
+    regime = None
+    regime_note = f"Tabella di regime non calcolata per questa nave: python response_table.py --build --vessel '{vessel.name}'"
+elif st.session_state.pp_manual_x != response_table.pp_x:
+    regime = None
+    regime_note = f"Valori a regime disponibili solo con pivot X = {response_table.pp_x:g} m"
+else:
+    regime = response_table.lookup_one(st.session_state.p1, st.session_state.a1, st.session_state.p2, st.session_state.a2, st.session_state.pp_manual_y)
+    if not regime.reliable:
+        regime = None
+        regime_note = "Regime non stimabile dalla tabella per questi comandi (zona di transizione)"
+s1, s2, s3 = st.columns(3)
+s1.metric("Surge a regime", "n.d." if regime is None else f"{regime.u * 1.94:.1f} kn")
+s2.metric("Sway a regime", "n.d." if regime is None else f"{regime.v * 1.94:.1f} kn")
+s3.metric("RoT a regime", "n.d." if regime is None else f"{np.degrees(regime.r) * 60:.0f} °/m")
+if regime_note:
+    st.caption(regime_note)
+
+if show_capability:
+    cap_c1, cap_c2 = st.columns([1, 2])
+    cap_moment = cap_c1.slider("Momento da mantenere (t*m)", -200, 200, 0, step=10)
+    cap_theta, cap_force = capability_envelope(cap_moment, st.session_state.pp_manual_x, st.session_state.pp_manual_y, vessel=vessel)
+    fig_cap = plot_capability(cap_theta, cap_force, cap_moment, current=(cv.direction, cv.res_ton))
+    cap_c2.pyplot(fig_cap)
+    plt.close(fig_cap)
+
+# Tabella in markdown: niente pandas/pyarrow a ogni rerun
+st.markdown(cv.table)
+profiler.record("telemetria", time.perf_counter() - telemetry_t0)
+profiler.record("rerun", time.perf_counter() - rerun_t0)
+
+# --- PANNELLO DEBUG (tempi per fase) ---
+if profiler.enabled:
+    with st.sidebar:
+        st.markdown("---")
+        st.markdown("### ⏱️ Profilazione")
+        prof_summary = profiler.summary()
+        if prof_summary:
+            import pandas as pd
+            st.dataframe(pd.DataFrame(prof_summary).T.round(2), use_container_width=True)
+        d1, d2, d3 = st.columns(3)
+        d1.download_button("CSV", profiler.to_csv(), file_name="profilazione.csv", mime="text/csv", use_container_width=True)
+        d2.download_button("JSON", profiler.to_json(), file_name="profilazione.json", mime="application/json", use_container_width=True)
+        d3.button("Azzera", on_click=profiler.clear, use_container_width=True)
 
 # --- RERUN LOOP (Solo alla fine) ---
-if show_prediction:
+if show_prediction and not animated_view and replay is None:
     time.sleep(0.05)
     st.rerun()
@@ -0,0 +1,302 @@
+import argparse
+import math
+import time
+
+import numpy as np
+
+from constants import *
+from physics import BatchPhysicsEngine, PhysicsEngine, batch_thruster_forces, environment_terms
+from profiling import StageProfiler
+from simulation import SIM_DT, power_to_thrust
+from thrust_allocation import allocate_least_norm
+from vessel import DEFAULT_VESSEL
+
+# Autopilota DP (station keeping e inseguimento di waypoint) con controllo
+# predittivo: a ogni tick si simulano in blocco (BatchPhysicsEngine, una riga
+# per candidato) `samples` serie di comandi per `horizon` secondi e si applica
+# la migliore. I comandi sono due blocchi (p1, a1, p2, a2): il primo per
+# `block` secondi, il secondo fino alla fine dell'orizzonte (per esempio
+# "avanti, poi frena"). Ricerca a entropia incrociata: si campiona attorno
+# alla soluzione del tick precedente (warm start), si tengono i migliori e si
+# ripete finche' c'e' tempo nel budget del tick. Tra i candidati c'e' anche
+# la spinta di un regolatore PD (con compensazione di vento e corrente)
+# passata all'allocazione rapida di thrust_allocation (minima norma, senza
+# ricerca): un punto di partenza buono anche quando il piano precedente non
+# va piu' bene. Il budget comprende il candidato PD; ogni iterazione, anche
+# la prima, parte solo se ci sta secondo la durata misurata di un'iterazione.
+#   python autopilot.py --hold 30 --current 1.5 --duration 120
+
+TWO_PI = 2 * math.pi
+WAYPOINT_RADIUS = 5.0
+
+# Pesi del costo (per passo di predizione)
+W_POSITION = 1.0        # per m^2
+W_HEADING = 0.25        # per grado^2
+W_SPEED = 4.0           # per (m/s)^2, solo sull'ultimo tratto dell'orizzonte
+W_POWER = 0.002         # per %, somma dei due motori
+W_CHANGE = 0.0002       # per %^2 di variazione del vettore di spinta dal tick precedente
+
+# Regolatore PD del candidato di partenza (smorzamento ~critico per l'ASD 32m)
+KP_POSITION = 1.0       # t/m
+KD_POSITION = 15.0      # t/(m/s)
+KP_HEADING = 10.0       # t*m/grado
+KD_HEADING = 1700.0     # t*m/(rad/s)
+
+_LOW = np.array([0.0, -np.inf, 0.0, -np.inf] * 2)
+_HIGH = np.array([100.0, np.inf, 100.0, np.inf] * 2)
+_SIGMA0 = np.array([30.0, 60.0, 30.0, 60.0] * 2)
+_SIGMA_MIN = np.array([2.0, 3.0, 2.0, 3.0] * 2)
+
+
+def _wrap(angle):
+    return (angle + math.pi) % TWO_PI - math.pi
+
+
+def _vector_change(power, angle_deg, power0, angle0_deg):
+    # |p*e^(i*a) - p0*e^(i*a0)|^2 in %^2
+    rad, rad0 = np.radians(angle_deg), math.radians(angle0_deg)
+    return (power * np.cos(rad) - power0 * math.cos(rad0)) ** 2 + (power * np.sin(rad) - power0 * math.sin(rad0)) ** 2
+
+
+class DPAutopilot:
+    def __init__(self, vessel=DEFAULT_VESSEL, horizon=8.0, dt=0.4, block=2.0, samples=96, elite=12,
+                 budget=0.010, seed=0):
+        # horizon, dt, block [s]; budget: tempo massimo per tick [s]
+        self.vessel = vessel
+        self.dt = dt
+        self.n_steps = max(int(round(horizon / dt)), 1)
+        self.block_steps = min(max(int(round(block / dt)), 1), self.n_steps)
+        self.samples = int(samples)
+        self.elite = int(elite)
+        self.budget = budget
+        self.rng = np.random.default_rng(seed)
+        self.engine = BatchPhysicsEngine(self.samples, vessel)
+        # Pesi della velocita' solo nell'ultimo quarto dell'orizzonte
+        self._speed_from = self.n_steps - max(self.n_steps // 4, 1)
+        # Misura del rispetto del budget
+        self.timing = StageProfiler(enabled=True)
+        self.ticks = 0
+        self.overruns = 0
+        self.last_iterations = 0
+        self.last_cost = math.nan
+        self.reset()
+        # Un'iterazione di prova: scalda le cache (tabella di scia, ...) e da'
+        # la prima stima della durata di un'iterazione
+        self._rollout_cost(np.zeros((self.samples, 8)), np.zeros(6), (0.0, 0.0, 0.0), None, vessel.pp_x, vessel.pp_y)
+        t0 = time.perf_counter()
+        self._rollout_cost(np.zeros((self.samples, 8)), np.zeros(6), (0.0, 0.0, 0.0), None, vessel.pp_x, vessel.pp_y)
+        self.iteration_time = time.perf_counter() - t0
+
+    def reset(self):
+        # Dimentica il warm start (comandi a zero)
+        self.mean = np.zeros(8)
+        self.sigma = _SIGMA0.copy()
+        self.previous = np.zeros(4)
+        self.waypoints = []
+        self.target = None
+
+    # --- OBIETTIVI ---
+    def hold(self, x, y, heading):
+        # Mantiene posizione e prora (heading nel riferimento di physics: pi/2 = Nord)
+        self.waypoints = []
+        self.target = (float(x), float(y), float(heading))
+
+    def follow(self, waypoints, heading=None):
+        # waypoints: [(x, y), ...]; prora lungo ogni tratto, all'ultimo punto
+        # `heading` (default: quella dell'ultimo tratto) e poi station keeping
+        self.waypoints = [(float(x), float(y)) for x, y in waypoints]
+        if heading is None and len(self.waypoints) > 1:
+            (x0, y0), (x1, y1) = self.waypoints[-2:]
+            heading = math.atan2(y1 - y0, x1 - x0)
+        self.final_heading = heading
+        self.leg_heading = math.pi / 2
+        self.target = None
+
+    def _current_target(self, state):
+        if not self.waypoints:
+            return self.target
+        x, y = float(state[0]), float(state[1])
+        # Waypoint raggiunto: si passa al successivo (l'ultimo resta)
+        while len(self.waypoints) > 1 and math.hypot(self.waypoints[0][0] - x, self.waypoints[0][1] - y) <= WAYPOINT_RADIUS:
+            self.waypoints.pop(0)
+        wx, wy = self.waypoints[0]
+        if math.hypot(wx - x, wy - y) <= WAYPOINT_RADIUS:
+            # Arrivati all'ultimo: station keeping
+            self.hold(wx, wy, self.leg_heading if self.final_heading is None else self.final_heading)
+            return self.target
+        self.leg_heading = math.atan2(wy - y, wx - x)
+        return wx, wy, self.leg_heading
+
+    # --- REGOLATORE DI PARTENZA ---
+    def _pd_seed(self, state, target, env, pp_x, pp_y):
+        # Richiesta (Fx, Fy, N) nel body frame di physics -> allocazione
+        # rapida (momento positivo verso dritta, cioe' -N di physics)
+        x, y, psi, u, v, r = state.tolist()
+        tx, ty, th = target
+        c, s = math.cos(psi), math.sin(psi)
+        ex, ey = tx - x, ty - y
+        to_ton = 1.0 / (1000 * G_ACCEL)
+        Fx = KP_POSITION * (ex * c + ey * s) - KD_POSITION * u
+        Fy = KP_POSITION * (ey * c - ex * s) - KD_POSITION * v
+        N = KP_HEADING * math.degrees(_wrap(th - psi)) - KD_HEADING * r
+        if env is not None:
+            # Forze di vento e corrente a nave ferma, da compensare
+            vessel = self.vessel
+            u_c, v_c, X_wind, Y_wind = environment_terms(psi, 0.0, 0.0, env, vessel)
+            surge = vessel.damping_surge_forward if u_c <= 0 else vessel.damping_surge_reverse
+            Fx -= (surge * u_c * abs(u_c) + X_wind) * to_ton
+            Fy -= (vessel.damping_sway * v_c * abs(v_c) + Y_wind) * to_ton
+        p1, a1, p2, a2, achieved = allocate_least_norm(Fx, Fy, -N, pp_x, pp_y, self.vessel)
+        return np.array([p1, a1, p2, a2] * 2)
+
+    # --- PREDIZIONE ---
+    def _rollout_cost(self, candidates, state, target, env, pp_x, pp_y):
+        # candidates: (samples, 8) -> costo (samples,)
+        engine = self.engine
+        engine.states[:] = state
+        tx, ty, th = target
+        vessel = self.vessel
+        # Forze dei propulsori (scia compresa) una volta per blocco di comandi
+        blocks = [batch_thruster_forces(power_to_thrust(candidates[:, 0 + k], vessel), candidates[:, 1 + k],
+                                        power_to_thrust(candidates[:, 2 + k], vessel), candidates[:, 3 + k], vessel)
+                  for k in (0, 4)]
+        cost = np.zeros(len(candidates))
+        for i in range(self.n_steps):
+            engine.step(self.dt, blocks[0 if i < self.block_steps else 1], pp_x, pp_y, env)
+            st = engine.states
+            dx, dy = st[:, 0] - tx, st[:, 1] - ty
+            dh = np.degrees((st[:, 2] - th + math.pi) % TWO_PI - math.pi)
+            cost += W_POSITION * (dx * dx + dy * dy) + W_HEADING * dh * dh
+            if i >= self._speed_from:
+                cost += W_SPEED * (st[:, 3] ** 2 + st[:, 4] ** 2)
+        cost /= self.n_steps
+        cost += W_POWER * (candidates[:, 0] + candidates[:, 2] + candidates[:, 4] + candidates[:, 6]) * 0.5
+        # Variazione del vettore di spinta (girare un propulsore fermo non costa)
+        p1, a1, p2, a2 = self.previous
+        cost += W_CHANGE * (_vector_change(candidates[:, 0], candidates[:, 1], p1, a1)
+                            + _vector_change(candidates[:, 2], candidates[:, 3], p2, a2))
+        return cost
+
+    def solve(self, state, env=None, pp_x=DEFAULT_PP_X, pp_y=DEFAULT_PP_Y):
+        # Un tick: -> (p1, a1, p2, a2) in % e gradi, o None senza obiettivo.
+        # state: [x, y, psi, u, v, r]; env: vento e corrente nella posizione
+        # della nave (Environment.sample), costanti sull'orizzonte
+        target = self._current_target(state)
+        if target is None:
+            return None
+        t0 = time.perf_counter()
+        deadline = t0 + self.budget
+        state = np.asarray(state, dtype=float)
+
+        # Warm start: si campiona attorno al piano del tick precedente; tra i
+        # candidati anche il piano stesso, il piano avanzato di un blocco,
+        # motori a zero e il regolatore PD
+        mean = self.mean
+        shifted = np.concatenate((mean[4:], mean[4:]))
+        seed = self._pd_seed(state, target, env, pp_x, pp_y)
+        self.timing.record("seed", time.perf_counter() - t0)
+        sigma = np.clip(self.sigma * 1.5, _SIGMA_MIN, _SIGMA0)
+        best, best_cost = None, math.inf
+        iterations = 0
+        # Un'iterazione parte solo se ci sta (con margine) nel budget. Durata
+        # stimata: la piu' lunga recente, che cala piano (il carico della
+        # macchina varia da un'iterazione all'altra)
+        while time.perf_counter() + 1.25 * self.iteration_time <= deadline:
+            it0 = time.perf_counter()
+            candidates = mean + sigma * self.rng.standard_normal((self.samples, 8))
+            candidates[0] = mean
+            candidates[1] = shifted
+            candidates[2] = 0.0
+            candidates[3] = seed
+            np.clip(candidates, _LOW, _HIGH, out=candidates)
+            candidates[:, 1::2] %= 360.0
+            cost = self._rollout_cost(candidates, state, target, env, pp_x, pp_y)
+
+            order = np.argsort(cost)
+            if cost[order[0]] < best_cost:
+                best, best_cost = candidates[order[0]].copy(), float(cost[order[0]])
+            # Nuova media e dispersione dai migliori (azimuth: media circolare)
+            elite = candidates[order[:self.elite]]
+            mean = elite.mean(axis=0)
+            rad = np.radians(elite[:, 1::2])
+            mean[1::2] = np.degrees(np.arctan2(np.sin(rad).mean(axis=0), np.cos(rad).mean(axis=0))) % 360.0
+            spread = elite - mean
+            spread[:, 1::2] = (spread[:, 1::2] + 180.0) % 360.0 - 180.0
+            sigma = np.maximum(spread.std(axis=0), _SIGMA_MIN)
+            iterations += 1
+            self.iteration_time = max(time.perf_counter() - it0, 0.9 * self.iteration_time)
+
+        if best is None:
+            # Nessuna iterazione nel budget: regolatore PD senza predizione
+            # (la stima della durata intanto cala, al prossimo tick si riprova)
+            best, best_cost = seed, math.nan
+            self.iteration_time *= 0.9
+        elapsed = time.perf_counter() - t0
+        self.mean, self.sigma = best, sigma
+        self.previous = best[:4].copy()
+        self.ticks += 1
+        self.overruns += elapsed > self.budget
+        self.last_iterations = iterations
+        self.last_cost = best_cost
+        self.timing.record("mpc", elapsed)
+        return tuple(best[:4].tolist())
+
+    def report(self):
+        # Tempi per tick (ultimi 200, ms, candidato PD compreso) e quota di
+        # tick oltre il budget; seed_*: tempo del solo candidato PD
+        summary = self.timing.summary()
+        out = dict(summary.get("mpc", {}))
+        seed = summary.get("seed", {})
+        out.update({
+            "seed_p50_ms": seed.get("p50_ms", 0.0),
+            "seed_p95_ms": seed.get("p95_ms", 0.0),
+            "budget_ms": self.budget * 1e3,
+            "ticks": self.ticks,
+            "over_budget_pct": 100.0 * self.overruns / self.ticks if self.ticks else 0.0,
+            "iterations": self.last_iterations,
+            "rollouts": self.last_iterations * self.samples,
+            "cost": self.last_cost,
+        })
+        return out
+
+
+if __name__ == "__main__":
+    from environment import Environment, uniform_from_nautical
+
+    parser = argparse.ArgumentParser(description="Station keeping con l'autopilota DP (simulazione a passo SIM_DT)")
+    parser.add_argument("--hold", type=float, default=30.0, help="punto da tenere a N metri a Nord della partenza")
+    parser.add_argument("--current", type=float, default=0.0, help="corrente verso Est [kn]")
+    parser.add_argument("--wind", type=float, default=0.0, help="vento da Nord [kn]")
+    parser.add_argument("--duration", type=float, default=120.0, help="durata [s]")
+    parser.add_argument("--tick", type=float, default=0.5, help="intervallo tra due tick dell'autopilota [s]")
+    parser.add_argument("--budget", type=float, default=10.0, help="budget per tick [ms]")
+    args = parser.parse_args()
+
+    current = uniform_from_nautical(args.current, 90) if args.current > 0 else None
+    wind = uniform_from_nautical(args.wind, 0, coming_from=True) if args.wind > 0 else None
+    environment = Environment(current, wind) if current is not None or wind is not None else None
+    engine = PhysicsEngine(environment=environment)
+    autopilot = DPAutopilot(engine.vessel, budget=args.budget / 1e3)
+    autopilot.hold(0.0, args.hold, math.pi / 2)
+
+    tick_steps = max(int(round(args.tick / SIM_DT)), 1)
+    controls = (0.0, 0.0, 0.0, 0.0)
+    errors = []
+    for i in range(int(round(args.duration / SIM_DT))):
+        state = engine.state
+        if i % tick_steps == 0:
+            env = environment.sample(state[0], state[1]) if environment is not None else None
+            controls = autopilot.solve(state, env, engine.vessel.pp_x, engine.vessel.pp_y)
+        p1, a1, p2, a2 = controls
+        engine.update(SIM_DT, power_to_thrust(p1, engine.vessel), a1, power_to_thrust(p2, engine.vessel), a2,
+                      engine.vessel.pp_x, engine.vessel.pp_y)
+        errors.append((math.hypot(state[0], state[1] - args.hold), math.degrees(_wrap(state[2] - math.pi / 2))))
+
+    errors = np.array(errors)
+    last = errors[len(errors) // 2:]
+    print(f"seconda meta': errore posizione medio {last[:, 0].mean():.2f} m (max {last[:, 0].max():.2f}), "
+          f"prora {np.abs(last[:, 1]).mean():.2f}° (max {np.abs(last[:, 1]).max():.2f})")
+    report = autopilot.report()
+    print(f"tick: p50 {report['p50_ms']:.1f} ms, p95 {report['p95_ms']:.1f} ms, max budget {report['budget_ms']:.0f} ms, "
+          f"oltre budget {report['over_budget_pct']:.0f}%, {report['rollouts']} rollout/tick, "
+          f"candidato PD p95 {report['seed_p95_ms']:.2f} ms")
@@ -0,0 +1,222 @@
+import argparse
+import datetime
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+
+from constants import *
+from physics import PhysicsEngine, euler_step
+from vector_math import check_wash_hit, intersect_lines
+from manoeuvres import fast_side_step_settings, slow_side_step_settings
+from simulation import SIM_DT, power_to_thrust, run_simulation, run_steps
+import kernels
+from control_vectors import control_vectors
+from renderer import CenterPanelRenderer
+from response_table import physics_key
+from track import TrackHistory
+from vessel import DEFAULT_VESSEL, PRESETS, get_vessel
+from wash import wash_table
+
+# Benchmark dei percorsi caldi e verifica dei target di taratura.
+#   python benchmark.py [--output risultati.json] [--quick] [--strict] [--vessel NOME]
+# Il JSON contiene tempi (prestazioni) e controlli fisici (taratura), per
+# confrontare versioni diverse. Con --strict esce con codice 1 se un
+# controllo fisico non rispetta la tolleranza. I tempi sono per la nave
+# scelta; i controlli fisici verificano la taratura di constants.py e usano
+# sempre la nave di default.
+
+KNOTS = 1.94384
+
+
+# --- MISURA ---
+def time_calls(fn, number, repeat=5):
+    # Tempo per chiamata [us]: migliore e mediana su `repeat` blocchi da `number`
+    fn()
+    samples = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        for j in range(number):
+            fn()
+        samples.append((time.perf_counter() - t0) / number * 1e6)
+    return {"best_us": min(samples), "median_us": float(np.median(samples)), "calls": number * repeat}
+
+
+def bench_physics_update(n_steps, vessel=DEFAULT_VESSEL):
+    engine = PhysicsEngine(vessel=vessel)
+    thrust = power_to_thrust(75, vessel)
+    t0 = time.perf_counter()
+    for i in range(n_steps):
+        engine.update(SIM_DT, thrust, 15, thrust, 15, DEFAULT_PP_X, DEFAULT_PP_Y)
+    elapsed = time.perf_counter() - t0
+    return {"steps": n_steps, "steps_per_second": n_steps / elapsed, "realtime_factor": n_steps * SIM_DT / elapsed}
+
+
+def bench_run_steps(n_steps, vessel=DEFAULT_VESSEL):
+    # Molti passi a comandi costanti (tempo accelerato), per ogni backend disponibile
+    thrust = power_to_thrust(75, vessel)
+    current = kernels.get_backend()
+    results = {}
+    try:
+        for backend in kernels.available_backends():
+            kernels.set_backend(backend)
+            run_steps(PhysicsEngine(vessel=vessel), 10, SIM_DT, thrust, 15, thrust, 15, DEFAULT_PP_X, DEFAULT_PP_Y)  # compilazione
+            engine = PhysicsEngine(vessel=vessel)
+            t0 = time.perf_counter()
+            run_steps(engine, n_steps, SIM_DT, thrust, 15, thrust, 15, DEFAULT_PP_X, DEFAULT_PP_Y)
+            results[backend] = {"steps": n_steps, "steps_per_second": n_steps / (time.perf_counter() - t0)}
+    finally:
+        kernels.set_backend(current)
+    return results
+
+
+def bench_solvers(number, vessel=DEFAULT_VESSEL):
+    wash = np.array([-10.0, -20.0])
+    pos_sx, pos_dx = np.array(vessel.pos_sx), np.array(vessel.pos_dx)
+    return {
+        "solve_fast_side_step": time_calls(lambda: fast_side_step_settings("DRITTA", DEFAULT_PP_Y, vessel), number),
+        "apply_slow_side_step": time_calls(lambda: slow_side_step_settings("DRITTA", DEFAULT_PP_Y, vessel), number),
+        "check_wash_hit": time_calls(lambda: check_wash_hit(pos_sx, wash, pos_dx), number),
+        "wash_efficiencies": time_calls(lambda: wash_table(vessel).efficiencies(20.0, 30, 20.0, 330), number),
+        "intersect_lines": time_calls(lambda: intersect_lines(pos_sx, 30, pos_dx, 330), number),
+    }
+
+
+def _center_panel_frame(renderer, track, state, p1, a1, p2, a2, prediction, vessel=DEFAULT_VESSEL):
+    # Stessi passi del pannello centrale in app.py, fino al PNG di st.pyplot
+    cv = control_vectors(p1, a1, p2, a2, DEFAULT_PP_X, DEFAULT_PP_Y, vessel)
+    renderer.update_wash(a1, p1, a2, p2)
+    renderer.update_pivot(DEFAULT_PP_X, DEFAULT_PP_Y)
+    renderer.update_arrows(cv.F_sx_eff, cv.F_dx_eff, cv.origin_res, cv.res_vec)
+    renderer.update_construction(cv.inter, cv.F_sx_eff, cv.F_dx_eff, cv.res_vec, True)
+    if prediction:
+        renderer.update_prediction(state, track, 80.0)
+        renderer.update_propellers(a1, a2, show=False)
+    else:
+        renderer.update_propellers(a1, a2)
+    renderer.set_mode(prediction, 80.0)
+    buf = io.BytesIO()
+    renderer.fig.savefig(buf, format="png", bbox_inches="tight", dpi=200)
+    return len(buf.getvalue())
+
+
+def bench_center_panel(frames, vessel=DEFAULT_VESSEL):
+    renderer = CenterPanelRenderer(np.array(vessel.pos_sx), np.array(vessel.pos_dx), vessel)
+    engine = PhysicsEngine(vessel=vessel)
+    track = TrackHistory()
+    thrust = power_to_thrust(75, vessel)
+    traj = run_simulation(engine, 50.0, thrust, 15, thrust, 15, DEFAULT_PP_X, DEFAULT_PP_Y)
+    track.extend(traj.states)
+    results = {}
+    for name, prediction in (("static", False), ("prediction", True)):
+        azimuths = np.linspace(0, 359, frames).astype(int)
+        # Ogni passata parte a cache vuota, come comandi sempre nuovi nell'app
+        control_vectors.cache_clear()
+        _center_panel_frame(renderer, track, engine.state, 50, 0, 50, 0, prediction, vessel)
+        times = []
+        for a in azimuths:
+            t0 = time.perf_counter()
+            _center_panel_frame(renderer, track, engine.state, 60, int(a), 40, int(360 - a) % 360, prediction, vessel)
+            times.append((time.perf_counter() - t0) * 1e3)
+        results[name] = {"frames": frames, "median_ms": float(np.median(times)), "p95_ms": float(np.percentile(times, 95))}
+    return results
+
+
+# --- TARGET FISICI (note di taratura in constants.py) ---
+def _check(name, measured, target, tolerance, unit, note):
+    return {"name": name, "measured": float(measured), "target": target, "tolerance": tolerance, "unit": unit,
+            "passed": bool(abs(measured - target) <= tolerance), "note": note}
+
+
+def physics_checks():
+    checks = []
+
+    # 75% potenza + 15° azimuth su entrambi -> rotazione 180° in 30s
+    engine = PhysicsEngine()
+    traj = run_simulation(engine, 30.0, power_to_thrust(75), 15, power_to_thrust(75), 15, DEFAULT_PP_X, DEFAULT_PP_Y)
+    turn = np.degrees(np.unwrap(traj.states[:, 2]))
+    checks.append(_check("turn_30s_75pct_15deg", abs(turn[-1] - turn[0]), 180.0, 20.0, "deg",
+                         "75% potenza + 15° azimuth -> rotazione 180° in 30s"))
+
+    # 5t di spinta laterale pura -> ~1.2 kt di sway a regime
+    state = [0.0, 0.0, np.pi / 2, 0.0, 0.0, 0.0]
+    forces = (0.0, 5.0 * 1000 * G_ACCEL, 0.0)
+    for i in range(int(300.0 / SIM_DT)):
+        state = euler_step(state, SIM_DT, forces, DEFAULT_PP_X, DEFAULT_PP_Y)
+    checks.append(_check("sway_5t_steady", abs(state[4]) * KNOTS, 1.2, 0.1, "kn",
+                         "5t di spinta laterale -> ~1.2 kt di sway"))
+
+    # Velocita' massime a tutta forza
+    for name, azimuth, target in (("max_speed_forward", 0, MAX_SPEED_FORWARD_KT), ("max_speed_reverse", 180, MAX_SPEED_REVERSE_KT)):
+        engine = PhysicsEngine()
+        traj = run_simulation(engine, 300.0, MAX_THRUST, azimuth, MAX_THRUST, azimuth, DEFAULT_PP_X, DEFAULT_PP_Y)
+        checks.append(_check(name, abs(traj.states[-1, 3]) * KNOTS, target, 0.3, "kn",
+                             "V_max da QUADRATIC_DAMPING_SURGE_*"))
+    return checks
+
+
+def _git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmarks(quick=False, vessel=DEFAULT_VESSEL):
+    scale = 0.1 if quick else 1.0
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "vessel": vessel.name,
+            "physics_key": physics_key(vessel),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "matplotlib": matplotlib.__version__,
+            "machine": platform.machine(),
+            "physics_backend": kernels.get_backend(),
+            "quick": quick,
+        },
+        "physics_update": bench_physics_update(int(20000 * scale), vessel),
+        "run_steps": bench_run_steps(int(200000 * scale), vessel),
+        "solvers": bench_solvers(int(2000 * scale), vessel),
+        "center_panel": bench_center_panel(max(int(20 * scale), 3), vessel),
+        "physics_checks": physics_checks(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark e controlli di taratura")
+    parser.add_argument("--output", default="benchmark_results.json", help="file JSON dei risultati ('-' per stdout)")
+    parser.add_argument("--quick", action="store_true", help="meno ripetizioni, per controlli rapidi")
+    parser.add_argument("--strict", action="store_true", help="codice di uscita 1 se un controllo fisico fallisce")
+    parser.add_argument("--vessel", default=DEFAULT_VESSEL.name, choices=list(PRESETS), help="nave per le misure di tempo")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.quick, get_vessel(args.vessel))
+    text = json.dumps(results, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"Risultati salvati in {args.output}")
+        print(f"PhysicsEngine.update: {results['physics_update']['steps_per_second']:.0f} passi/s")
+        for name, r in results["run_steps"].items():
+            print(f"run_steps ({name}): {r['steps_per_second']:.0f} passi/s")
+        for name, r in results["solvers"].items():
+            print(f"{name}: {r['median_us']:.1f} us")
+        for name, r in results["center_panel"].items():
+            print(f"pannello centrale ({name}): {r['median_ms']:.1f} ms")
+        for c in results["physics_checks"]:
+            print(f"[{'OK' if c['passed'] else 'FALLITO'}] {c['name']}: {c['measured']:.2f} {c['unit']} (target {c['target']} ± {c['tolerance']})")
+
+    if args.strict and not all(c["passed"] for c in results["physics_checks"]):
+        sys.exit(1)
@@ -0,0 +1,246 @@
+import argparse
+import concurrent.futures
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+
+from constants import *
+from physics import BatchPhysicsEngine
+from manoeuvres import fast_side_step_settings
+from simulation import SIM_DT
+
+# Calibrazione dei coefficienti idrodinamici contro le prove in mare.
+#   python calibrate.py --random 2000 --trials prove.json
+#   python calibrate.py --grid SHIP_MASS=500000:700000:5 --grid ANGULAR_DAMPING=1.2e7:2.4e7:7
+# Ogni set di coefficienti esegue le manovre standard; i set sono divisi in
+# lotti (--batch) simulati in blocco con BatchPhysicsEngine (una riga per set),
+# e i lotti sono distribuiti sui core con un pool di processi.
+# prove.json: {"metrica": valore} oppure {"metrica": {"value": v, "weight": w}}.
+
+PARAMS = ("SHIP_MASS", "MOMENT_OF_INERTIA", "QUADRATIC_DAMPING_SURGE_FORWARD",
+          "QUADRATIC_DAMPING_SURGE_REVERSE", "QUADRATIC_DAMPING_SWAY", "ANGULAR_DAMPING")
+KNOTS = 1.94384
+
+# Target di default: le note di taratura in constants.py
+DEFAULT_TRIALS = {
+    "max_speed_forward_kn": MAX_SPEED_FORWARD_KT,
+    "max_speed_reverse_kn": MAX_SPEED_REVERSE_KT,
+    "turn_180_time_s": 30.0,
+}
+
+
+def current_params():
+    return np.array([globals()[name] for name in PARAMS], dtype=float)
+
+
+def _engine(params):
+    mass, inertia, dsf, dsr, dsw, drot = params.T
+    return BatchPhysicsEngine(len(params), mass=mass, inertia=inertia, damping_surge_forward=dsf,
+                              damping_surge_reverse=dsr, damping_sway=dsw, damping_rot=drot)
+
+
+def _thrust(power_pct):
+    return power_pct / 100.0 * MAX_THRUST
+
+
+# --- MANOVRE (vettoriali sul lotto di coefficienti) ---
+def speed_trial(params, dt, duration=300.0):
+    # Tutta avanti / tutta indietro fino a regime
+    out = {}
+    for name, azimuth in (("max_speed_forward_kn", 0), ("max_speed_reverse_kn", 180)):
+        engine = _engine(params)
+        for i in range(int(duration / dt)):
+            engine.update(dt, MAX_THRUST, azimuth, MAX_THRUST, azimuth, DEFAULT_PP_X, DEFAULT_PP_Y)
+        out[name] = np.abs(engine.states[:, 3]) * KNOTS
+    return out
+
+
+def turning_trial(params, dt, duration=120.0):
+    # 75% + 15° su entrambi da fermo: tempo per 180° di accostata,
+    # poi rateo e diametro di evoluzione a regime (ultimi 30 s)
+    engine = _engine(params)
+    n = int(duration / dt)
+    heading_change = np.zeros(len(params))
+    t_180 = np.full(len(params), np.nan)
+    r_acc, speed_acc, n_avg = 0.0, 0.0, 0
+    for i in range(n):
+        engine.update(dt, _thrust(75), 15, _thrust(75), 15, DEFAULT_PP_X, DEFAULT_PP_Y)
+        st = engine.states
+        heading_change += st[:, 5] * dt
+        t_180 = np.where(np.isnan(t_180) & (np.abs(heading_change) >= np.pi), (i + 1) * dt, t_180)
+        if (i + 1) * dt > duration - 30.0:
+            r_acc = r_acc + st[:, 5]
+            speed_acc = speed_acc + np.hypot(st[:, 3], st[:, 4])
+            n_avg += 1
+    r_ss, speed_ss = r_acc / n_avg, speed_acc / n_avg
+    with np.errstate(divide='ignore'):
+        diameter = 2.0 * speed_ss / np.abs(r_ss)
+    return {"turn_180_time_s": t_180, "turn_rate_deg_min": np.degrees(np.abs(r_ss)) * 60, "turn_diameter_m": diameter}
+
+
+def crash_stop_trial(params, dt, duration=180.0):
+    # Da tutta avanti a regime (velocita' analitica del set) a tutta indietro:
+    # tempo e spazio di arresto (prima volta che u <= 0)
+    engine = _engine(params)
+    engine.states[:, 3] = np.sqrt(2 * MAX_THRUST / params[:, 2])
+    stop_time = np.full(len(params), np.nan)
+    stop_dist = np.full(len(params), np.nan)
+    for i in range(int(duration / dt)):
+        engine.update(dt, MAX_THRUST, 180, MAX_THRUST, 180, DEFAULT_PP_X, DEFAULT_PP_Y)
+        st = engine.states
+        just_stopped = np.isnan(stop_time) & (st[:, 3] <= 0)
+        stop_time = np.where(just_stopped, (i + 1) * dt, stop_time)
+        stop_dist = np.where(just_stopped, np.hypot(st[:, 0], st[:, 1]), stop_dist)
+    return {"crash_stop_time_s": stop_time, "crash_stop_distance_m": stop_dist}
+
+
+def side_step_trial(params, dt, duration=120.0):
+    # Fast side step a dritta (solver dell'app): sway e rotazione a regime
+    p1, a1, p2, a2 = fast_side_step_settings("DRITTA", DEFAULT_PP_Y)
+    engine = _engine(params)
+    n = int(duration / dt)
+    v_acc, r_acc, n_avg = 0.0, 0.0, 0
+    for i in range(n):
+        engine.update(dt, _thrust(p1), a1, _thrust(p2), a2, DEFAULT_PP_X, DEFAULT_PP_Y)
+        if (i + 1) * dt > duration - 30.0:
+            v_acc = v_acc + engine.states[:, 4]
+            r_acc = r_acc + engine.states[:, 5]
+            n_avg += 1
+    return {"side_step_speed_kn": np.abs(v_acc / n_avg) * KNOTS, "side_step_yaw_deg_min": np.degrees(r_acc / n_avg) * 60}
+
+
+MANOEUVRES = {
+    "speed": (speed_trial, ("max_speed_forward_kn", "max_speed_reverse_kn")),
+    "turning": (turning_trial, ("turn_180_time_s", "turn_rate_deg_min", "turn_diameter_m")),
+    "crash_stop": (crash_stop_trial, ("crash_stop_time_s", "crash_stop_distance_m")),
+    "side_step": (side_step_trial, ("side_step_speed_kn", "side_step_yaw_deg_min")),
+}
+METRICS = tuple(m for _, names in MANOEUVRES.values() for m in names)
+
+
+def evaluate_batch(params, metrics, dt):
+    # Un task del pool: (B, len(PARAMS)) -> (B, len(metrics)). Si eseguono
+    # solo le manovre che producono le metriche richieste.
+    results = {}
+    for fn, names in MANOEUVRES.values():
+        if any(m in metrics for m in names):
+            results.update(fn(params, dt))
+    return np.column_stack([results[m] for m in metrics])
+
+
+# --- CAMPIONAMENTO ---
+def random_samples(n, spread, names, rng):
+    # Fattori uniformi in [1 - spread, 1 + spread] sui parametri scelti
+    base = current_params()
+    samples = np.tile(base, (n, 1))
+    for name in names:
+        j = PARAMS.index(name)
+        samples[:, j] = base[j] * rng.uniform(1 - spread, 1 + spread, n)
+    samples[0] = base  # il set attuale sempre incluso come riferimento
+    return samples
+
+
+def grid_samples(specs):
+    # specs: ["NOME=min:max:n", ...]; i parametri non indicati restano quelli attuali
+    base = current_params()
+    axes = []
+    for spec in specs:
+        name, rng_spec = spec.split("=")
+        if name not in PARAMS:
+            raise ValueError(f"Parametro sconosciuto: {name} (validi: {', '.join(PARAMS)})")
+        lo, hi, n = rng_spec.split(":")
+        axes.append((PARAMS.index(name), np.linspace(float(lo), float(hi), int(n))))
+    rows = []
+    for values in itertools.product(*(a[1] for a in axes)):
+        row = base.copy()
+        for (j, _), value in zip(axes, values):
+            row[j] = value
+        rows.append(row)
+    return np.array(rows)
+
+
+def load_trials(path):
+    # -> (metriche, valori, pesi)
+    if path is None:
+        trials = DEFAULT_TRIALS
+    else:
+        with open(path) as f:
+            trials = json.load(f)
+    names, values, weights = [], [], []
+    for name, spec in trials.items():
+        if name not in METRICS:
+            raise ValueError(f"Metrica sconosciuta: {name} (valide: {', '.join(METRICS)})")
+        if not isinstance(spec, dict):
+            spec = {"value": spec}
+        names.append(name)
+        values.append(float(spec["value"]))
+        weights.append(float(spec.get("weight", 1.0)))
+    return names, np.array(values), np.array(weights)
+
+
+def cost(measured, values, weights):
+    # Somma pesata degli errori relativi al quadrato; inf se una metrica manca
+    rel = (measured - values) / np.where(values != 0, np.abs(values), 1.0)
+    c = (weights * rel**2).sum(axis=1)
+    return np.where(np.isfinite(c), c, np.inf)
+
+
+def run_sweep(samples, metrics, dt=SIM_DT, batch=256, workers=None):
+    chunks = [samples[i:i + batch] for i in range(0, len(samples), batch)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) == 1:
+        return np.vstack([evaluate_batch(c, metrics, dt) for c in chunks])
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        return np.vstack(list(pool.map(evaluate_batch, chunks, itertools.repeat(metrics), itertools.repeat(dt))))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrazione di massa, inerzia e damping contro le prove in mare")
+    parser.add_argument("--trials", help="JSON con i valori misurati (default: note di taratura in constants.py)")
+    parser.add_argument("--random", type=int, default=1000, help="numero di set casuali (se non si usa --grid)")
+    parser.add_argument("--spread", type=float, default=0.3, help="variazione relativa massima per --random")
+    parser.add_argument("--params", nargs="+", default=list(PARAMS), choices=PARAMS, help="parametri da variare con --random")
+    parser.add_argument("--grid", action="append", metavar="NOME=min:max:n", help="griglia su un parametro (ripetibile)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dt", type=float, default=SIM_DT, help="passo di integrazione [s]")
+    parser.add_argument("--batch", type=int, default=256, help="set di coefficienti per task")
+    parser.add_argument("--workers", type=int, default=None, help="processi (default: tutti i core)")
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--output", help="JSON con tutti i risultati")
+    args = parser.parse_args()
+
+    names, values, weights = load_trials(args.trials)
+    if args.grid:
+        samples = grid_samples(args.grid)
+    else:
+        samples = random_samples(args.random, args.spread, args.params, np.random.default_rng(args.seed))
+
+    t0 = time.perf_counter()
+    measured = run_sweep(samples, names, dt=args.dt, batch=args.batch, workers=args.workers)
+    elapsed = time.perf_counter() - t0
+    costs = cost(measured, values, weights)
+    order = np.argsort(costs)
+    print(f"{len(samples)} set valutati in {elapsed:.1f} s ({len(samples) / elapsed:.0f} set/s)")
+
+    for rank, i in enumerate(order[:args.top], 1):
+        print(f"\n#{rank}  costo {costs[i]:.4g}")
+        for name, value in zip(PARAMS, samples[i]):
+            print(f"  {name} = {value:.6g}")
+        for name, m, target in zip(names, measured[i], values):
+            print(f"    {name}: {m:.3f} (prova {target:g})")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "trials": dict(zip(names, values.tolist())),
+                "params": list(PARAMS),
+                "best": {"params": dict(zip(PARAMS, samples[order[0]].tolist())), "cost": float(costs[order[0]]),
+                         "metrics": dict(zip(names, measured[order[0]].tolist()))},
+                "samples": samples.tolist(),
+                "metrics": np.where(np.isfinite(measured), measured, None).tolist(),
+                "costs": np.where(np.isfinite(costs), costs, None).tolist(),
+            }, f, indent=1)
+        print(f"\nRisultati salvati in {args.output}")
@@ -45,6 +45,12 @@ QUADRATIC_DAMPING_SWAY = 135000.0
 # Benchmark: 75% potenza + 15° azimuth -> rotazione 180° in 30s
 ANGULAR_DAMPING = 18000000.0      
 
+# Vento: forza = 0.5 * rho * Cd * area * velocita' relativa^2
+AIR_DENSITY = 1.225
+WIND_DRAG_COEFF = 0.9
+WIND_AREA_FRONT = 85.0     # m^2, sezione frontale sopra l'acqua
+WIND_AREA_SIDE = 180.0     # m^2, fiancata e sovrastrutture
+
 # Offset
 THRUSTER_X_OFFSET = POS_THRUSTERS_X
 THRUSTER_Y_OFFSET = POS_THRUSTERS_Y
@@ -53,3 +59,10 @@ THRUSTER_Y_OFFSET = POS_THRUSTERS_Y
 SCREEN_WIDTH = 1200
 SCREEN_HEIGHT = 800
 COLOR_SEA = '#B0C4DE' # LightSteelBlue
+
+# Traccia (storico posizioni in predizione)
+# Ultimi TRACK_CAPACITY passi a piena risoluzione (1000 x 0.05s = 50s), poi
+# uno ogni TRACK_DECIMATION nell'archivio (7200 x 0.5s = 1 ora)
+TRACK_CAPACITY = 1000
+TRACK_ARCHIVE_CAPACITY = 7200
+TRACK_DECIMATION = 10
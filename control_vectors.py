@@ -0,0 +1,100 @@
+import functools
+from collections import namedtuple
+
+import numpy as np
+
+from constants import *
+from vector_math import intersect_lines
+from vessel import DEFAULT_VESSEL
+from wash import wash_table
+
+# Grandezze del pannello comandi che dipendono solo dai comandi
+# (p1, a1, p2, a2, pp_x, pp_y) e dalla nave: spinte con penalita' di scia,
+# risultante e suo punto di applicazione, momenti al pivot, tabella motori.
+# Niente stato e niente streamlit: i risultati restano in cache per chiave,
+# cosi' i rerun a comandi invariati (es. in predizione) non rifanno i conti.
+# Gli array restituiti sono in sola lettura (condivisi tra i rerun).
+
+# Perdita di scia sotto la quale non si segnala nulla
+WASH_NOTICE = 0.01
+
+ControlVectors = namedtuple("ControlVectors", [
+    "ton1_set", "ton2_set",          # spinte impostate [t]
+    "loss_sx", "loss_dx",            # perdite per scia (frazione, wash.py)
+    "wash_sx_hits_dx", "wash_dx_hits_sx",
+    "ton1_eff", "ton2_eff",          # spinte dopo la penalita' di scia [t]
+    "F_sx_eff", "F_dx_eff",          # vettori (dritta, prua) [t]
+    "res_vec", "res_ton", "direction",   # risultante [t] e direzione nautica [deg]
+    "inter", "origin_res",           # incrocio delle linee d'azione (o None) e origine della risultante
+    "M_sx", "M_dx", "M_tm_PP", "M_knm",  # momenti al pivot [t*m], totale in kNm
+    "table",                         # tabella motori (markdown)
+])
+
+
+def _readonly(*arrays):
+    for a in arrays:
+        if a is not None:
+            a.flags.writeable = False
+    return arrays
+
+
+def _penalty(loss):
+    return f"SÌ (-{loss:.0%})" if loss >= WASH_NOTICE else "NO"
+
+
+def _engine_table(p1, a1, p2, a2, ton1_set, ton2_set, ton1_eff, ton2_eff, loss_sx, loss_dx):
+    rows = [
+        ("Potenza (%)", p1, p2),
+        ("Azimuth (°)", a1, a2),
+        ("Spinta Teorica (t)", f"{ton1_set:.1f}", f"{ton2_set:.1f}"),
+        ("Wash Penalty", _penalty(loss_sx), _penalty(loss_dx)),
+        ("Spinta Effettiva (t)", f"{ton1_eff:.1f}", f"{ton2_eff:.1f}"),
+    ]
+    lines = ["| Parametro | Propulsore SX | Propulsore DX |", "|---|---|---|"]
+    lines.extend(f"| {name} | {sx} | {dx} |" for name, sx, dx in rows)
+    return "\n".join(lines)
+
+
+@functools.lru_cache(maxsize=256)
+def control_vectors(p1, a1, p2, a2, pp_x, pp_y, vessel=DEFAULT_VESSEL):
+    pos_sx, pos_dx = np.array(vessel.pos_sx), np.array(vessel.pos_dx)
+    ton1_set = (p1 / 100) * vessel.bollard_pull
+    ton2_set = (p2 / 100) * vessel.bollard_pull
+    rad1, rad2 = np.radians(a1), np.radians(a2)
+
+    F_sx_v = np.array([ton1_set * np.sin(rad1), ton1_set * np.cos(rad1)])
+    F_dx_v = np.array([ton2_set * np.sin(rad2), ton2_set * np.cos(rad2)])
+
+    # Scia di un propulsore sull'altro: stessa tabella della fisica
+    eff_sx, eff_dx = wash_table(vessel).efficiencies(ton1_set, a1, ton2_set, a2)
+    loss_sx, loss_dx = 1.0 - eff_sx, 1.0 - eff_dx
+
+    F_sx_eff = F_sx_v * eff_sx
+    F_dx_eff = F_dx_v * eff_dx
+    ton1_eff, ton2_eff = ton1_set * eff_sx, ton2_set * eff_dx
+
+    res_vec = F_sx_eff + F_dx_eff
+    res_ton = np.sqrt(res_vec[0]**2 + res_vec[1]**2)
+    direction = np.degrees(np.arctan2(res_vec[0], res_vec[1])) % 360
+
+    # Risultante applicata all'incrocio delle linee d'azione se vicino allo
+    # scafo, altrimenti alla media pesata dei propulsori
+    inter = intersect_lines(pos_sx, a1, pos_dx, a2)
+    if inter is not None and np.linalg.norm(inter) <= 50.0:
+        origin_res = inter
+    else:
+        origin_res = np.array([(ton1_eff * pos_sx[0] + ton2_eff * pos_dx[0]) / (ton1_eff + ton2_eff + 0.001), vessel.thruster_y])
+
+    # Momenti al pivot manuale (+ = accosta a dritta)
+    pp = np.array([pp_x, pp_y])
+    arm_sx = pos_sx - pp
+    arm_dx = pos_dx - pp
+    M_sx = -(arm_sx[0] * F_sx_eff[1] - arm_sx[1] * F_sx_eff[0])
+    M_dx = -(arm_dx[0] * F_dx_eff[1] - arm_dx[1] * F_dx_eff[0])
+    M_tm_PP = M_sx + M_dx
+
+    _readonly(F_sx_eff, F_dx_eff, res_vec, inter, origin_res)
+    table = _engine_table(p1, a1, p2, a2, ton1_set, ton2_set, ton1_eff, ton2_eff, loss_sx, loss_dx)
+    return ControlVectors(ton1_set, ton2_set, loss_sx, loss_dx, loss_dx >= WASH_NOTICE, loss_sx >= WASH_NOTICE, ton1_eff, ton2_eff,
+                          F_sx_eff, F_dx_eff, res_vec, res_ton, direction, inter, origin_res,
+                          M_sx, M_dx, M_tm_PP, M_tm_PP * G_ACCEL, table)
@@ -0,0 +1,132 @@
+import json
+import math
+import os
+
+import numpy as np
+
+# Vento e corrente: campi vettoriali in coordinate mondo (x = Est, y = Nord),
+# componenti [Est, Nord] in m/s, campionati nella posizione della nave a ogni
+# passo. Un campo a griglia regolare si carica da:
+#   .npz  variabili x (nx,), y (ny,), u (ny, nx), v (ny, nx) come in un
+#         NetCDF; letto tutto in memoria
+#   .npy  array (ny, nx, 2) + file .json accanto con x0, y0, dx, dy; letto in
+#         memory mapping, quindi anche campi piu' grandi della RAM
+# L'interpolazione e' bilineare; fuori dalla griglia vale il bordo.
+# Il campionamento tiene in cache i quattro nodi della cella corrente: la
+# nave resta nella stessa cella per molti passi, quindi di solito non si
+# tocca l'array (ne' il disco) e il costo e' di poche operazioni su float.
+
+KNOTS = 1.94384
+
+
+class UniformField:
+    def __init__(self, east, north):
+        self.value = (float(east), float(north))
+
+    def sample(self, x, y):
+        return self.value
+
+
+def uniform_from_nautical(speed_kn, direction_deg, coming_from=False):
+    # Direzione nautica (0 = Nord, 90 = Est). La corrente si indica verso dove
+    # va, il vento da dove viene (coming_from=True).
+    rad = math.radians(direction_deg + (180.0 if coming_from else 0.0))
+    speed = speed_kn / KNOTS
+    return UniformField(speed * math.sin(rad), speed * math.cos(rad))
+
+
+class GridField:
+    def __init__(self, data, x0, y0, dx, dy):
+        # data: (ny, nx, 2), anche np.memmap; nodo [j, i] in (x0 + i*dx, y0 + j*dy)
+        if data.ndim != 3 or data.shape[2] != 2 or data.shape[0] < 2 or data.shape[1] < 2:
+            raise ValueError(f"Campo a griglia: attesa forma (ny>=2, nx>=2, 2), trovata {data.shape}")
+        if dx <= 0 or dy <= 0:
+            raise ValueError("Campo a griglia: dx e dy devono essere positivi")
+        self.data = data
+        self.x0, self.y0 = float(x0), float(y0)
+        self.dx, self.dy = float(dx), float(dy)
+        self.inv_dx, self.inv_dy = 1.0 / self.dx, 1.0 / self.dy
+        self.ny, self.nx = data.shape[0], data.shape[1]
+        # Cache della cella corrente: indici della posizione e nodi
+        self._i = self._j = None
+        self._load_cell(0, 0)
+
+    @property
+    def extent(self):
+        # (x_min, x_max, y_min, y_max)
+        return (self.x0, self.x0 + (self.nx - 1) * self.dx, self.y0, self.y0 + (self.ny - 1) * self.dy)
+
+    def sample(self, x, y):
+        fx = (x - self.x0) * self.inv_dx
+        fy = (y - self.y0) * self.inv_dy
+        i = int(fx) if fx > 0.0 else 0
+        j = int(fy) if fy > 0.0 else 0
+        if i != self._i or j != self._j:
+            self._load_cell(i, j)
+        # Fuori griglia: bordo (tx, ty limitati a [0, 1] nella cella di bordo)
+        tx = fx - self._ci
+        ty = fy - self._cj
+        if tx < 0.0: tx = 0.0
+        elif tx > 1.0: tx = 1.0
+        if ty < 0.0: ty = 0.0
+        elif ty > 1.0: ty = 1.0
+
+        e00, v00, e10, v10, e01, v01, e11, v11 = self._corners
+        e0 = e00 + (e10 - e00) * tx
+        e1 = e01 + (e11 - e01) * tx
+        n0 = v00 + (v10 - v00) * tx
+        n1 = v01 + (v11 - v01) * tx
+        return e0 + (e1 - e0) * ty, n0 + (n1 - n0) * ty
+
+    def _load_cell(self, i, j):
+        # (i, j): indici grezzi della posizione, la cella letta e' limitata alla griglia
+        ci = i if i < self.nx - 2 else self.nx - 2
+        cj = j if j < self.ny - 2 else self.ny - 2
+        (n00, n10), (n01, n11) = self.data[cj:cj + 2, ci:ci + 2].tolist()
+        self._corners = (n00[0], n00[1], n10[0], n10[1], n01[0], n01[1], n11[0], n11[1])
+        self._i, self._j = i, j
+        self._ci, self._cj = ci, cj
+
+
+def _sidecar(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+def save_field(path, data, x0, y0, dx, dy):
+    # Scrive il formato .npy + .json (leggibile in memory mapping)
+    np.save(path, np.asarray(data, dtype=np.float32))
+    with open(_sidecar(path), "w") as f:
+        json.dump({"x0": x0, "y0": y0, "dx": dx, "dy": dy}, f)
+
+
+def load_field(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npy":
+        data = np.load(path, mmap_mode="r")
+        with open(_sidecar(path)) as f:
+            grid = json.load(f)
+        return GridField(data, grid["x0"], grid["y0"], grid["dx"], grid["dy"])
+    if ext == ".npz":
+        with np.load(path) as f:
+            x, y = np.asarray(f["x"], dtype=float), np.asarray(f["y"], dtype=float)
+            data = np.stack([f["u"], f["v"]], axis=-1)
+        if len(x) < 2 or len(y) < 2:
+            raise ValueError(f"{path}: servono almeno 2 nodi per asse")
+        dx, dy = x[1] - x[0], y[1] - y[0]
+        if not (np.allclose(np.diff(x), dx) and np.allclose(np.diff(y), dy)):
+            raise ValueError(f"{path}: la griglia deve essere regolare")
+        return GridField(data, x[0], y[0], dx, dy)
+    raise ValueError(f"Formato di campo non supportato: {ext} (usare .npy o .npz)")
+
+
+class Environment:
+    # Corrente e vento insieme; ciascuno puo' mancare (None = assente)
+    def __init__(self, current=None, wind=None):
+        self.current = current
+        self.wind = wind
+
+    def sample(self, x, y):
+        # -> (corrente Est, Nord, vento Est, Nord) [m/s], l'argomento env di physics
+        ce, cn = self.current.sample(x, y) if self.current is not None else (0.0, 0.0)
+        we, wn = self.wind.sample(x, y) if self.wind is not None else (0.0, 0.0)
+        return ce, cn, we, wn
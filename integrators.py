@@ -0,0 +1,176 @@
+import math
+
+from constants import *
+from physics import environment_terms, euler_step, state_derivative
+from vessel import DEFAULT_VESSEL
+
+# Tutti gli integratori hanno la firma di physics.euler_step:
+#   step(state, dt, forces, pp_x, pp_y, vessel, env) -> nuovo stato [x, y, psi, u, v, r]
+# e si passano a PhysicsEngine(integrator=...).
+
+TWO_PI = 2 * math.pi
+
+
+def _deadband(state, forces, vessel=DEFAULT_VESSEL, env=None):
+    # Stessa soglia di euler_step: ferma la nave (rispetto all'acqua) quando
+    # non c'e' spinta
+    X_force_body, Y_force_body, N_moment_total = forces
+    u_c = v_c = 0.0
+    if env is not None:
+        u_c, v_c, X_wind, Y_wind = environment_terms(state[2], state[3], state[4], env, vessel)
+        X_force_body += X_wind
+        Y_force_body += Y_wind
+    if abs(X_force_body) < 0.1 and abs(state[3] - u_c) < 0.01: state[3] = u_c
+    if abs(Y_force_body) < 0.1 and abs(state[4] - v_c) < 0.01: state[4] = v_c
+    if abs(N_moment_total) < 1000 and abs(state[5]) < 0.001: state[5] = 0.0
+    return state
+
+
+def semi_implicit_euler_step(state, dt, forces, pp_x, pp_y, vessel=DEFAULT_VESSEL, env=None):
+    # Eulero semi-implicito: i termini quadratici di damping sono linearizzati
+    # e trattati implicitamente (k*|v|*v_new), cosi' il passo resta stabile
+    # anche con damping_rot e damping_sway elevati.
+    # Le posizioni usano le velocita' aggiornate (simplettico).
+    # Con la corrente il damping agisce sulla velocita' relativa u - u_c.
+    x, y, psi, u, v, r = state
+    X_force_body, Y_force_body, N_moment_total = forces
+    u_c = v_c = 0.0
+    if env is not None:
+        u_c, v_c, X_wind, Y_wind = environment_terms(psi, u, v, env, vessel)
+        X_force_body += X_wind
+        Y_force_body += Y_wind
+    u_r, v_r = u - u_c, v - v_c
+
+    if u_r >= 0:
+        damping_surge = vessel.damping_surge_forward
+    else:
+        damping_surge = vessel.damping_surge_reverse
+
+    F_damping_surge = -(damping_surge * u_r * abs(u_r))
+    F_damping_sway  = -(vessel.damping_sway * v_r * abs(v_r))
+    N_induced = (pp_x * F_damping_surge) - (pp_y * F_damping_sway)
+
+    inv_m, inv_i = vessel.inv_mass, vessel.inv_inertia
+    k_u = dt * damping_surge * abs(u_r) * inv_m
+    k_v = dt * vessel.damping_sway * abs(v_r) * inv_m
+    u_new = (u + dt * ((X_force_body * inv_m) + r * v) + k_u * u_c) / (1.0 + k_u)
+    v_new = (v + dt * ((Y_force_body * inv_m) - r * u) + k_v * v_c) / (1.0 + k_v)
+    r_new = (r + dt * (N_moment_total + N_induced) * inv_i) / (1.0 + dt * vessel.damping_rot * abs(r) * inv_i)
+
+    new = _deadband([x, y, psi, u_new, v_new, r_new], forces, vessel, env)
+    u_new, v_new, r_new = new[3], new[4], new[5]
+
+    c, s = math.cos(psi), math.sin(psi)
+    new[0] = x + (u_new * c - v_new * s) * dt
+    new[1] = y + (u_new * s + v_new * c) * dt
+    new[2] = (psi + r_new * dt) % TWO_PI
+    return new
+
+
+def rk4_step(state, dt, forces, pp_x, pp_y, vessel=DEFAULT_VESSEL, env=None):
+    # env (vento e corrente) campionato a inizio passo, costante sul passo
+    k1 = state_derivative(state, forces, pp_x, pp_y, vessel, env)
+    k2 = state_derivative([a + 0.5 * dt * b for a, b in zip(state, k1)], forces, pp_x, pp_y, vessel, env)
+    k3 = state_derivative([a + 0.5 * dt * b for a, b in zip(state, k2)], forces, pp_x, pp_y, vessel, env)
+    k4 = state_derivative([a + dt * b for a, b in zip(state, k3)], forces, pp_x, pp_y, vessel, env)
+    new = [a + (dt / 6.0) * (b1 + 2.0 * b2 + 2.0 * b3 + b4) for a, b1, b2, b3, b4 in zip(state, k1, k2, k3, k4)]
+    new[2] %= TWO_PI
+    return _deadband(new, forces, vessel, env)
+
+
+# --- DORMAND-PRINCE 5(4) ---
+_DP_A = (
+    (),
+    (1/5,),
+    (3/40, 9/40),
+    (44/45, -56/15, 32/9),
+    (19372/6561, -25360/2187, 64448/6561, -212/729),
+    (9017/3168, -355/33, 46732/5247, 49/176, -5103/18656),
+    (35/384, 0.0, 500/1113, 125/192, -2187/6784, 11/84),
+)
+# Differenza tra la soluzione di ordine 5 e quella di ordine 4
+_DP_E = (71/57600, 0.0, -71/16695, 71/1920, -17253/339200, 22/525, -1/40)
+
+
+class AdaptiveRK45:
+    # Runge-Kutta adattivo (Dormand-Prince) con controllo dell'errore.
+    # Ogni chiamata copre l'intervallo dt con sotto-passi di ampiezza variabile;
+    # l'ultimo passo accettato viene ricordato per la chiamata successiva.
+    # evaluations conta le valutazioni di state_derivative.
+    def __init__(self, rtol=1e-6, atol=1e-6, h_max=None, h_min=1e-6):
+        self.rtol = rtol
+        self.atol = atol
+        self.h_max = h_max
+        self.h_min = h_min
+        self.h = None
+        self.evaluations = 0
+
+    def __call__(self, state, dt, forces, pp_x, pp_y, vessel=DEFAULT_VESSEL, env=None):
+        y = list(state)
+        t = 0.0
+        h_prop = self.h if self.h is not None else dt
+        if self.h_max is not None: h_prop = min(h_prop, self.h_max)
+        k1 = state_derivative(y, forces, pp_x, pp_y, vessel, env)
+        self.evaluations += 1
+
+        while t < dt:
+            h = min(h_prop, dt - t)
+            k = [k1]
+            for i in range(1, 7):
+                a = _DP_A[i]
+                yi = [y[j] + h * sum(a[m] * k[m][j] for m in range(i)) for j in range(6)]
+                k.append(state_derivative(yi, forces, pp_x, pp_y, vessel, env))
+            self.evaluations += 6
+
+            # L'ultimo stadio coincide con la soluzione di ordine 5 (FSAL)
+            err = 0.0
+            for j in range(6):
+                e = h * sum(_DP_E[m] * k[m][j] for m in range(7))
+                sc = self.atol + self.rtol * max(abs(y[j]), abs(yi[j]))
+                err += (e / sc) ** 2
+            err = math.sqrt(err / 6)
+
+            accepted = err <= 1.0 or h <= self.h_min
+            if accepted:
+                factor = 5.0 if err == 0 else min(5.0, 0.9 * err ** -0.2)
+            else:
+                factor = max(0.2, 0.9 * err ** -0.2)
+            h_next = max(h * factor, self.h_min)
+            if self.h_max is not None: h_next = min(h_next, self.h_max)
+
+            if accepted:
+                t += h
+                y = yi
+                k1 = k[6]
+                # Un passo accorciato per chiudere l'intervallo non riduce la proposta
+                h_prop = max(h_prop, h_next) if h < h_prop else h_next
+            else:
+                h_prop = h_next
+
+        self.h = h_prop
+        y[2] %= TWO_PI
+        return _deadband(y, forces, vessel, env)
+
+
+def _fixed_step(name, step):
+    # Integratori a passo fisso: funzioni senza stato ne' opzioni
+    def factory(**kwargs):
+        if kwargs:
+            raise ValueError(f"L'integratore {name} non accetta opzioni: {', '.join(kwargs)}")
+        return step
+    return factory
+
+
+INTEGRATORS = {
+    "euler": _fixed_step("euler", euler_step),
+    "semi_implicit": _fixed_step("semi_implicit", semi_implicit_euler_step),
+    "rk4": _fixed_step("rk4", rk4_step),
+    "rk45": AdaptiveRK45,
+}
+
+
+def get_integrator(name, **kwargs):
+    # Gli integratori con stato (rk45) vanno istanziati per ogni motore
+    if name not in INTEGRATORS:
+        raise ValueError(f"Integratore sconosciuto: {name} (disponibili: {', '.join(INTEGRATORS)})")
+    return INTEGRATORS[name](**kwargs)
@@ -0,0 +1,121 @@
+import importlib.util
+import math
+import os
+
+import numpy as np
+
+from constants import *
+from physics import euler_step
+from vessel import DEFAULT_VESSEL
+
+# Kernel compilato per molti passi di Eulero a comandi costanti (stesse
+# operazioni, nello stesso ordine, di physics.euler_step: risultati identici
+# bit per bit). numba e' opzionale: se manca si usa il ciclo di riferimento
+# su euler_step. Scelta del backend: variabile d'ambiente ASD_SIM_BACKEND
+# ("auto", "numba", "python") oppure set_backend() a runtime. numba si importa
+# (e il kernel si compila) al primo uso del backend, non all'import del modulo:
+# l'avvio dell'app non paga il secondo abbondante dell'import di numba.
+
+BACKENDS = ("python", "numba")
+
+
+def euler_steps_kernel(state0, n_steps, dt, X_force_body, Y_force_body, N_moment_total, pp_x, pp_y,
+                       damping_surge_forward, damping_surge_reverse, damping_sway, damping_rot, inv_mass, inv_inertia, out):
+    # out: array (n_steps + 1, 6), riga 0 = stato iniziale.
+    # I parametri della nave arrivano come scalari (da VesselParams).
+    x, y, psi, u, v, r = state0[0], state0[1], state0[2], state0[3], state0[4], state0[5]
+    out[0, 0] = x; out[0, 1] = y; out[0, 2] = psi; out[0, 3] = u; out[0, 4] = v; out[0, 5] = r
+    for i in range(1, n_steps + 1):
+        # --- 3. DAMPING (RESISTENZE) ---
+        if u >= 0:
+            damping_surge = damping_surge_forward
+        else:
+            damping_surge = damping_surge_reverse
+
+        F_damping_surge = -(damping_surge * u * abs(u))
+        F_damping_sway  = -(damping_sway * v * abs(v))
+        N_damping_rot   = -(damping_rot * r * abs(r))
+
+        N_induced = (pp_x * F_damping_surge) - (pp_y * F_damping_sway)
+
+        # --- 4. INTEGRAZIONE (BODY FRAME) ---
+        X_tot = X_force_body + F_damping_surge
+        Y_tot = Y_force_body + F_damping_sway
+        N_tot = N_moment_total + N_damping_rot + N_induced
+
+        u_dot = (X_tot * inv_mass) + (r * v)
+        v_dot = (Y_tot * inv_mass) - (r * u)
+        r_dot = N_tot * inv_inertia
+
+        u_new = u + u_dot * dt
+        v_new = v + v_dot * dt
+        r_new = r + r_dot * dt
+
+        if abs(X_force_body) < 0.1 and abs(u_new) < 0.01: u_new = 0.0
+        if abs(Y_force_body) < 0.1 and abs(v_new) < 0.01: v_new = 0.0
+        if abs(N_moment_total) < 1000 and abs(r_new) < 0.001: r_new = 0.0
+
+        # --- 5. CONVERSIONE IN WORLD FRAME ---
+        c, s = math.cos(psi), math.sin(psi)
+        x += (u_new * c - v_new * s) * dt
+        y += (u_new * s + v_new * c) * dt
+        psi = (psi + r_new * dt) % (2 * math.pi)
+        u, v, r = u_new, v_new, r_new
+        out[i, 0] = x; out[i, 1] = y; out[i, 2] = psi; out[i, 3] = u; out[i, 4] = v; out[i, 5] = r
+    return out
+
+
+_compiled_kernel = None
+_backend = None
+
+
+def _numba_installed():
+    return importlib.util.find_spec("numba") is not None
+
+
+def _kernel():
+    global _compiled_kernel
+    if _compiled_kernel is None:
+        import numba
+        # Niente fastmath: contrazioni FMA o riordini cambierebbero l'ultimo bit
+        _compiled_kernel = numba.njit(cache=True)(euler_steps_kernel)
+    return _compiled_kernel
+
+
+def available_backends():
+    return [name for name in BACKENDS if name == "python" or _numba_installed()]
+
+
+def set_backend(name="auto"):
+    global _backend
+    if name == "auto":
+        name = "numba" if _numba_installed() else "python"
+    if name not in available_backends():
+        raise ValueError(f"Backend non disponibile: {name} (disponibili: {', '.join(available_backends())})")
+    _backend = name
+    return name
+
+
+def get_backend():
+    if _backend is None:
+        set_backend(os.environ.get("ASD_SIM_BACKEND", "auto"))
+    return _backend
+
+
+def euler_steps(state, n_steps, dt, forces, pp_x, pp_y, out=None, vessel=DEFAULT_VESSEL):
+    # n_steps passi di physics.euler_step a forze costanti, col backend scelto.
+    # Restituisce la traiettoria (n_steps + 1, 6), stato iniziale incluso.
+    n_steps = int(n_steps)
+    if out is None:
+        out = np.empty((n_steps + 1, 6))
+    if get_backend() == "numba":
+        X, Y, N = forces
+        return _kernel()(np.asarray(state, dtype=float), n_steps, float(dt), float(X), float(Y), float(N), float(pp_x), float(pp_y),
+                                *vessel.coefficients, out)
+
+    s = list(state)
+    out[0] = s
+    for i in range(1, n_steps + 1):
+        s = euler_step(s, dt, forces, pp_x, pp_y, vessel)
+        out[i] = s
+    return out
@@ -0,0 +1,89 @@
+import copy
+
+import numpy as np
+
+from constants import *
+from physics import PhysicsEngine
+from simulation import SIM_DT, run_steps
+
+# Previsione dei prossimi `horizon` secondi ai comandi attuali, per la traccia
+# tratteggiata e le sagome a +10/+20/+30 s. La previsione si tiene da un
+# frame all'altro: se comandi, integratore e ambiente non sono cambiati e il
+# motore e' arrivato esattamente nello stato previsto (a passo fisso
+# l'integrazione e' deterministica), si integrano solo i passi che mancano in
+# coda; altrimenti si ricalcola dallo stato attuale. Ogni frame costa quindi
+# quanto i passi avanzati dal motore, non tutto l'orizzonte.
+# Un motore di appoggio fa i conti, senza toccare quello dell'app.
+
+MARKS = (10.0, 20.0, 30.0)
+
+
+class LookAhead:
+    def __init__(self, horizon=30.0, dt=SIM_DT, marks=MARKS):
+        self.dt = dt
+        self.n = int(round(horizon / dt))
+        self.mark_steps = [min(int(round(m / dt)), self.n) for m in marks]
+        # Stati previsti in buffer[start:end] (end - start = n + 1 quando
+        # valida); spazio per altri n passi prima di ricompattare
+        self.buffer = np.empty((2 * self.n + 1, 6))
+        self.start = self.end = 0
+        self.key = None
+        self.engine = None
+        # Passi integrati all'ultimo frame e ricalcoli completi
+        self.last_steps = 0
+        self.recomputes = 0
+
+    def invalidate(self):
+        self.key = None
+
+    def _scratch(self, engine):
+        # Motore di appoggio con lo stesso modello; gli integratori con stato
+        # (rk45) vengono copiati per non toccare quello dell'app
+        ours = self.engine
+        if ours is None or ours.vessel is not engine.vessel or ours.environment is not engine.environment \
+                or ours.source_integrator is not engine.integrator:
+            ours = self.engine = PhysicsEngine(copy.copy(engine.integrator), engine.vessel, engine.environment)
+            ours.source_integrator = engine.integrator
+            self.key = None
+        return ours
+
+    def _integrate(self, scratch, n_steps, controls):
+        scratch.state[:] = self.buffer[self.end - 1]
+        traj = run_steps(scratch, n_steps, self.dt, *controls)
+        self.buffer[self.end:self.end + n_steps] = traj.states[1:]
+        self.end += n_steps
+        self.last_steps = n_steps
+
+    def update(self, engine, steps, left_thrust, left_angle, right_thrust, right_angle, pp_x, pp_y):
+        # steps: passi fatti dal motore dall'ultimo update
+        controls = (left_thrust, left_angle, right_thrust, right_angle, pp_x, pp_y)
+        scratch = self._scratch(engine)
+        start = self.start + int(steps)
+        if self.key == controls and start < self.end and np.array_equal(self.buffer[start], engine.state):
+            if start + self.n + 1 > len(self.buffer):
+                # Ricompatta all'inizio del buffer
+                kept = self.end - start
+                self.buffer[:kept] = self.buffer[start:self.end]
+                start, self.end = 0, kept
+            self.start = start
+            missing = start + self.n + 1 - self.end
+            if missing > 0:
+                self._integrate(scratch, missing, controls)
+            else:
+                self.last_steps = 0
+            return
+
+        # Comandi cambiati (o salto nel tempo): tutto l'orizzonte da qui
+        self.buffer[0] = engine.state
+        self.start, self.end = 0, 1
+        self.key = controls
+        self._integrate(scratch, self.n, controls)
+        self.recomputes += 1
+
+    def states(self):
+        # Vista (n + 1, 6) degli stati previsti, a partire da ora
+        return self.buffer[self.start:self.end]
+
+    def marks(self):
+        # Stati previsti agli istanti di MARKS, (len(marks), 6)
+        return self.buffer[[self.start + k for k in self.mark_steps]]
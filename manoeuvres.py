@@ -0,0 +1,76 @@
+import numpy as np
+
+from constants import *
+from vessel import DEFAULT_VESSEL
+
+# Manovre preimpostate: dal pivot manuale ai comandi (p1, a1, p2, a2).
+# Funzioni pure, senza session_state: app.py le applica con set_engine_state.
+# La geometria (posizione dei propulsori) e' quella della nave passata.
+
+
+# --- SOLVER FAST SIDE STEP ---
+def fast_side_step_settings(mode, pp_y, vessel=DEFAULT_VESSEL):
+    Y_target = pp_y
+    dy = vessel.thruster_y - Y_target
+    if abs(dy) < 0.1: dy = -0.1
+
+    dx_sx = -vessel.thruster_x
+    dx_dx = vessel.thruster_x
+
+    if mode == "DRITTA":
+        p_m, a_m = 50.0, 50.0
+        rad_m = np.radians(a_m)
+        Fy_m = p_m * np.cos(rad_m)
+        Fx_m = p_m * np.sin(rad_m)
+        M_m = (dx_sx * Fy_m) - (dy * Fx_m)
+
+        Fy_s = -Fy_m
+        Fx_s = (M_m + dx_dx * Fy_s) / dy
+
+        p_s = np.sqrt(Fx_s**2 + Fy_s**2)
+        rad_s = np.arctan2(Fx_s, Fy_s)
+        a_s = np.degrees(rad_s) % 360
+        return int(p_m), int(a_m), int(p_s), int(a_s)
+    else:
+        p_m, a_m = 50.0, 310.0
+        rad_m = np.radians(a_m)
+        Fy_m = p_m * np.cos(rad_m)
+        Fx_m = p_m * np.sin(rad_m)
+        M_m = (dx_dx * Fy_m) - (dy * Fx_m)
+        Fy_s = -Fy_m
+        Fx_s = (M_m + dx_sx * Fy_s) / dy
+        p_s = np.sqrt(Fx_s**2 + Fy_s**2)
+        rad_s = np.arctan2(Fx_s, Fy_s)
+        a_s = np.degrees(rad_s) % 360
+        return int(p_s), int(a_s), int(p_m), int(a_m)
+
+
+# --- SOLVER SLOW SIDE STEP ---
+def slow_side_step_settings(direction, pp_y, vessel=DEFAULT_VESSEL):
+    Y_pp = pp_y
+    dy = Y_pp - vessel.thruster_y
+    dx = vessel.thruster_x
+
+    if abs(dy) < 0.1: dy = 0.1
+
+    # Angolo rispetto alla prua
+    alpha_deg = np.degrees(np.arctan(dx / dy))
+
+    if dy < 0: alpha_deg = 180 + alpha_deg
+
+    if direction == "DRITTA":
+        az_sx = alpha_deg
+        az_dx = 180 - alpha_deg
+    else:
+        az_dx = 360 - alpha_deg
+        az_sx = 180 + alpha_deg
+
+    return 50, int(az_sx % 360), 50, int(az_dx % 360)
+
+
+# --- TURNING ON THE SPOT ---
+def turn_on_the_spot_settings(direction):
+    if direction == "DRITTA":
+        return 50, 330, 50, 210
+    else:
+        return 50, 150, 50, 30
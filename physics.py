@@ -1,9 +1,18 @@
 import numpy as np
 import math
 from constants import *
+from vessel import DEFAULT_VESSEL
+from wash import wash_table
 
 class PhysicsEngine:
-    def __init__(self):
+    def __init__(self, integrator=None, vessel=DEFAULT_VESSEL, environment=None):
+        # integrator: funzione (state, dt, forces, pp_x, pp_y, vessel, env) ->
+        # nuovo stato, vedi integrators.py. Default: Eulero esplicito di riferimento.
+        # vessel: vessel.VesselParams (default: ASD 32m di constants.py)
+        # environment: environment.Environment (vento e corrente), None = acqua e aria ferme
+        self.integrator = integrator if integrator is not None else euler_step
+        self.vessel = vessel
+        self.environment = environment
         self.reset()
 
     def reset(self):
@@ -15,80 +24,282 @@ class PhysicsEngine:
         # r: Velocità Rotazione (Yaw rate)
         self.state = np.zeros(6)
         self.state[2] = math.pi / 2 
-        self.current_pp_y = DEFAULT_PP_Y 
+        self.current_pp_y = self.vessel.pp_y
         self.pivot_mode = "MANUAL" 
 
     def normalize_angle(self, angle):
         return angle % (2 * math.pi)
 
     def calculate_dynamic_pivot(self, left_thrust, left_angle_deg, right_thrust, right_angle_deg):
-        return DEFAULT_PP_Y
+        return self.vessel.pp_y
 
     def update(self, dt, left_thrust, left_angle, right_thrust, right_angle, pp_x, pp_y):
         self.current_pp_y = pp_y 
-        
-        u = self.state[3] # Surge (Avanti)
-        v = self.state[4] # Sway (Dritta)
-        r = self.state[5] # Yaw Rate
-
-        # --- 1. CALCOLO FORZE NEL SISTEMA NAVE (BODY FRAME) ---
-        rad_l = math.radians(left_angle)
-        rad_r = math.radians(right_angle)
-
-        surge_l = left_thrust * math.cos(rad_l)
-        sway_l  = left_thrust * math.sin(rad_l)
-        
-        surge_r = right_thrust * math.cos(rad_r)
-        sway_r  = right_thrust * math.sin(rad_r)
-
-        X_force_body = surge_l + surge_r
-        Y_force_body = sway_l + sway_r
-
-        # --- 2. CALCOLO MOMENTO ---
-        m_l = (-POS_THRUSTERS_X * surge_l) - (POS_THRUSTERS_Y * sway_l)
-        m_r = (POS_THRUSTERS_X * surge_r) - (POS_THRUSTERS_Y * sway_r)
-        N_moment_total = m_l + m_r
-
-        # --- 3. DAMPING (RESISTENZE) ---
-        if u >= 0:
-            damping_surge = QUADRATIC_DAMPING_SURGE_FORWARD
-        else:
-            damping_surge = QUADRATIC_DAMPING_SURGE_REVERSE
+        forces = thruster_forces(left_thrust, left_angle, right_thrust, right_angle, self.vessel)
+        state = self.state.tolist()
+        env = self.environment.sample(state[0], state[1]) if self.environment is not None else None
+        self.state[:] = self.integrator(state, dt, forces, pp_x, pp_y, self.vessel, env)
+
+
+def thruster_forces(left_thrust, left_angle, right_thrust, right_angle, vessel=DEFAULT_VESSEL):
+    # Restituisce (X, Y, N) nel body frame: dipende solo dai comandi,
+    # quindi a comandi costanti si puo' calcolare una volta sola.
+
+    # Perdita per interazione di scia tra i propulsori (wash.py)
+    eff_l, eff_r = wash_table(vessel).efficiencies(left_thrust, left_angle, right_thrust, right_angle)
+    left_thrust = left_thrust * eff_l
+    right_thrust = right_thrust * eff_r
+
+    # --- 1. CALCOLO FORZE NEL SISTEMA NAVE (BODY FRAME) ---
+    rad_l = math.radians(left_angle)
+    rad_r = math.radians(right_angle)
+
+    surge_l = left_thrust * math.cos(rad_l)
+    sway_l  = left_thrust * math.sin(rad_l)
+    
+    surge_r = right_thrust * math.cos(rad_r)
+    sway_r  = right_thrust * math.sin(rad_r)
+
+    X_force_body = surge_l + surge_r
+    Y_force_body = sway_l + sway_r
+
+    # --- 2. CALCOLO MOMENTO ---
+    m_l = (-vessel.thruster_x * surge_l) - (vessel.thruster_y * sway_l)
+    m_r = (vessel.thruster_x * surge_r) - (vessel.thruster_y * sway_r)
+    N_moment_total = m_l + m_r
+
+    return X_force_body, Y_force_body, N_moment_total
+
+
+def environment_terms(psi, u, v, env, vessel=DEFAULT_VESSEL):
+    # env: (corrente Est, Nord, vento Est, Nord) [m/s] nel punto della nave,
+    # da environment.Environment.sample. Restituisce la corrente nel body
+    # frame (u_c, v_c) e la forza del vento (X, Y) dalla velocita' relativa
+    # dell'aria; il vento agisce al centro nave (nessun momento).
+    cur_e, cur_n, wind_e, wind_n = env
+    c, s = math.cos(psi), math.sin(psi)
+    u_c = cur_e * c + cur_n * s
+    v_c = cur_n * c - cur_e * s
+    wind_u = (wind_e * c + wind_n * s) - u
+    wind_v = (wind_n * c - wind_e * s) - v
+    return u_c, v_c, vessel.wind_coeff_x * wind_u * abs(wind_u), vessel.wind_coeff_y * wind_v * abs(wind_v)
+
+
+def state_derivative(state, forces, pp_x, pp_y, vessel=DEFAULT_VESSEL, env=None):
+    # Funzione pura (stato, comandi) -> derivata dello stato, base per gli
+    # integratori di ordine superiore.
+    x, y, psi, u, v, r = state
+    X_force_body, Y_force_body, N_moment_total = forces
+
+    # Il damping dipende dalla velocita' relativa all'acqua
+    u_c = v_c = 0.0
+    if env is not None:
+        u_c, v_c, X_wind, Y_wind = environment_terms(psi, u, v, env, vessel)
+        X_force_body += X_wind
+        Y_force_body += Y_wind
+    u_r, v_r = u - u_c, v - v_c
+
+    damping_surge_forward, damping_surge_reverse, damping_sway, damping_rot, inv_mass, inv_inertia = vessel.coefficients
+
+    if u_r >= 0:
+        damping_surge = damping_surge_forward
+    else:
+        damping_surge = damping_surge_reverse
+
+    F_damping_surge = -(damping_surge * u_r * abs(u_r))
+    F_damping_sway  = -(damping_sway * v_r * abs(v_r))
+    N_damping_rot   = -(damping_rot * r * abs(r))
+
+    N_induced = (pp_x * F_damping_surge) - (pp_y * F_damping_sway)
+
+    u_dot = ((X_force_body + F_damping_surge) * inv_mass) + (r * v)
+    v_dot = ((Y_force_body + F_damping_sway) * inv_mass) - (r * u)
+    r_dot = (N_moment_total + N_damping_rot + N_induced) * inv_inertia
+
+    c, s = math.cos(psi), math.sin(psi)
+    return [u * c - v * s, u * s + v * c, r, u_dot, v_dot, r_dot]
+
+
+def euler_step(state, dt, forces, pp_x, pp_y, vessel=DEFAULT_VESSEL, env=None):
+    # Un passo di integrazione su float Python: state = [x, y, psi, u, v, r]
+    # (lista o tupla), restituisce la nuova lista senza toccare l'input.
+    # env: vento e corrente nel punto della nave (vedi environment_terms)
+    x, y, psi, u, v, r = state
+    X_force_body, Y_force_body, N_moment_total = forces
+
+    # Corrente: il damping usa la velocita' relativa all'acqua; il vento si
+    # somma alle forze esterne
+    u_c = v_c = 0.0
+    if env is not None:
+        u_c, v_c, X_wind, Y_wind = environment_terms(psi, u, v, env, vessel)
+        X_force_body += X_wind
+        Y_force_body += Y_wind
+    u_r, v_r = u - u_c, v - v_c
+
+    # --- 3. DAMPING (RESISTENZE) ---
+    damping_surge_forward, damping_surge_reverse, damping_sway, damping_rot, inv_mass, inv_inertia = vessel.coefficients
+
+    if u_r >= 0:
+        damping_surge = damping_surge_forward
+    else:
+        damping_surge = damping_surge_reverse
+
+    F_damping_surge = -(damping_surge * u_r * abs(u_r))
+    F_damping_sway  = -(damping_sway * v_r * abs(v_r))
+    N_damping_rot   = -(damping_rot * r * abs(r))
+    
+    N_induced = (pp_x * F_damping_surge) - (pp_y * F_damping_sway)
+    
+    # --- 4. INTEGRAZIONE (BODY FRAME) ---
+    X_tot = X_force_body + F_damping_surge
+    Y_tot = Y_force_body + F_damping_sway
+    N_tot = N_moment_total + N_damping_rot + N_induced
+    
+    # Equazioni del moto con termini di Coriolis/centripeti
+    u_dot = (X_tot * inv_mass) + (r * v)
+    v_dot = (Y_tot * inv_mass) - (r * u)
+    r_dot = N_tot * inv_inertia
+    
+    u_new = u + u_dot * dt
+    v_new = v + v_dot * dt
+    r_new = r + r_dot * dt
+
+    # Senza forze esterne la nave si ferma rispetto all'acqua
+    if abs(X_force_body) < 0.1 and abs(u_new - u_c) < 0.01: u_new = u_c
+    if abs(Y_force_body) < 0.1 and abs(v_new - v_c) < 0.01: v_new = v_c
+    if abs(N_moment_total) < 1000 and abs(r_new) < 0.001: r_new = 0.0
+
+    # --- 5. CONVERSIONE IN WORLD FRAME (PER MOVIMENTO) ---
+    c, s = math.cos(psi), math.sin(psi)
+    
+    x_dot_world = u_new * c - v_new * s
+    y_dot_world = u_new * s + v_new * c
+    
+    x += x_dot_world * dt
+    y += y_dot_world * dt
+    psi = (psi + r_new * dt) % (2 * math.pi)
+    return [x, y, psi, u_new, v_new, r_new]
+
+def batch_thruster_forces(left_thrust, left_angle, right_thrust, right_angle, vessel=DEFAULT_VESSEL):
+    # Versione vettoriale di thruster_forces (stesse operazioni, array NumPy)
+    eff_l, eff_r = wash_table(vessel).batch_efficiencies(left_thrust, left_angle, right_thrust, right_angle)
+    left_thrust = left_thrust * eff_l
+    right_thrust = right_thrust * eff_r
+
+    rad_l = np.radians(left_angle)
+    rad_r = np.radians(right_angle)
+
+    surge_l = left_thrust * np.cos(rad_l)
+    sway_l  = left_thrust * np.sin(rad_l)
+
+    surge_r = right_thrust * np.cos(rad_r)
+    sway_r  = right_thrust * np.sin(rad_r)
+
+    X_force_body = surge_l + surge_r
+    Y_force_body = sway_l + sway_r
+
+    m_l = (-vessel.thruster_x * surge_l) - (vessel.thruster_y * sway_l)
+    m_r = (vessel.thruster_x * surge_r) - (vessel.thruster_y * sway_r)
+    N_moment_total = m_l + m_r
+
+    return X_force_body, Y_force_body, N_moment_total
+
+
+class BatchPhysicsEngine:
+    # Stesso modello di PhysicsEngine.update, ma per N rimorchiatori in parallelo.
+    # Lo stato e' una matrice (N, 6) con colonne [x, y, psi, u, v, r];
+    # spinte, angoli e pivot possono essere scalari o array di lunghezza N.
+    # I parametri vengono da vessel; massa, inerzia e damping possono anche
+    # essere array di lunghezza N (una nave diversa per riga, es. calibrazione).
+    def __init__(self, n, vessel=DEFAULT_VESSEL, mass=None, inertia=None,
+                 damping_surge_forward=None, damping_surge_reverse=None, damping_sway=None, damping_rot=None):
+        self.n = int(n)
+        self.vessel = vessel
+        self.mass = vessel.mass if mass is None else mass
+        self.inertia = vessel.inertia if inertia is None else inertia
+        self.damping_surge_forward = vessel.damping_surge_forward if damping_surge_forward is None else damping_surge_forward
+        self.damping_surge_reverse = vessel.damping_surge_reverse if damping_surge_reverse is None else damping_surge_reverse
+        self.damping_sway = vessel.damping_sway if damping_sway is None else damping_sway
+        self.damping_rot = vessel.damping_rot if damping_rot is None else damping_rot
+        # Inversi calcolati una volta (come VesselParams)
+        self.inv_mass = vessel.inv_mass if mass is None else 1.0 / np.asarray(mass, dtype=float)
+        self.inv_inertia = vessel.inv_inertia if inertia is None else 1.0 / np.asarray(inertia, dtype=float)
+        self.reset()
+
+    def reset(self):
+        self.states = np.zeros((self.n, 6))
+        self.states[:, 2] = math.pi / 2
+
+    def update(self, dt, left_thrust, left_angle, right_thrust, right_angle, pp_x, pp_y, env=None):
+        # env: vento e corrente (come in euler_step), uguali per tutte le righe
+        # --- 1-2. FORZE E MOMENTO ---
+        forces = batch_thruster_forces(left_thrust, left_angle, right_thrust, right_angle, self.vessel)
+        self.step(dt, forces, pp_x, pp_y, env)
+
+    def step(self, dt, forces, pp_x, pp_y, env=None):
+        # Passo con forze dei propulsori gia' calcolate (X, Y, N) da
+        # batch_thruster_forces: a comandi costanti si calcolano una volta sola
+        st = self.states
+        u = st[:, 3]
+        v = st[:, 4]
+        r = st[:, 5]
+        X_force_body, Y_force_body, N_moment_total = forces
+
+        u_c = v_c = 0.0
+        u_r, v_r = u, v
+        if env is not None:
+            # environment_terms su tutte le righe
+            cur_e, cur_n, wind_e, wind_n = env
+            c, s = np.cos(st[:, 2]), np.sin(st[:, 2])
+            u_c = cur_e * c + cur_n * s
+            v_c = cur_n * c - cur_e * s
+            wind_u = (wind_e * c + wind_n * s) - u
+            wind_v = (wind_n * c - wind_e * s) - v
+            X_force_body = X_force_body + self.vessel.wind_coeff_x * wind_u * np.abs(wind_u)
+            Y_force_body = Y_force_body + self.vessel.wind_coeff_y * wind_v * np.abs(wind_v)
+            u_r, v_r = u - u_c, v - v_c
+
+        # --- 3. DAMPING ---
+        damping_surge = np.where(u_r >= 0, self.damping_surge_forward, self.damping_surge_reverse)
+
+        F_damping_surge = -(damping_surge * u_r * np.abs(u_r))
+        F_damping_sway  = -(self.damping_sway * v_r * np.abs(v_r))
+        N_damping_rot   = -(self.damping_rot * r * np.abs(r))
 
-        F_damping_surge = -(damping_surge * u * abs(u))
-        F_damping_sway  = -(QUADRATIC_DAMPING_SWAY * v * abs(v))
-        N_damping_rot   = -(ANGULAR_DAMPING * r * abs(r))
-        
         N_induced = (pp_x * F_damping_surge) - (pp_y * F_damping_sway)
-        
+
         # --- 4. INTEGRAZIONE (BODY FRAME) ---
         X_tot = X_force_body + F_damping_surge
         Y_tot = Y_force_body + F_damping_sway
         N_tot = N_moment_total + N_damping_rot + N_induced
-        
-        # Equazioni del moto con termini di Coriolis/centripeti
-        u_dot = (X_tot / SHIP_MASS) + (r * v)
-        v_dot = (Y_tot / SHIP_MASS) - (r * u)
-        r_dot = N_tot / MOMENT_OF_INERTIA
-        
-        self.state[3] += u_dot * dt
-        self.state[4] += v_dot * dt
-        self.state[5] += r_dot * dt
-
-        if abs(X_force_body) < 0.1 and abs(self.state[3]) < 0.01: self.state[3] = 0
-        if abs(Y_force_body) < 0.1 and abs(self.state[4]) < 0.01: self.state[4] = 0
-        if abs(N_moment_total) < 1000 and abs(self.state[5]) < 0.001: self.state[5] = 0
-
-
-        # --- 5. CONVERSIONE IN WORLD FRAME (PER MOVIMENTO) ---
-        psi = self.state[2]
-        u_body, v_body = self.state[3], self.state[4]
-        c, s = math.cos(psi), math.sin(psi)
-        
-        x_dot_world = u_body * c - v_body * s
-        y_dot_world = u_body * s + v_body * c
-        
-        self.state[0] += x_dot_world * dt
-        self.state[1] += y_dot_world * dt
-        self.state[2] += self.state[5] * dt
-        self.state[2] = self.normalize_angle(self.state[2])
+
+        u_dot = (X_tot * self.inv_mass) + (r * v)
+        v_dot = (Y_tot * self.inv_mass) - (r * u)
+        r_dot = N_tot * self.inv_inertia
+
+        u_new = u + u_dot * dt
+        v_new = v + v_dot * dt
+        r_new = r + r_dot * dt
+
+        if env is None:
+            u_new[(np.abs(X_force_body) < 0.1) & (np.abs(u_new) < 0.01)] = 0
+            v_new[(np.abs(Y_force_body) < 0.1) & (np.abs(v_new) < 0.01)] = 0
+        else:
+            # Fermi rispetto all'acqua
+            stop = (np.abs(X_force_body) < 0.1) & (np.abs(u_new - u_c) < 0.01)
+            u_new[stop] = u_c[stop]
+            stop = (np.abs(Y_force_body) < 0.1) & (np.abs(v_new - v_c) < 0.01)
+            v_new[stop] = v_c[stop]
+        r_new[(np.abs(N_moment_total) < 1000) & (np.abs(r_new) < 0.001)] = 0
+
+        st[:, 3] = u_new
+        st[:, 4] = v_new
+        st[:, 5] = r_new
+
+        # --- 5. WORLD FRAME ---
+        psi = st[:, 2]
+        c, s = np.cos(psi), np.sin(psi)
+
+        st[:, 0] += (u_new * c - v_new * s) * dt
+        st[:, 1] += (u_new * s + v_new * c) * dt
+        st[:, 2] = np.mod(psi + r_new * dt, 2 * math.pi)
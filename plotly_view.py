@@ -0,0 +1,119 @@
+import numpy as np
+import plotly.graph_objects as go
+
+from constants import *
+from visualization import hull_polygon
+from vessel import DEFAULT_VESSEL
+
+# Vista animata lato browser: il server calcola un tratto di traiettoria in un
+# colpo solo e Plotly lo riproduce con i suoi frame, senza rerun ne' PNG.
+# I frame aggiornano solo scafo e frecce di spinta; traccia passata e
+# percorso previsto sono tracce statiche, cosi' il payload resta piccolo.
+# Si inviano pochi fotogrammi chiave al secondo: plotly.js interpola
+# linearmente tra l'uno e l'altro, quindi il movimento resta fluido.
+# La figura va in pagina come HTML che avvia l'animazione da solo
+# (st.plotly_chart non la fa partire): un tratto dopo l'altro, senza click.
+
+ARROW_SCALE = 0.7
+CHUNK_SECONDS = 10.0
+KEYFRAMES_PER_SECOND = 5
+
+
+def body_to_world(points, x, y, psi):
+    # points: (..., 2) in coordinate nave -> mondo. psi = pi/2 -> prua a Nord
+    fwd = np.array([np.cos(psi), np.sin(psi)])
+    stbd = np.array([np.sin(psi), -np.cos(psi)])
+    pts = np.asarray(points)
+    return np.array([x, y]) + pts[..., 1:2] * fwd + pts[..., 0:1] * stbd
+
+
+def resample(traj, rate):
+    # Ricampiona la traiettoria (passo fisso SIM_DT) alla frequenza dei frame
+    t = np.arange(traj.t[0], traj.t[-1] + 1e-9, 1.0 / rate)
+    psi = np.unwrap(traj.states[:, 2])
+    x = np.interp(t, traj.t, traj.states[:, 0])
+    y = np.interp(t, traj.t, traj.states[:, 1])
+    return t, x, y, np.interp(t, traj.t, psi)
+
+
+def _arrow_xy(pos, force, x, y, psi):
+    start = body_to_world(pos, x, y, psi)
+    tip = body_to_world(np.asarray(pos) + np.asarray(force) * ARROW_SCALE, x, y, psi)
+    return [start[0], tip[0]], [start[1], tip[1]]
+
+
+def trajectory_figure(traj, pos_sx, pos_dx, F_sx, F_dx, history_x=(), history_y=(), keyframes_per_second=KEYFRAMES_PER_SECOND,
+                      vessel=DEFAULT_VESSEL, obstacles=()):
+    # traj: simulation.Trajectory del tratto da riprodurre
+    # obstacles: poligoni (n, 2) in coordinate mondo (scene.Obstacle.polygon)
+    t, xs, ys, psis = resample(traj, keyframes_per_second)
+    hull = hull_polygon(vessel)
+    hull = np.vstack([hull, hull[:1]])
+
+    def frame_data(i):
+        hw = body_to_world(hull, xs[i], ys[i], psis[i])
+        ax1, ay1 = _arrow_xy(pos_sx, F_sx, xs[i], ys[i], psis[i])
+        ax2, ay2 = _arrow_xy(pos_dx, F_dx, xs[i], ys[i], psis[i])
+        return [
+            dict(type='scatter', x=np.round(hw[:, 0], 2).tolist(), y=np.round(hw[:, 1], 2).tolist()),
+            dict(type='scatter', x=ax1, y=ay1),
+            dict(type='scatter', x=ax2, y=ay2),
+        ]
+
+    first = frame_data(0)
+    arrow_marker = dict(symbol='arrow', size=12, angleref='previous')
+    fig = go.Figure(
+        data=[
+            go.Scatter(x=first[0]['x'], y=first[0]['y'], fill='toself', fillcolor='rgba(0,0,255,0.08)',
+                       line=dict(color='black', width=2), name='Scafo', hoverinfo='skip'),
+            go.Scatter(x=first[1]['x'], y=first[1]['y'], mode='lines+markers', line=dict(color='red', width=3),
+                       marker=arrow_marker, name='Spinta SX', hoverinfo='skip'),
+            go.Scatter(x=first[2]['x'], y=first[2]['y'], mode='lines+markers', line=dict(color='green', width=3),
+                       marker=arrow_marker, name='Spinta DX', hoverinfo='skip'),
+            go.Scatter(x=np.round(history_x, 2), y=np.round(history_y, 2), mode='lines', line=dict(color='#333333', width=2),
+                       opacity=0.4, name='Scia', hoverinfo='skip'),
+            go.Scatter(x=traj.states[:, 0], y=traj.states[:, 1], mode='lines', line=dict(color='blue', width=1, dash='dash'),
+                       name='Previsione', hoverinfo='skip'),
+        ] + [
+            go.Scatter(x=np.append(p[:, 0], p[0, 0]), y=np.append(p[:, 1], p[0, 1]), fill='toself', fillcolor='rgba(139,119,101,0.8)',
+                       line=dict(color='black', width=1), name='Ostacolo', hoverinfo='skip')
+            for p in obstacles
+        ],
+        frames=[dict(data=frame_data(i), traces=[0, 1, 2], name=str(i)) for i in range(len(t))],
+    )
+
+    # Inquadratura fissa su tutto il tratto
+    margin = vessel.length
+    all_x = np.concatenate([xs, np.asarray(history_x, dtype=float)])
+    all_y = np.concatenate([ys, np.asarray(history_y, dtype=float)])
+    cx, cy = (all_x.min() + all_x.max()) / 2, (all_y.min() + all_y.max()) / 2
+    half = max(all_x.max() - all_x.min(), all_y.max() - all_y.min()) / 2 + margin
+
+    frame_ms = 1000.0 / keyframes_per_second
+    fig.update_layout(
+        xaxis=dict(range=[cx - half, cx + half], showgrid=True, zeroline=False, visible=True),
+        yaxis=dict(range=[cy - half, cy + half], scaleanchor='x', scaleratio=1, showgrid=True, zeroline=False),
+        plot_bgcolor=COLOR_SEA,
+        height=800,
+        margin=dict(l=10, r=10, t=30, b=10),
+        showlegend=False,
+        updatemenus=[dict(
+            type='buttons', showactive=False, x=0.02, y=0.98, xanchor='left', yanchor='top',
+            buttons=[
+                dict(label='▶', method='animate',
+                     args=[None, dict(frame=dict(duration=frame_ms, redraw=False), transition=dict(duration=frame_ms, easing='linear'), fromcurrent=True)]),
+                dict(label='⏸', method='animate',
+                     args=[[None], dict(frame=dict(duration=0, redraw=False), mode='immediate')]),
+            ],
+        )],
+    )
+    return fig
+
+
+def trajectory_html(fig, keyframes_per_second=KEYFRAMES_PER_SECOND):
+    # HTML della figura con partenza automatica; plotly.js dalla CDN (resta
+    # nella cache del browser da un tratto all'altro)
+    frame_ms = 1000.0 / keyframes_per_second
+    return fig.to_html(include_plotlyjs="cdn", full_html=False, auto_play=True,
+                       animation_opts=dict(frame=dict(duration=frame_ms, redraw=False),
+                                           transition=dict(duration=frame_ms, easing='linear')))
@@ -0,0 +1,74 @@
+import contextlib
+import io
+import json
+import time
+
+import numpy as np
+
+from track import RingBuffer
+
+# Timer con nome per le fasi di un rerun (fisica, scena, PNG, quadranti,
+# tabella...). Per ogni fase si tengono gli ultimi `window` tempi in un buffer
+# circolare e se ne calcolano i percentili. Da spento stage() restituisce un
+# contesto vuoto condiviso: il costo e' una chiamata di metodo.
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "t0")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.t0)
+        return False
+
+
+class StageProfiler:
+    def __init__(self, window=200, enabled=False):
+        self.window = int(window)
+        self.enabled = enabled
+        self.samples = {}
+
+    def stage(self, name):
+        # with profiler.stage("fisica"): ...
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        buf = self.samples.get(name)
+        if buf is None:
+            buf = self.samples[name] = RingBuffer(self.window, 1)
+        buf.append(seconds * 1e3)
+
+    def clear(self):
+        self.samples.clear()
+
+    def summary(self):
+        # {fase: {n, last_ms, p50_ms, p95_ms, p99_ms}} sugli ultimi `window` campioni
+        out = {}
+        for name, buf in self.samples.items():
+            ms = buf.view()[:, 0]
+            p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+            out[name] = {"n": len(ms), "last_ms": float(ms[-1]), "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+        return out
+
+    def to_json(self):
+        return json.dumps({"window": self.window, "stages": self.summary()}, indent=2)
+
+    def to_csv(self):
+        out = io.StringIO()
+        out.write("stage,n,last_ms,p50_ms,p95_ms,p99_ms\n")
+        for name, s in self.summary().items():
+            out.write(f"{name},{s['n']},{s['last_ms']:.3f},{s['p50_ms']:.3f},{s['p95_ms']:.3f},{s['p99_ms']:.3f}\n")
+        return out.getvalue()
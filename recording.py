@@ -0,0 +1,183 @@
+import json
+import mmap
+import struct
+
+import numpy as np
+
+from simulation import SIM_DT
+
+# Registrazione di una sessione di addestramento, su file binario colonnare:
+#   MAGIC | lunghezza header (uint32) | header JSON | colonne allineate a 64 byte
+# Colonne:
+#   states        (n, 6) float64  stato [x, y, psi, u, v, r] ad ogni passo
+#   control_index (n,)   uint32   riga di `controls` attiva al passo
+#   controls      (m, 6) float64  comandi [p1, a1, p2, a2, pp_x, pp_y], una riga per cambio
+#   control_steps (m,)   uint32   passo da cui vale ogni riga di `controls`
+# Il passo e' fisso (dt nell'header): l'indice del passo si ricava dal tempo
+# con una divisione, quindi la ricerca di un istante e' O(1).
+# Un'ora a 20 Hz: 72000 passi * 52 byte = ~3.7 MB.
+
+MAGIC = b"ASDREC01"
+ALIGN = 64
+CONTROL_FIELDS = ("p1", "a1", "p2", "a2", "pp_x", "pp_y")
+_COLUMNS = (
+    ("states", "<f8", 6),
+    ("control_index", "<u4", None),
+    ("controls", "<f8", len(CONTROL_FIELDS)),
+    ("control_steps", "<u4", None),
+)
+
+
+class Recorder:
+    # Accumula passi e cambi di comando in array che crescono per raddoppio
+    def __init__(self, dt=SIM_DT, t0=0.0, capacity=4096):
+        self.dt = float(dt)
+        self.t0 = float(t0)
+        self.n_steps = 0
+        self.n_controls = 0
+        self._states = np.empty((capacity, 6))
+        self._control_index = np.empty(capacity, dtype=np.uint32)
+        self._controls = np.empty((64, len(CONTROL_FIELDS)))
+        self._control_steps = np.empty(64, dtype=np.uint32)
+
+    @staticmethod
+    def _grow(array, needed):
+        if needed <= len(array):
+            return array
+        new = np.empty((max(needed, 2 * len(array)),) + array.shape[1:], dtype=array.dtype)
+        new[:len(array)] = array
+        return new
+
+    def set_controls(self, p1, a1, p2, a2, pp_x, pp_y):
+        # Nuova riga solo se i comandi sono cambiati; valgono dal prossimo passo registrato
+        row = (p1, a1, p2, a2, pp_x, pp_y)
+        if self.n_controls and tuple(self._controls[self.n_controls - 1]) == row:
+            return
+        self._controls = self._grow(self._controls, self.n_controls + 1)
+        self._control_steps = self._grow(self._control_steps, self.n_controls + 1)
+        self._controls[self.n_controls] = row
+        self._control_steps[self.n_controls] = self.n_steps
+        self.n_controls += 1
+
+    def extend(self, states):
+        # states: array (k, 6) dei passi successivi (es. traj.states[1:])
+        if not self.n_controls:
+            raise ValueError("set_controls() va chiamato prima di registrare i passi")
+        states = np.asarray(states, dtype=float).reshape(-1, 6)
+        end = self.n_steps + len(states)
+        self._states = self._grow(self._states, end)
+        self._control_index = self._grow(self._control_index, end)
+        self._states[self.n_steps:end] = states
+        self._control_index[self.n_steps:end] = self.n_controls - 1
+        self.n_steps = end
+
+    def truncate(self, t):
+        # Riavvolgimento: tiene i passi fino al tempo t compreso (lo stato da
+        # cui si riparte) e scarta i cambi di comando successivi. Se t e'
+        # prima dell'inizio la registrazione riparte da t, vuota.
+        # (a zero va richiamato set_controls prima di extend)
+        n = min(max(int(round((t - self.t0) / self.dt)) + 1, 0), self.n_steps)
+        if n == 0:
+            self.t0 = float(t)
+        self.n_steps = n
+        # Via le righe di comando valide da un passo scartato
+        self.n_controls = int(np.searchsorted(self._control_steps[:self.n_controls], n, side='left'))
+        return n
+
+    def columns(self):
+        return {
+            "states": self._states[:self.n_steps],
+            "control_index": self._control_index[:self.n_steps],
+            "controls": self._controls[:self.n_controls],
+            "control_steps": self._control_steps[:self.n_controls],
+        }
+
+    def to_bytes(self, meta=None):
+        # Header e colonne in un unico buffer (per il file o per st.download_button)
+        cols = self.columns()
+        layout = {}
+        header = {"version": 1, "dt": self.dt, "t0": self.t0, "n_steps": self.n_steps,
+                  "control_fields": list(CONTROL_FIELDS), "meta": meta or {}, "columns": layout}
+        # Due passate: gli offset dipendono dalla lunghezza dell'header
+        offset = 0
+        for i in range(2):
+            header_bytes = json.dumps(header).encode()
+            offset = _aligned(len(MAGIC) + 4 + len(header_bytes))
+            for name, dtype, width in _COLUMNS:
+                layout[name] = {"dtype": dtype, "shape": list(cols[name].shape), "offset": offset}
+                offset = _aligned(offset + cols[name].nbytes)
+        header_bytes = json.dumps(header).encode()
+
+        out = bytearray(offset)
+        out[:len(MAGIC)] = MAGIC
+        out[len(MAGIC):len(MAGIC) + 4] = struct.pack("<I", len(header_bytes))
+        out[len(MAGIC) + 4:len(MAGIC) + 4 + len(header_bytes)] = header_bytes
+        for name, dtype, width in _COLUMNS:
+            data = np.ascontiguousarray(cols[name], dtype=dtype)
+            start = layout[name]["offset"]
+            out[start:start + data.nbytes] = data.tobytes()
+        return bytes(out)
+
+    def save(self, path, meta=None):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes(meta))
+
+
+def _aligned(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+class Recording:
+    # Registrazione in sola lettura: le colonne sono viste sul buffer (file
+    # mappato in memoria o bytes), niente copia e niente parsing dei dati.
+    def __init__(self, buffer):
+        self._buffer = buffer
+        if len(buffer) < len(MAGIC) + 4 or bytes(buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError("Formato di registrazione non riconosciuto")
+        (header_len,) = struct.unpack("<I", bytes(buffer[len(MAGIC):len(MAGIC) + 4]))
+        start = len(MAGIC) + 4
+        self.header = json.loads(bytes(buffer[start:start + header_len]))
+        self.dt = float(self.header["dt"])
+        self.t0 = float(self.header["t0"])
+        self.n_steps = int(self.header["n_steps"])
+        self.meta = self.header.get("meta", {})
+        for name, spec in self.header["columns"].items():
+            shape = tuple(spec["shape"])
+            count = int(np.prod(shape)) if shape else 0
+            col = np.frombuffer(buffer, dtype=spec["dtype"], count=count, offset=spec["offset"]).reshape(shape)
+            setattr(self, name, col)
+        missing = [name for name, dtype, width in _COLUMNS if name not in self.header["columns"]]
+        if missing:
+            raise ValueError(f"Colonne mancanti nella registrazione: {', '.join(missing)}")
+        if len(self.states) != self.n_steps:
+            raise ValueError(f"Registrazione incoerente: {len(self.states)} stati per {self.n_steps} passi")
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @property
+    def duration(self):
+        return max(self.n_steps - 1, 0) * self.dt
+
+    def index_at(self, t):
+        # Passo piu' vicino al tempo t (secondi dall'inizio della sessione)
+        i = int(round((t - self.t0) / self.dt))
+        return min(max(i, 0), self.n_steps - 1)
+
+    def time_at(self, i):
+        return self.t0 + i * self.dt
+
+    def state_at(self, t):
+        return self.states[self.index_at(t)]
+
+    def controls_at(self, t):
+        # dict {p1, a1, p2, a2, pp_x, pp_y} attivo al tempo t
+        row = self.controls[self.control_index[self.index_at(t)]]
+        return dict(zip(CONTROL_FIELDS, row.tolist()))
+
+    def window(self, t, seconds):
+        # Stati degli ultimi `seconds` fino a t (vista, per la traccia)
+        i = self.index_at(t)
+        return self.states[max(i + 1 - int(round(seconds / self.dt)), 0):i + 1]
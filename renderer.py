@@ -0,0 +1,200 @@
+import numpy as np
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+from matplotlib.patches import FancyArrow, Polygon
+from matplotlib.transforms import Affine2D
+
+from constants import *
+from visualization import draw_static_elements, hull_silhouettes, propeller_outline, wash_vertices
+from vessel import DEFAULT_VESSEL
+
+# Scena del pannello centrale costruita una volta sola per sessione: scafo,
+# fender e cerchi dei propulsori restano fissi, mentre frecce, scie, traccia,
+# griglia e testo vengono aggiornati modificando i dati degli artisti.
+# La figura non passa da pyplot (niente registro globale da chiudere).
+
+ARROW_SCALE = 0.7
+GRID_SPACING = 50.0
+
+
+class CenterPanelRenderer:
+    def __init__(self, pos_sx, pos_dx, vessel=DEFAULT_VESSEL):
+        self.vessel = vessel
+        self.pos_sx = np.asarray(pos_sx, dtype=float)
+        self.pos_dx = np.asarray(pos_dx, dtype=float)
+
+        self.fig = Figure(figsize=(10, 12))
+        ax = self.ax = self.fig.add_subplot()
+        ax.set_facecolor(COLOR_SEA)
+        ax.set_aspect('equal')
+        ax.axis('off')
+
+        # --- STATICI ---
+        draw_static_elements(ax, self.pos_sx, self.pos_dx, vessel)
+
+        # --- DINAMICI ---
+        empty = np.zeros((4, 2))
+        self.wash_sx = ax.add_patch(Polygon(empty, facecolor='#00FFFF', alpha=0.3, edgecolor='none', zorder=1.0, visible=False))
+        self.wash_dx = ax.add_patch(Polygon(empty, facecolor='#00FFFF', alpha=0.3, edgecolor='none', zorder=1.0, visible=False))
+
+        self.pivot = ax.scatter([vessel.pp_x], [vessel.pp_y], c='yellow', s=150, zorder=20, edgecolors='black', label="Pivot")
+
+        self.arrow_sx = ax.add_patch(FancyArrow(0, 0, 0, 0, width=0.15, fc='red', ec='red', zorder=25, alpha=0.9, length_includes_head=True))
+        self.arrow_dx = ax.add_patch(FancyArrow(0, 0, 0, 0, width=0.15, fc='green', ec='green', zorder=25, alpha=0.9, length_includes_head=True))
+        self.arrow_res = ax.add_patch(FancyArrow(0, 0, 0, 0, width=0.3, fc='blue', ec='blue', alpha=0.7, zorder=26, length_includes_head=True, visible=False))
+
+        # Costruzione vettoriale: linee di azione, vettori traslati, parallelogramma
+        self.construction = [
+            ax.add_line(Line2D([], [], color='red', linestyle='--', linewidth=1.5, alpha=0.5, zorder=23)),
+            ax.add_line(Line2D([], [], color='green', linestyle='--', linewidth=1.5, alpha=0.5, zorder=23)),
+            ax.add_line(Line2D([], [], color='red', linestyle='--', linewidth=1.5, alpha=0.6, zorder=24)),
+            ax.add_line(Line2D([], [], color='green', linestyle='--', linewidth=1.5, alpha=0.6, zorder=24)),
+            ax.add_line(Line2D([], [], color='green', linestyle='--', linewidth=2.0, alpha=0.8, zorder=24)),
+            ax.add_line(Line2D([], [], color='red', linestyle='--', linewidth=2.0, alpha=0.8, zorder=24)),
+        ]
+
+        self.prop_sx = ax.add_line(Line2D([], [], color='red', lw=2, zorder=10, alpha=0.8))
+        self.prop_dx = ax.add_line(Line2D([], [], color='green', lw=2, zorder=10, alpha=0.8))
+
+        # Predizione: traccia, griglia che scorre, riquadro dati.
+        # La traccia resta in coordinate mondo: il passaggio al riferimento
+        # nave e' una trasformazione affine, non un ricalcolo dei punti.
+        self.world_to_ship = Affine2D()
+        track_style = dict(color='#333333', linewidth=2, alpha=0.4, zorder=0, transform=self.world_to_ship + ax.transData)
+        self.track = ax.add_line(Line2D([], [], **track_style))
+        self.track_archive = ax.add_line(Line2D([], [], **track_style))
+        self.track_bridge = ax.add_line(Line2D([], [], **track_style))
+        # Ostacoli della scena (scene.py), anch'essi in coordinate mondo
+        self.obstacles = ax.add_collection(PolyCollection([], facecolor='#8B7765', edgecolor='black', linewidth=1.5, alpha=0.8,
+                                                          zorder=0.5, transform=self.world_to_ship + ax.transData))
+        # Previsione ai comandi attuali (lookahead.py): traccia tratteggiata e
+        # sagome future, tutte in un'unica collezione
+        self.lookahead_track = ax.add_line(Line2D([], [], color='blue', linestyle='--', linewidth=1.5, alpha=0.6, zorder=0.6,
+                                                  transform=self.world_to_ship + ax.transData))
+        self.ghosts = ax.add_collection(PolyCollection([], facecolor='blue', alpha=0.1, edgecolor='blue', linewidth=0.5,
+                                                       zorder=0.6, transform=self.world_to_ship + ax.transData))
+        self.grid = ax.scatter([], [], c='black', s=20, alpha=0.5, zorder=0)
+        self.info = ax.text(0, 0, "", color='black', fontsize=12, family='monospace', fontweight='bold',
+                            bbox=dict(facecolor='white', alpha=0.8, edgecolor='black'))
+
+    # --- AGGIORNAMENTI ---
+    def _set_wash(self, patch, pos, angle_deg, power_pct, show):
+        verts = wash_vertices(pos, angle_deg, power_pct) if show else None
+        patch.set_visible(verts is not None)
+        if verts is not None:
+            patch.set_xy(verts)
+
+    def update_wash(self, a1, p1, a2, p2, show=True):
+        self._set_wash(self.wash_sx, self.pos_sx, a1, p1, show)
+        self._set_wash(self.wash_dx, self.pos_dx, a2, p2, show)
+
+    def update_pivot(self, pp_x, pp_y):
+        self.pivot.set_offsets([[pp_x, pp_y]])
+
+    def _set_thrust_arrow(self, arrow, pos, force):
+        sc = ARROW_SCALE
+        length = np.linalg.norm(force) * sc
+        arrow.set_data(x=pos[0], y=pos[1], dx=force[0] * sc, dy=force[1] * sc,
+                       head_width=min(0.5, length * 0.4), head_length=min(0.7, length * 0.5))
+
+    def update_arrows(self, F_sx, F_dx, origin_res, res_vec):
+        self._set_thrust_arrow(self.arrow_sx, self.pos_sx, F_sx)
+        self._set_thrust_arrow(self.arrow_dx, self.pos_dx, F_dx)
+
+        sc = ARROW_SCALE
+        res_ton = np.linalg.norm(res_vec)
+        self.arrow_res.set_visible(res_ton > 0.1)
+        if res_ton > 0.1:
+            v_res_len = res_ton * sc
+            self.arrow_res.set_data(x=origin_res[0], y=origin_res[1], dx=res_vec[0] * sc, dy=res_vec[1] * sc,
+                                    head_width=min(0.8, v_res_len * 0.4), head_length=min(1.2, v_res_len * 0.5))
+
+    def update_construction(self, inter, F_sx, F_dx, res_vec, show):
+        show = show and inter is not None and np.linalg.norm(res_vec) > 0.1
+        for line in self.construction:
+            line.set_visible(show)
+        if not show:
+            return
+        sc = ARROW_SCALE
+        tip_sx = inter + F_sx * sc
+        tip_dx = inter + F_dx * sc
+        tip_res = inter + np.asarray(res_vec) * sc
+        segments = [(self.pos_sx, inter), (self.pos_dx, inter), (inter, tip_sx), (inter, tip_dx), (tip_sx, tip_res), (tip_dx, tip_res)]
+        for line, (a, b) in zip(self.construction, segments):
+            line.set_data([a[0], b[0]], [a[1], b[1]])
+
+    def update_propellers(self, a1, a2, show=True):
+        self.prop_sx.set_visible(show)
+        self.prop_dx.set_visible(show)
+        if show:
+            x, y = propeller_outline(a1)
+            self.prop_sx.set_data(self.pos_sx[0] + x, self.pos_sx[1] + y)
+            x, y = propeller_outline(a2)
+            self.prop_dx.set_data(self.pos_dx[0] + x, self.pos_dx[1] + y)
+
+    def _set_track(self, line, points):
+        # points: vista (n, 3) [x, y, psi] della TrackHistory, nessuna copia
+        if len(points) > 1:
+            line.set_data(points[:, 0], points[:, 1])
+        else:
+            line.set_data([], [])
+
+    def update_prediction(self, state, track, zoom):
+        # state: [x, y, psi, u, v, r]; track: track.TrackHistory in coordinate mondo
+        ship_x, ship_y, ship_heading = state[0], state[1], state[2]
+        rot_angle = -(ship_heading - np.pi/2)
+        c, s = np.cos(rot_angle), np.sin(rot_angle)
+
+        self.world_to_ship.clear().translate(-ship_x, -ship_y).rotate(rot_angle)
+        recent = track.recent()
+        archive = track.archive()
+        self._set_track(self.track_archive, archive)
+        self._set_track(self.track, recent)
+        # raccordo tra l'ultimo punto d'archivio e il primo recente
+        if len(archive) and len(recent):
+            self.track_bridge.set_data([archive[-1, 0], recent[0, 0]], [archive[-1, 1], recent[0, 1]])
+        else:
+            self.track_bridge.set_data([], [])
+
+        view_radius = zoom * 2.5
+        offset_x = ship_x % GRID_SPACING
+        offset_y = ship_y % GRID_SPACING
+        nx = int(view_radius / GRID_SPACING) + 2
+        rng = np.linspace(-view_radius, view_radius, nx * 2)
+        gx, gy = np.meshgrid(rng - offset_x, rng - offset_y)
+        self.grid.set_offsets(np.column_stack(((gx * c - gy * s).ravel(), (gx * s + gy * c).ravel())))
+
+        math_deg = np.degrees(ship_heading)
+        naut_hdg = (90 - math_deg) % 360
+        speed_kn = np.sqrt(state[3]**2 + state[4]**2) * 1.94
+        rot_deg_min = np.degrees(state[5]) * 60
+        self.info.set_text(
+            f"Pr : {naut_hdg:05.1f}°\n"
+            f"V  : {speed_kn:5.1f} kn\n"
+            f"RoT: {rot_deg_min:5.1f} °/m"
+        )
+        self.info.set_position((-zoom * 0.9, zoom * 0.75))
+
+    def set_obstacles(self, polygons):
+        # polygons: poligoni (n, 2) in coordinate mondo
+        self.obstacles.set_verts(list(polygons))
+
+    def update_lookahead(self, states, marks, show=True):
+        # states: (n, 6) stati previsti da ora; marks: stati delle sagome
+        if show:
+            self.lookahead_track.set_data(states[:, 0], states[:, 1])
+            self.ghosts.set_verts(hull_silhouettes(marks, self.vessel))
+        self.lookahead_track.set_visible(show)
+        self.ghosts.set_visible(show)
+
+    def set_mode(self, prediction, zoom=80.0):
+        for artist in (self.track, self.track_archive, self.track_bridge, self.obstacles, self.lookahead_track, self.ghosts,
+                       self.grid, self.info):
+            artist.set_visible(prediction)
+        if prediction:
+            self.ax.set_xlim(-zoom, zoom)
+            self.ax.set_ylim(-zoom, zoom)
+        else:
+            self.ax.set_xlim(-30, 30)
+            self.ax.set_ylim(-40, 40)
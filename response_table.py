@@ -0,0 +1,289 @@
+import argparse
+import hashlib
+import itertools
+import math
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from constants import *
+from physics import batch_thruster_forces
+from vessel import DEFAULT_VESSEL, PRESETS, get_vessel
+from wash import JET_CORE, JET_RADIUS, JET_SPREAD, STEP_DEG, WASH_MAX_LOSS, WASH_MIN_ALIGN
+
+# Tabella delle velocita' di regime (u, v, r) per una griglia di comandi
+# (p1, a1, p2, a2, pivot_y) di una nave. Il pivot X e' fisso (DEFAULT_PP_X,
+# salvato in tabella): con un altro pivot X i valori non valgono. La nave
+# entra nella chiave; ogni nave ha il suo file (table_path).
+# In tabella si salvano i "quadrati con segno" u|u|, v|v|, r|r|: con il
+# damping quadratico sono circa proporzionali alle forze, quindi lineari nella
+# potenza e molto piu' adatti all'interpolazione multilineare delle velocita'.
+# Il regime pero' non e' continuo: in alcune zone (es. nave in rotazione
+# veloce) piccole variazioni dei comandi lo fanno saltare su un altro ramo, e
+# infittire la griglia non basta. Per ogni cella si salva quindi l'errore
+# dell'interpolazione al centro, confrontata con la simulazione (per una
+# funzione liscia e' circa l'errore massimo nella cella, un salto che la
+# attraversa si vede come meta' del salto); le celle oltre le tolleranze
+# sono segnalate come non affidabili.
+# Il pivot Y si cambia di rado (di solito resta quello di default, che e' un
+# nodo): per ogni nodo di pivot si salva anche l'errore della cella 4-D
+# (p1, a1, p2, a2), usato quando la richiesta cade esattamente sul nodo.
+# Dentro la cella l'errore si scala con la posizione: con un errore circa
+# quadratico lungo ogni asse, all'interno vale al piu' errore al centro *
+# max_k 4*w_k*(1 - w_k) (w_k = peso lungo l'asse k), nullo sui nodi; per un
+# salto nella cella la stima resta prudente fino a meta' cella.
+# La tabella si calcola fuori dall'app (qualche minuto):
+#   python response_table.py --build [--vessel NOME]
+
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "response_table.npz")
+
+# Assi di default: (inizio, passo, numero di nodi). L'azimuth include 360 = 0
+# per poter interpolare attraverso lo zero senza casi particolari.
+DEFAULT_AXES = (
+    (0.0, 10.0, 11),     # p1 (%)
+    (0.0, 10.0, 37),     # a1 (°)
+    (0.0, 10.0, 11),     # p2 (%)
+    (0.0, 10.0, 37),     # a2 (°)
+    (-15.9, 5.3, 7),     # pivot Y (m), DEFAULT_PP_Y tra i nodi
+)
+
+# Tolleranze sull'errore stimato per cella
+MAX_SPEED_ERROR = 0.1      # u, v [m/s]
+MAX_ROT_ERROR = 0.005      # r [rad/s]
+
+# Distanza (in frazioni di passo) entro cui il pivot Y conta come nodo
+NODE_TOL = 1e-6
+
+# Versione del formato su disco (entra nella chiave)
+TABLE_VERSION = 3
+
+# Vertici dell'ipercubo 5-D usati dall'interpolazione
+_CORNERS = np.array(list(itertools.product((0, 1), repeat=5)), dtype=bool)
+
+SteadyState = namedtuple("SteadyState", ["u", "v", "r", "reliable"])
+
+
+def physics_key(vessel=DEFAULT_VESSEL):
+    # Firma dei parametri fisici: se cambiano, la tabella su disco e' da rifare
+    params = (vessel.mass, vessel.inertia, vessel.damping_surge_forward, vessel.damping_surge_reverse,
+              vessel.damping_sway, vessel.damping_rot, vessel.thruster_x, vessel.thruster_y, vessel.max_thrust, DEFAULT_PP_X,
+              JET_RADIUS, JET_SPREAD, JET_CORE, WASH_MAX_LOSS, WASH_MIN_ALIGN, STEP_DEG, TABLE_VERSION)
+    return hashlib.sha1(repr(params).encode()).hexdigest()[:16]
+
+
+def table_path(vessel=DEFAULT_VESSEL):
+    # File della tabella: quello storico per la nave di default, uno per chiave per le altre
+    if vessel == DEFAULT_VESSEL:
+        return DEFAULT_TABLE_PATH
+    return os.path.join(os.path.dirname(DEFAULT_TABLE_PATH), f"response_table_{physics_key(vessel)}.npz")
+
+
+def steady_state_velocities(X, Y, N, pp_x, pp_y, dt=0.25, settle_time=300.0, average_time=60.0, vessel=DEFAULT_VESSEL):
+    # Integra solo le velocita' nel body frame (il regime non dipende da
+    # posizione e prua) con Eulero semi-implicito vettoriale. Con il damping
+    # quadratico le piccole oscillazioni si smorzano lentamente, quindi il
+    # regime e' la media sull'ultima finestra average_time.
+    X, Y, N = np.broadcast_arrays(X, Y, N)
+    u = np.zeros(X.shape)
+    v = np.zeros(X.shape)
+    r = np.zeros(X.shape)
+    acc = np.zeros((3,) + X.shape)
+
+    mass, inertia = vessel.mass, vessel.inertia
+    damping_sway = vessel.damping_sway
+    n_settle = int(settle_time / dt)
+    n_avg = max(int(average_time / dt), 1)
+    for i in range(n_settle + n_avg):
+        damping_surge = np.where(u >= 0, vessel.damping_surge_forward, vessel.damping_surge_reverse)
+        abs_u, abs_v, abs_r = np.abs(u), np.abs(v), np.abs(r)
+        N_induced = -(pp_x * damping_surge * u * abs_u) + (pp_y * damping_sway * v * abs_v)
+
+        u_new = (u + dt * (X / mass + r * v)) / (1.0 + dt * damping_surge * abs_u / mass)
+        v_new = (v + dt * (Y / mass - r * u)) / (1.0 + dt * damping_sway * abs_v / mass)
+        r = (r + dt * (N + N_induced) / inertia) / (1.0 + dt * vessel.damping_rot * abs_r / inertia)
+        u, v = u_new, v_new
+
+        if i >= n_settle:
+            acc[0] += u
+            acc[1] += v
+            acc[2] += r
+
+    return acc / n_avg
+
+
+def _reliable(errors):
+    return (np.maximum(errors[..., 0], errors[..., 1]) <= MAX_SPEED_ERROR) & (errors[..., 2] <= MAX_ROT_ERROR)
+
+
+def _unknown_errors(shape):
+    # Tabella senza stima d'errore: nessuna cella affidabile
+    return np.full(shape + (3,), np.inf)
+
+
+def _cell_index(x, start, inv_step, last):
+    # Cella e peso lungo un asse, con i valori fuori griglia portati al bordo
+    f = (x - start) * inv_step
+    if f <= 0.0:
+        return 0, 0.0
+    i = int(f)
+    if i > last:
+        return last, 1.0
+    return i, f - i
+
+
+def _grid_velocities(grids, pp_x=DEFAULT_PP_X, vessel=DEFAULT_VESSEL, **kwargs):
+    # Velocita' di regime (..., 3) su tutte le combinazioni dei valori in grids
+    # (p1, a1, p2, a2, pivot_y)
+    p1, a1, p2, a2, pp_y = np.meshgrid(*grids, indexing='ij')
+    X, Y, N = batch_thruster_forces(p1 / 100.0 * vessel.max_thrust, a1, p2 / 100.0 * vessel.max_thrust, a2, vessel)
+    return np.moveaxis(steady_state_velocities(X, Y, N, pp_x, pp_y, vessel=vessel, **kwargs), 0, -1)
+
+
+class ResponseTable:
+    def __init__(self, axes, values, key=None, errors=None, node_errors=None, pp_x=DEFAULT_PP_X):
+        # axes: 5 tuple (inizio, passo, nodi); values: array (..., 3) con (u|u|, v|v|, r|r|)
+        # errors: errore stimato per cella (nodi - 1 per asse, 3) in (m/s, m/s, rad/s)
+        # node_errors: come errors ma per le celle 4-D su ogni nodo di pivot Y
+        # (nodi - 1 sui primi quattro assi, nodi sul pivot, 3)
+        self.axes = tuple(tuple(a) for a in axes)
+        self.values = values
+        self.key = key
+        self.errors = errors
+        self.node_errors = node_errors
+        self.pp_x = float(pp_x)
+        self._start = np.array([a[0] for a in self.axes])
+        self._step = np.array([a[1] for a in self.axes])
+        self._size = np.array([a[2] for a in self.axes])
+        self._flat = values.reshape(-1, 3)
+        strides = np.array(values.strides[:5]) // values.strides[4]
+        self._corner_offsets = _CORNERS.astype(np.intp) @ strides
+        self._strides_arr = strides
+        # Percorso scalare: (inizio, 1/passo, ultima cella) per asse, valori in
+        # float64 (np.dot senza conversioni) e affidabilita' per cella
+        self._cells = tuple((float(a[0]), 1.0 / a[1], int(a[2]) - 2) for a in self.axes)
+        self._values64 = values.astype(np.float64)
+        self._errors64 = _unknown_errors(tuple(self._size - 1)) if errors is None else errors.astype(np.float64)
+        if node_errors is None:
+            self._node_errors64 = _unknown_errors(tuple(self._size[:4] - 1) + (int(self._size[4]),))
+        else:
+            self._node_errors64 = node_errors.astype(np.float64)
+
+    @classmethod
+    def build(cls, axes=DEFAULT_AXES, pp_x=DEFAULT_PP_X, vessel=DEFAULT_VESSEL, **kwargs):
+        uvr = _grid_velocities([a[0] + a[1] * np.arange(a[2]) for a in axes], pp_x, vessel, **kwargs)
+        values = np.ascontiguousarray(uvr * np.abs(uvr), dtype=np.float32)
+        table = cls(axes, values, pp_x=pp_x)
+        # Errore per cella: interpolazione contro simulazione al centro,
+        # della cella 5-D e delle celle 4-D sui nodi di pivot Y
+        centers = [a[0] + a[1] * (np.arange(a[2] - 1) + 0.5) for a in axes]
+        nodes = centers[:4] + [axes[4][0] + axes[4][1] * np.arange(axes[4][2])]
+        errors = [np.abs(table.lookup(*np.meshgrid(*grids, indexing='ij')) - _grid_velocities(grids, pp_x, vessel, **kwargs)).astype(np.float32)
+                  for grids in (centers, nodes)]
+        return cls(axes, values, key=physics_key(vessel), errors=errors[0], node_errors=errors[1], pp_x=pp_x)
+
+    def coverage(self):
+        # Frazione di celle affidabili: 5-D e 4-D sui nodi di pivot Y
+        return float(_reliable(self._errors64).mean()), float(_reliable(self._node_errors64).mean())
+
+    def save(self, path=DEFAULT_TABLE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez_compressed(path, axes=np.array(self.axes), values=self.values, errors=self.errors, node_errors=self.node_errors,
+                            pp_x=np.array(self.pp_x), key=np.array(self.key))
+
+    @classmethod
+    def load(cls, path=DEFAULT_TABLE_PATH):
+        with np.load(path) as data:
+            axes = [(float(a), float(b), int(c)) for a, b, c in data["axes"]]
+            if "node_errors" not in data.files:
+                # Formato precedente: senza stima d'errore sui nodi, da rifare
+                return cls(axes, data["values"], key=None)
+            return cls(axes, data["values"], key=str(data["key"]), errors=data["errors"], node_errors=data["node_errors"],
+                       pp_x=float(data["pp_x"]))
+
+    def lookup(self, p1, a1, p2, a2, pp_y):
+        # Restituisce un array (..., 3) con (u [m/s], v [m/s], r [rad/s])
+        q = np.stack(np.broadcast_arrays(
+            np.asarray(p1, dtype=float), np.asarray(a1, dtype=float) % 360,
+            np.asarray(p2, dtype=float), np.asarray(a2, dtype=float) % 360,
+            np.asarray(pp_y, dtype=float)), axis=-1)
+        shape = q.shape[:-1]
+        q = q.reshape(-1, 5)
+
+        f = np.clip((q - self._start) / self._step, 0, self._size - 1)
+        i0 = np.minimum(f.astype(np.intp), self._size - 2)
+        w = f - i0
+
+        base = i0 @ self._strides_arr
+        idx = base[:, None] + self._corner_offsets
+        weights = np.where(_CORNERS, w[:, None, :], 1.0 - w[:, None, :]).prod(axis=2)
+        sq = np.einsum('nc,nck->nk', weights, self._flat[idx])
+        return (np.sign(sq) * np.sqrt(np.abs(sq))).reshape(shape + (3,))
+
+    def lookup_one(self, p1, a1, p2, a2, pp_y):
+        # Percorso veloce per un solo set di comandi (chiamato ad ogni rerun):
+        # niente array di indici, pesi dei 32 vertici in Python, una vista
+        # 2x2x2x2x2 sulla cella e un np.dot.
+        # Restituisce SteadyState(u, v, r, reliable); sui nodi di pivot Y
+        # l'errore e' quello della cella 4-D del nodo, scalato con i pesi
+        c0, c1, c2, c3, c4 = self._cells
+        i0, w0 = _cell_index(p1, *c0)
+        i1, w1 = _cell_index(a1 % 360, *c1)
+        i2, w2 = _cell_index(p2, *c2)
+        i3, w3 = _cell_index(a2 % 360, *c3)
+        i4, w4 = _cell_index(pp_y, *c4)
+        a, b, c, d = 1.0 - w0, 1.0 - w1, 1.0 - w2, 1.0 - w3
+        ab = (a * b, a * w1, w0 * b, w0 * w1)
+        cd = (c * d, c * w3, w2 * d, w2 * w3)
+        abcd = [x * y for x in ab for y in cd]
+        weights = [x * y for x in abcd for y in (1.0 - w4, w4)]
+        corners = self._values64[i0:i0 + 2, i1:i1 + 2, i2:i2 + 2, i3:i3 + 2, i4:i4 + 2]
+        u, v, r = (math.copysign(math.sqrt(abs(sq)), sq) for sq in np.dot(weights, corners.reshape(32, 3)).tolist())
+        scale = 4.0 * max(w0 * a, w1 * b, w2 * c, w3 * d)
+        if w4 <= NODE_TOL:
+            errors = self._node_errors64[i0, i1, i2, i3, i4]
+        elif w4 >= 1.0 - NODE_TOL:
+            errors = self._node_errors64[i0, i1, i2, i3, i4 + 1]
+        else:
+            errors = self._errors64[i0, i1, i2, i3, i4]
+            scale = max(scale, 4.0 * w4 * (1.0 - w4))
+        eu, ev, er = errors.tolist()
+        reliable = scale * max(eu, ev) <= MAX_SPEED_ERROR and scale * er <= MAX_ROT_ERROR
+        return SteadyState(u, v, r, reliable)
+
+
+def load_response_table(path=None, build_if_missing=True, vessel=DEFAULT_VESSEL):
+    # Carica la tabella da disco; la ricostruisce se manca o se la fisica e' cambiata
+    if path is None:
+        path = table_path(vessel)
+    if os.path.exists(path):
+        table = ResponseTable.load(path)
+        if table.key == physics_key(vessel):
+            return table
+    if not build_if_missing:
+        return None
+    table = ResponseTable.build(vessel=vessel)
+    table.save(path)
+    return table
+
+
+if __name__ == "__main__":
+    # Pre-calcolo della tabella: python response_table.py --build
+    # Senza --build mostra solo lo stato del file su disco
+    parser = argparse.ArgumentParser(description="Tabella delle velocita' di regime")
+    parser.add_argument("--build", action="store_true", help="calcola e salva la tabella (qualche minuto)")
+    parser.add_argument("--vessel", default=DEFAULT_VESSEL.name, choices=list(PRESETS), help="nave della tabella")
+    args = parser.parse_args()
+
+    vessel = get_vessel(args.vessel)
+    path = table_path(vessel)
+    if args.build:
+        table = ResponseTable.build(vessel=vessel)
+        table.save(path)
+        print(f"Tabella salvata in {path}")
+    else:
+        table = load_response_table(path, build_if_missing=False, vessel=vessel)
+        if table is None:
+            raise SystemExit(f"Tabella assente o da rifare in {path}: python response_table.py --build --vessel '{args.vessel}'")
+    cells, nodes = table.coverage()
+    print(f"{table.values.shape[:5]} nodi; celle entro le tolleranze: {cells:.0%} (5-D), {nodes:.0%} sui nodi di pivot Y")
@@ -0,0 +1,315 @@
+import functools
+import math
+from collections import namedtuple
+
+import numpy as np
+from matplotlib.path import Path
+
+from constants import *
+from physics import PhysicsEngine
+from simulation import SIM_DT
+from vessel import DEFAULT_VESSEL
+from visualization import hull_path
+
+# Scena di porto: piu' navi (ognuna col suo PhysicsEngine) e ostacoli fissi
+# (banchine, navi ormeggiate) descritti da poligoni in coordinate mondo.
+# A ogni passo si cercano contatti e avvicinamenti sotto `clearance` metri:
+#   1. fase larga: griglia uniforme (hash spaziale) sui riquadri di ingombro,
+#      solo le coppie che condividono una cella vanno avanti; gli ostacoli
+#      fissi stanno in una griglia a parte costruita una volta sola
+#   2. fase stretta: distanza minima tra i contorni (0 = contatto)
+# Con navi sparse il costo cresce circa linearmente col numero di navi.
+# check_path ripete i controlli su un tratto gia' integrato (es. un secondo
+# di predizione) e riporta l'istante del primo contatto.
+
+CONTACT = "CONTATTO"
+PROXIMITY = "DISTANZA"
+
+# t: tempo [s]; kind: CONTACT o PROXIMITY; a, b: nomi; distance: [m]
+Event = namedtuple("Event", ["t", "kind", "a", "b", "distance"])
+
+
+# --- GEOMETRIA ---
+def body_to_world(points, x, y, psi):
+    # points: (n, 2) in coordinate nave (x = dritta, y = prua) -> mondo
+    c, s = math.cos(psi), math.sin(psi)
+    out = np.empty_like(points)
+    out[:, 0] = x + points[:, 1] * c + points[:, 0] * s
+    out[:, 1] = y + points[:, 1] * s - points[:, 0] * c
+    return out
+
+
+@functools.lru_cache(maxsize=None)
+def collision_outline(vessel=DEFAULT_VESSEL, points_per_curve=6):
+    # Contorno per i controlli: lati dritti senza punti intermedi e poche
+    # suddivisioni sulle curve di prua (la fase stretta costa ~ n*m)
+    pts = []
+    t = np.linspace(0.0, 1.0, points_per_curve + 1)[:-1]
+    for segment, code in hull_path(vessel).iter_bezier():
+        if segment.degree == 1:
+            pts.append(segment.control_points[0])
+        elif segment.degree > 1:
+            pts.extend(segment.point_at_t(t))
+    outline = np.array(pts)
+    outline = outline[np.any(np.abs(outline - np.roll(outline, -1, axis=0)) > 1e-9, axis=1)]
+    outline.flags.writeable = False
+    return outline
+
+
+def _bbox(polygon):
+    return polygon[:, 0].min(), polygon[:, 1].min(), polygon[:, 0].max(), polygon[:, 1].max()
+
+
+def polygon_distance(p, q):
+    # Distanza minima tra due poligoni chiusi (n, 2), (m, 2); 0 se si toccano
+    # o si sovrappongono. Tutti i confronti lato-lato in un colpo solo a
+    # partire da w[i, j] = p[i] - q[j] (pochi array (n, m), niente cicli).
+    pd = np.concatenate((p[1:], p[:1])) - p
+    qd = np.concatenate((q[1:], q[:1])) - q
+    pdx, pdy = pd[:, 0:1], pd[:, 1:2]
+    qdx, qdy = qd[:, 0], qd[:, 1]
+    w = p[:, None, :] - q[None, :, :]
+    wx, wy = w[..., 0], w[..., 1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Lati che si attraversano: p[i] + s*pd[i] = q[j] + t*qd[j]
+        denom = pdx * qdy - pdy * qdx
+        s = (wy * qdx - wx * qdy) / denom
+        t = (wy * pdx - wx * pdy) / denom
+        if np.any((s >= 0) & (s <= 1) & (t >= 0) & (t <= 1)):
+            return 0.0
+    # Uno dentro l'altro senza lati che si attraversano
+    if Path(q).contains_point(p[0]) or Path(p).contains_point(q[0]):
+        return 0.0
+
+    # Vertici di p contro i lati di q, e vertici di q contro i lati di p
+    t1 = np.clip((wx * qdx + wy * qdy) / np.maximum(qdx * qdx + qdy * qdy, 1e-12), 0.0, 1.0)
+    d1 = ((wx - t1 * qdx) ** 2 + (wy - t1 * qdy) ** 2).min()
+    t2 = np.clip(-(wx * pdx + wy * pdy) / np.maximum(pdx * pdx + pdy * pdy, 1e-12), 0.0, 1.0)
+    d2 = ((wx + t2 * pdx) ** 2 + (wy + t2 * pdy) ** 2).min()
+    return math.sqrt(min(d1, d2))
+
+
+# --- OGGETTI DELLA SCENA ---
+class Obstacle:
+    # Ostacolo fisso: poligono (n, 2) in coordinate mondo
+    def __init__(self, name, polygon):
+        self.name = name
+        self.polygon = np.array(polygon, dtype=float)
+        self.polygon.flags.writeable = False
+        self.bbox = _bbox(self.polygon)
+
+
+def quay_wall(name, x0, y0, x1, y1, thickness=5.0):
+    # Banchina lungo il segmento (x0, y0) -> (x1, y1), spessa verso sinistra
+    dx, dy = x1 - x0, y1 - y0
+    length = math.hypot(dx, dy)
+    nx, ny = -dy / length * thickness, dx / length * thickness
+    return Obstacle(name, [(x0, y0), (x1, y1), (x1 + nx, y1 + ny), (x0 + nx, y0 + ny)])
+
+
+def moored_ship(name, length, width, x, y, psi):
+    # Nave ormeggiata: sagoma dello scafo (get_hull_path) scalata
+    outline = collision_outline(DEFAULT_VESSEL.replace(name=name, length=length, width=width), 12)
+    return Obstacle(name, body_to_world(outline, x, y, psi))
+
+
+class SceneVessel:
+    # Nave mobile: motore fisico + comandi costanti fino al prossimo set_controls
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.outline = collision_outline(engine.vessel)
+        self.radius = float(np.hypot(self.outline[:, 0], self.outline[:, 1]).max())
+        self.controls = (0.0, 0.0, 0.0, 0.0, engine.vessel.pp_x, engine.vessel.pp_y)
+
+    def set_controls(self, left_thrust, left_angle, right_thrust, right_angle, pp_x=None, pp_y=None):
+        vessel = self.engine.vessel
+        self.controls = (left_thrust, left_angle, right_thrust, right_angle,
+                         vessel.pp_x if pp_x is None else pp_x, vessel.pp_y if pp_y is None else pp_y)
+
+    def polygon(self):
+        x, y, psi = self.engine.state[:3].tolist()
+        return body_to_world(self.outline, x, y, psi)
+
+
+class Scene:
+    def __init__(self, dt=SIM_DT, clearance=5.0, cell_size=None):
+        # cell_size: lato delle celle della griglia [m]; default dal raggio
+        # della nave piu' grande (ogni nave occupa al massimo 4 celle)
+        self.dt = dt
+        self.clearance = clearance
+        self.cell_size = cell_size
+        self.time = 0.0
+        self.vessels = []
+        self.obstacles = []
+        self._static_grid = None
+        self._grid_cell = None
+
+    # --- COSTRUZIONE ---
+    def add_engine(self, name, engine):
+        # Nave con un motore esistente (es. quello dell'app)
+        sv = SceneVessel(name, engine)
+        self.vessels.append(sv)
+        return sv
+
+    def add_vessel(self, name, vessel=DEFAULT_VESSEL, x=0.0, y=0.0, psi=math.pi / 2, integrator=None, environment=None):
+        engine = PhysicsEngine(integrator, vessel, environment)
+        engine.state[:3] = (x, y, psi)
+        return self.add_engine(name, engine)
+
+    def add_obstacle(self, obstacle):
+        self.obstacles.append(obstacle)
+        self._static_grid = None
+        return obstacle
+
+    def clear_obstacles(self):
+        self.obstacles = []
+        self._static_grid = None
+
+    # --- GRIGLIA ---
+    def _cell(self):
+        if self.cell_size is not None:
+            return self.cell_size
+        radius = max((sv.radius for sv in self.vessels), default=SHIP_LENGTH / 2)
+        return 2.0 * radius + self.clearance
+
+    def _cells(self, bbox, cell):
+        # Celle toccate dal riquadro allargato di mezza clearance per lato
+        margin = 0.5 * self.clearance
+        ix0, iy0 = int(math.floor((bbox[0] - margin) / cell)), int(math.floor((bbox[1] - margin) / cell))
+        ix1, iy1 = int(math.floor((bbox[2] + margin) / cell)), int(math.floor((bbox[3] + margin) / cell))
+        return [(ix, iy) for ix in range(ix0, ix1 + 1) for iy in range(iy0, iy1 + 1)]
+
+    def _static(self, cell):
+        if self._static_grid is None or self._grid_cell != cell:
+            grid = {}
+            for k, ob in enumerate(self.obstacles):
+                for key in self._cells(ob.bbox, cell):
+                    grid.setdefault(key, []).append(k)
+            self._static_grid = grid
+            self._grid_cell = cell
+        return self._static_grid
+
+    def _near(self, a, b):
+        # Riquadri a meno di clearance (condizione necessaria)
+        c = self.clearance
+        return a[0] - c <= b[2] and b[0] - c <= a[2] and a[1] - c <= b[3] and b[1] - c <= a[3]
+
+    # --- PASSI E CONTROLLI ---
+    def candidate_pairs(self):
+        # Fase larga: coppie nave-nave (i, j) e nave-ostacolo (i, k) da
+        # verificare. Per le navi si usa il riquadro del cerchio di ingombro
+        # (centro nave, raggio massimo dello scafo): i contorni si calcolano
+        # solo per le coppie candidate.
+        cell = self._cell()
+        static = self._static(cell)
+        boxes = []
+        for sv in self.vessels:
+            x, y = sv.engine.state[:2].tolist()
+            boxes.append((x - sv.radius, y - sv.radius, x + sv.radius, y + sv.radius))
+        grid = {}
+        vessel_pairs, obstacle_pairs = set(), set()
+        for i, box in enumerate(boxes):
+            for key in self._cells(box, cell):
+                bucket = grid.setdefault(key, [])
+                for j in bucket:
+                    vessel_pairs.add((j, i))
+                bucket.append(i)
+                for k in static.get(key, ()):
+                    obstacle_pairs.add((i, k))
+        return boxes, vessel_pairs, obstacle_pairs
+
+    def check(self):
+        # Eventi di contatto / avvicinamento allo stato attuale
+        boxes, vessel_pairs, obstacle_pairs = self.candidate_pairs()
+        polygons = {}
+
+        def polygon(i):
+            if i not in polygons:
+                polygons[i] = self.vessels[i].polygon()
+            return polygons[i]
+
+        events = []
+        for i, j in sorted(vessel_pairs):
+            if self._near(boxes[i], boxes[j]):
+                self._event(events, self.vessels[i].name, self.vessels[j].name, polygon_distance(polygon(i), polygon(j)))
+        for i, k in sorted(obstacle_pairs):
+            ob = self.obstacles[k]
+            if self._near(boxes[i], ob.bbox):
+                self._event(events, self.vessels[i].name, ob.name, polygon_distance(polygon(i), ob.polygon))
+        return events
+
+    def check_path(self, index, states, times):
+        # Eventi lungo il tratto percorso dalla nave `index`: states (n, 6)
+        # agli istanti times (n,), le altre navi ferme allo stato attuale.
+        # Per ogni coppia il primo contatto, altrimenti l'avvicinamento
+        # minimo sotto clearance. Fase larga sul riquadro spazzato dal cerchio
+        # di ingombro, poi per coppia solo gli stati col riquadro vicino.
+        states = np.asarray(states, dtype=float)
+        if len(states) == 0:
+            return []
+        sv = self.vessels[index]
+        x, y, r = states[:, 0], states[:, 1], sv.radius
+        swept = (x.min() - r, y.min() - r, x.max() + r, y.max() + r)
+        targets = [(ob.name, ob.polygon, ob.bbox) for ob in self.obstacles if self._near(swept, ob.bbox)]
+        for other in self.vessels:
+            if other is not sv:
+                ox, oy = other.engine.state[:2].tolist()
+                box = (ox - other.radius, oy - other.radius, ox + other.radius, oy + other.radius)
+                if self._near(swept, box):
+                    targets.append((other.name, other.polygon(), box))
+
+        c = self.clearance
+        events = []
+        for name, polygon, box in targets:
+            near = np.flatnonzero((x - r - c <= box[2]) & (box[0] - c <= x + r) & (y - r - c <= box[3]) & (box[1] - c <= y + r))
+            closest = None
+            for k in near:
+                d = polygon_distance(body_to_world(sv.outline, *states[k, :3].tolist()), polygon)
+                if d <= 0.0:
+                    closest = (times[k], 0.0)
+                    break
+                if closest is None or d < closest[1]:
+                    closest = (times[k], d)
+            if closest is not None:
+                self._event(events, sv.name, name, closest[1], closest[0])
+        return events
+
+    def _event(self, events, a, b, distance, t=None):
+        t = self.time if t is None else float(t)
+        if distance <= 0.0:
+            events.append(Event(t, CONTACT, a, b, 0.0))
+        elif distance < self.clearance:
+            events.append(Event(t, PROXIMITY, a, b, distance))
+
+    def step(self):
+        # Un passo di tutte le navi ai loro comandi, poi i controlli
+        for sv in self.vessels:
+            sv.engine.update(self.dt, *sv.controls)
+        self.time += self.dt
+        return self.check()
+
+    def run(self, n_steps):
+        # Eventi di tutti i passi, in ordine
+        events = []
+        for i in range(int(n_steps)):
+            events.extend(self.step())
+        return events
+
+
+# --- SCENARI PER L'APP ---
+# Posizioni rispetto al rimorchiatore alla partenza (origine, prua a Nord)
+def _quay():
+    return [quay_wall("Banchina", -300.0, 150.0, 300.0, 150.0, thickness=15.0)]
+
+
+def _quay_and_ship():
+    return _quay() + [moored_ship("Nave ormeggiata", 180.0, 30.0, 0.0, 133.0, 0.0)]
+
+
+SCENARIOS = {
+    "Acqua libera": list,
+    "Banchina": _quay,
+    "Banchina + nave ormeggiata": _quay_and_ship,
+}
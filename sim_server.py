@@ -0,0 +1,457 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+from constants import *
+from physics import BatchPhysicsEngine, batch_thruster_forces
+from profiling import StageProfiler
+from simulation import SIM_DT, power_to_thrust
+from vessel import DEFAULT_VESSEL
+
+# Server di simulazione locale (opzionale): tiene gli stati di tutte le
+# sessioni in un'unica matrice (BatchPhysicsEngine, una riga per sessione) e
+# li avanza insieme a passo fisso, con un solo ciclo asyncio. Le sessioni
+# Streamlit diventano client leggeri: mandano i comandi quando cambiano e
+# leggono l'ultimo stato ricevuto.
+#
+# Protocollo: una riga JSON per messaggio su TCP (solo libreria standard).
+#   client -> server
+#     {"type": "controls", "p1", "a1", "p2", "a2"[, "pp_x", "pp_y"]}   % e gradi
+#     {"type": "place", "x", "y", "psi"}      (velocita' azzerate)
+#     {"type": "reset"}
+#     {"type": "subscribe", "scene": true}    anche le pose delle altre navi
+#     {"type": "stats"[, "clear": true]}    tempi del tick (e azzeramento)
+#   server -> client
+#     {"type": "welcome", "id", "dt", "vessel", "integrator"}
+#     {"type": "state", "tick", "t", "state": [x, y, psi, u, v, r][, "scene": [[id, x, y, psi], ...]]}
+#       (t: secondi dall'apertura della sessione o dall'ultimo reset)
+#     {"type": "stats", ...} / {"type": "error", "message"}
+#
+# Il clock segue una scadenza fissa (niente deriva da sleep): se un tick
+# arriva in ritardo si recuperano fino a MAX_CATCH_UP passi, oltre si
+# rinuncia al tempo perso. Le forze dei propulsori si ricalcolano solo se
+# qualche sessione ha cambiato comandi. Ai client lenti si saltano gli invii
+# invece di rallentare il tick. Il modello e' quello di PhysicsEngine con
+# l'integratore di riferimento (SERVER_INTEGRATOR), senza vento ne' corrente.
+#
+#   python sim_server.py [--port 8765]               server
+#   python sim_server.py --bench 50 200 400          prova di carico in locale
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_CATCH_UP = 5
+MAX_BUFFERED = 64 * 1024    # byte in coda verso un client oltre i quali si salta l'invio
+SERVER_INTEGRATOR = "euler"  # BatchPhysicsEngine.step = PhysicsEngine.update con euler_step
+
+
+def parse_address(text):
+    # "host:porta" o "porta" -> (host, porta)
+    host, _, port = text.rpartition(":")
+    try:
+        return host or DEFAULT_HOST, int(port)
+    except ValueError:
+        raise ValueError(f"Indirizzo non valido: {text!r} (atteso host:porta)") from None
+
+
+def _initial_state():
+    state = np.zeros(6)
+    state[2] = math.pi / 2
+    return state
+
+
+# --- SERVER ---
+class SimServer:
+    def __init__(self, vessel=DEFAULT_VESSEL, dt=SIM_DT, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.vessel = vessel
+        self.dt = dt
+        self.host = host
+        self.port = port
+        self.engine = BatchPhysicsEngine(0, vessel)
+        # Comandi per riga: p1, a1, p2, a2 [% e gradi], pp_x, pp_y [m]
+        self.controls = np.zeros((0, 6))
+        self._forces = None
+        self.ids = []           # id di sessione per riga
+        self.rows = {}          # id -> riga
+        self.writers = {}       # id -> StreamWriter
+        self.start_ticks = {}   # id -> tick di apertura o ultimo reset
+        self.scene_subscribers = set()
+        self._next_id = 1
+        self.tick_count = 0
+        self.late = 0           # passi rinunciati per ritardo
+        self.dropped = 0        # invii saltati a client lenti
+        self.profiler = StageProfiler(window=1000, enabled=True)
+        self._server = None
+        self._clock = None
+
+    # --- SESSIONI ---
+    @property
+    def n_sessions(self):
+        return len(self.ids)
+
+    def add_session(self, writer=None):
+        sid = self._next_id
+        self._next_id += 1
+        self.rows[sid] = len(self.ids)
+        self.ids.append(sid)
+        if writer is not None:
+            self.writers[sid] = writer
+        self.start_ticks[sid] = self.tick_count
+        self.engine.states = np.vstack((self.engine.states, _initial_state()))
+        self.engine.n = len(self.ids)
+        self.controls = np.vstack((self.controls, (0.0, 0.0, 0.0, 0.0, self.vessel.pp_x, self.vessel.pp_y)))
+        self._forces = None
+        return sid
+
+    def remove_session(self, sid):
+        # Scambio con l'ultima riga: le righe restano contigue
+        row = self.rows.pop(sid)
+        last = len(self.ids) - 1
+        if row != last:
+            moved = self.ids[last]
+            self.ids[row] = moved
+            self.rows[moved] = row
+            self.engine.states[row] = self.engine.states[last]
+            self.controls[row] = self.controls[last]
+        self.ids.pop()
+        self.engine.states = self.engine.states[:last].copy()
+        self.engine.n = last
+        self.controls = self.controls[:last].copy()
+        self._forces = None
+        self.writers.pop(sid, None)
+        self.start_ticks.pop(sid, None)
+        self.scene_subscribers.discard(sid)
+
+    def set_controls(self, sid, p1, a1, p2, a2, pp_x=None, pp_y=None):
+        row = self.rows[sid]
+        values = (float(p1), float(a1), float(p2), float(a2),
+                  self.vessel.pp_x if pp_x is None else float(pp_x), self.vessel.pp_y if pp_y is None else float(pp_y))
+        if tuple(self.controls[row].tolist()) != values:
+            self.controls[row] = values
+            self._forces = None
+
+    def place(self, sid, x, y, psi):
+        self.engine.states[self.rows[sid]] = (float(x), float(y), float(psi) % (2 * math.pi), 0.0, 0.0, 0.0)
+
+    def session_time(self, sid):
+        return (self.tick_count - self.start_ticks[sid]) * self.dt
+
+    def state(self, sid):
+        return self.engine.states[self.rows[sid]]
+
+    # --- PASSI ---
+    def step(self):
+        # Un passo di tutte le sessioni insieme
+        if self.ids:
+            c = self.controls
+            if self._forces is None:
+                vessel = self.vessel
+                self._forces = batch_thruster_forces(power_to_thrust(c[:, 0], vessel), c[:, 1],
+                                                     power_to_thrust(c[:, 2], vessel), c[:, 3], vessel)
+            self.engine.step(self.dt, self._forces, c[:, 4], c[:, 5])
+        self.tick_count += 1
+
+    def publish(self):
+        # Stato a ogni client; la scena (pose di tutti) si serializza una volta
+        states = self.engine.states.tolist()
+        scene = None
+        if self.scene_subscribers:
+            scene = json.dumps([[sid] + row[:3] for sid, row in zip(self.ids, states)])
+        head = f'{{"type": "state", "tick": {self.tick_count}, "t": '
+        for sid, row in zip(self.ids, states):
+            writer = self.writers.get(sid)
+            if writer is None:
+                continue
+            if writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+                self.dropped += 1
+                continue
+            head_t = f'{head}{self.session_time(sid):.3f}, "state": '
+            if scene is not None and sid in self.scene_subscribers:
+                line = f'{head_t}{json.dumps(row)}, "scene": {scene}}}\n'
+            else:
+                line = f'{head_t}{json.dumps(row)}}}\n'
+            writer.write(line.encode())
+
+    async def _run_clock(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.dt
+        while True:
+            await asyncio.sleep(max(deadline - loop.time(), 0.0))
+            now = loop.time()
+            due = deadline
+            steps = 0
+            t0 = time.perf_counter()
+            while deadline <= now and steps < MAX_CATCH_UP:
+                self.step()
+                deadline += self.dt
+                steps += 1
+            if deadline <= now:
+                # Troppo indietro: il tempo perso non si recupera
+                lost = int((now - deadline) / self.dt) + 1
+                self.late += lost
+                deadline += lost * self.dt
+            t1 = time.perf_counter()
+            self.publish()
+            self.profiler.record("passo", t1 - t0)
+            self.profiler.record("invio", time.perf_counter() - t1)
+            self.profiler.record("ritardo", max(now - due, 0.0))
+
+    # --- RETE ---
+    def _send(self, writer, msg):
+        writer.write((json.dumps(msg) + "\n").encode())
+
+    def _dispatch(self, sid, writer, msg):
+        kind = msg.get("type")
+        if kind == "controls":
+            self.set_controls(sid, msg["p1"], msg["a1"], msg["p2"], msg["a2"], msg.get("pp_x"), msg.get("pp_y"))
+        elif kind == "place":
+            self.place(sid, msg["x"], msg["y"], msg["psi"])
+        elif kind == "reset":
+            self.place(sid, 0.0, 0.0, math.pi / 2)
+            self.set_controls(sid, 0.0, 0.0, 0.0, 0.0)
+            self.start_ticks[sid] = self.tick_count
+        elif kind == "subscribe":
+            if msg.get("scene"):
+                self.scene_subscribers.add(sid)
+            else:
+                self.scene_subscribers.discard(sid)
+        elif kind == "stats":
+            self._send(writer, dict(self.report(), type="stats"))
+            if msg.get("clear"):
+                self.profiler.clear()
+        else:
+            raise ValueError(f"Messaggio sconosciuto: {kind!r}")
+
+    async def _handle(self, reader, writer):
+        sid = self.add_session(writer)
+        self._send(writer, {"type": "welcome", "id": sid, "dt": self.dt, "vessel": self.vessel.name, "integrator": SERVER_INTEGRATOR})
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    self._dispatch(sid, writer, json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    self._send(writer, {"type": "error", "message": str(e)})
+        except ConnectionError:
+            pass
+        finally:
+            self.remove_session(sid)
+            writer.close()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._clock = asyncio.ensure_future(self._run_clock())
+
+    async def close(self):
+        self._clock.cancel()
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"Server di simulazione su {self.host}:{self.port} (passo {self.dt * 1000:.0f} ms)", flush=True)
+        await self._server.serve_forever()
+
+    def report(self):
+        out = {"sessions": self.n_sessions, "ticks": self.tick_count, "late_steps": self.late, "dropped": self.dropped}
+        for name, s in self.profiler.summary().items():
+            out[name] = {k: s[k] for k in ("p50_ms", "p95_ms", "p99_ms")}
+        return out
+
+
+# --- CLIENT (sessione Streamlit) ---
+class SimClient:
+    # Client sincrono: un thread legge gli stati in arrivo, i comandi partono
+    # subito. drain() restituisce gli stati ricevuti dall'ultima chiamata.
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=5.0, max_pending=1200):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self.sock.makefile("rb")
+        welcome = json.loads(self._file.readline())
+        self.sock.settimeout(None)
+        self.id = welcome["id"]
+        self.dt = welcome["dt"]
+        # Modello usato dal server (nome della nave e dell'integratore)
+        self.vessel_name = welcome.get("vessel")
+        self.integrator = welcome.get("integrator")
+        self.time = 0.0
+        self.drain_time = 0.0
+        self.state = _initial_state()
+        self.scene = []
+        self.stats = None
+        self.max_pending = max_pending
+        self._pending = []
+        self._lock = threading.Lock()
+        self._controls = None
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def connect(cls, address, **kwargs):
+        return cls(*parse_address(address), **kwargs)
+
+    def _read(self):
+        try:
+            for line in self._file:
+                msg = json.loads(line)
+                if msg["type"] == "state":
+                    with self._lock:
+                        self.time = msg["t"]
+                        self.state = np.array(msg["state"])
+                        self.scene = msg.get("scene", self.scene)
+                        self._pending.append(msg["state"])
+                        if len(self._pending) > self.max_pending:
+                            del self._pending[:-self.max_pending]
+                elif msg["type"] == "stats":
+                    self.stats = msg
+        except (OSError, ValueError):
+            pass
+
+    def _send(self, msg):
+        self.sock.sendall((json.dumps(msg) + "\n").encode())
+
+    def set_controls(self, p1, a1, p2, a2, pp_x=None, pp_y=None):
+        # Invio solo se i comandi cambiano
+        controls = (p1, a1, p2, a2, pp_x, pp_y)
+        if controls != self._controls:
+            self._controls = controls
+            self._send({"type": "controls", "p1": p1, "a1": a1, "p2": p2, "a2": a2, "pp_x": pp_x, "pp_y": pp_y})
+
+    def place(self, x, y, psi):
+        self._send({"type": "place", "x": x, "y": y, "psi": psi})
+
+    def reset(self):
+        self._controls = None
+        self._send({"type": "reset"})
+
+    def subscribe_scene(self, enabled=True):
+        self._send({"type": "subscribe", "scene": enabled})
+
+    def request_stats(self, clear=False):
+        self._send({"type": "stats", "clear": clear})
+
+    def drain(self):
+        # Stati ricevuti dall'ultima chiamata, (k, 6); drain_time e' l'istante
+        # di sessione dell'ultimo
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self.drain_time = self.time
+        return np.array(pending).reshape(-1, 6)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+# --- PROVA DI CARICO ---
+async def _bench_client(host, port, duration, rng, counts, gaps):
+    reader, writer = await asyncio.open_connection(host, port)
+    await reader.readline()
+    loop = asyncio.get_running_loop()
+    end = loop.time() + duration
+    next_controls = loop.time()
+    received, last, worst = 0, None, 0.0
+    while True:
+        now = loop.time()
+        if now >= end:
+            break
+        if now >= next_controls:
+            # Comandi nuovi ogni ~0.5 s, come un allievo che muove i cursori
+            p1, p2 = rng.uniform(0, 100, 2)
+            a1, a2 = rng.uniform(0, 360, 2)
+            writer.write(f'{{"type": "controls", "p1": {p1:.1f}, "a1": {a1:.1f}, "p2": {p2:.1f}, "a2": {a2:.1f}}}\n'.encode())
+            next_controls = now + rng.uniform(0.3, 0.7)
+        try:
+            line = await asyncio.wait_for(reader.readline(), max(min(end, next_controls) - now, 0.001))
+        except asyncio.TimeoutError:
+            continue
+        if not line:
+            break
+        received += 1
+        t = loop.time()
+        if last is not None:
+            worst = max(worst, t - last)
+        last = t
+    writer.close()
+    counts.append(received)
+    gaps.append(worst)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind((DEFAULT_HOST, 0))
+        return s.getsockname()[1]
+
+
+def _stats(host, port, clear=False):
+    client = SimClient(host, port)
+    client.request_stats(clear)
+    for i in range(200):
+        if client.stats is not None:
+            break
+        time.sleep(0.01)
+    client.close()
+    return client.stats
+
+
+async def _bench(host, port, n_clients, duration, seed):
+    rng = np.random.default_rng(seed)
+    counts, gaps = [], []
+    tasks = [_bench_client(host, port, duration, np.random.default_rng(rng.integers(1 << 31)), counts, gaps)
+             for i in range(n_clients)]
+    await asyncio.gather(*tasks)
+    return counts, gaps
+
+
+def run_bench(sizes, duration=5.0, seed=0):
+    # Server in un processo a parte, client asyncio in questo; per ogni numero
+    # di sessioni: frequenza di stato ricevuta per client e tempi del tick
+    port = _free_port()
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--host", DEFAULT_HOST, "--port", str(port)],
+                              stdout=subprocess.PIPE, text=True)
+    try:
+        server.stdout.readline()
+        target = 1.0 / SIM_DT
+        print(f"sessioni  stati/s per client (min / medio, atteso {target:.0f})  buco max [ms]  "
+              f"passo p50/p95 [ms]  invio p95 [ms]  passi persi")
+        for n in sizes:
+            before = _stats(DEFAULT_HOST, port, clear=True)
+            counts, gaps = asyncio.run(_bench(DEFAULT_HOST, port, n, duration, seed))
+            after = _stats(DEFAULT_HOST, port)
+            rates = np.array(counts) / duration
+            print(f"{n:8d}  {rates.min():13.1f} / {rates.mean():5.1f}  {max(gaps) * 1000:38.0f}  "
+                  f"{after['passo']['p50_ms']:8.2f} / {after['passo']['p95_ms']:5.2f}  {after['invio']['p95_ms']:14.2f}  "
+                  f"{after['late_steps'] - before['late_steps']:11d}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Server di simulazione locale per piu' sessioni")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--bench", type=int, nargs="+", metavar="N", help="prova di carico con N sessioni (piu' valori)")
+    parser.add_argument("--duration", type=float, default=5.0, help="durata di ogni prova [s]")
+    args = parser.parse_args()
+    if args.bench:
+        run_bench(args.bench, args.duration)
+    else:
+        try:
+            asyncio.run(SimServer(host=args.host, port=args.port).serve_forever())
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,90 @@
+from collections import namedtuple
+
+import numpy as np
+
+from constants import *
+from physics import euler_step, thruster_forces
+from kernels import euler_steps, get_backend
+from vessel import DEFAULT_VESSEL
+
+# Passo di integrazione fisso: la traiettoria dipende solo dai comandi e dal
+# numero di passi, non dal carico del server o dal ritmo dei rerun.
+SIM_DT = 0.05
+
+# t: tempi (n+1,), states: matrice (n+1, 6) con colonne [x, y, psi, u, v, r]
+Trajectory = namedtuple("Trajectory", ["t", "states"])
+
+
+def power_to_thrust(power_pct, vessel=DEFAULT_VESSEL):
+    return (power_pct / 100.0) * vessel.max_thrust
+
+
+def run_steps(engine, n_steps, dt, left_thrust, left_angle, right_thrust, right_angle, pp_x, pp_y, t0=0.0):
+    # Avanza il motore di n_steps passi a comandi costanti e restituisce la
+    # traiettoria completa (stato iniziale incluso) in array preallocati.
+    n_steps = int(n_steps)
+    t = t0 + dt * np.arange(n_steps + 1)
+    states = np.empty((n_steps + 1, 6))
+
+    # Le forze dei propulsori non cambiano a comandi costanti
+    vessel = engine.vessel
+    forces = thruster_forces(left_thrust, left_angle, right_thrust, right_angle, vessel)
+    step = engine.integrator
+    environment = engine.environment
+    if step is euler_step and environment is None and get_backend() != "python":
+        # Kernel compilato (kernels.py), identico bit per bit al ciclo sotto
+        euler_steps(engine.state, n_steps, dt, forces, pp_x, pp_y, out=states, vessel=vessel)
+        engine.state[:] = states[-1]
+        engine.current_pp_y = pp_y
+        return Trajectory(t, states)
+
+    s = engine.state.tolist()
+    states[0] = s
+    if environment is None:
+        for i in range(1, n_steps + 1):
+            s = step(s, dt, forces, pp_x, pp_y, vessel)
+            states[i] = s
+    else:
+        # Vento e corrente campionati nella posizione di ogni passo
+        for i in range(1, n_steps + 1):
+            s = step(s, dt, forces, pp_x, pp_y, vessel, environment.sample(s[0], s[1]))
+            states[i] = s
+
+    engine.state[:] = s
+    engine.current_pp_y = pp_y
+    return Trajectory(t, states)
+
+
+def run_simulation(engine, duration, left_thrust, left_angle, right_thrust, right_angle, pp_x, pp_y, dt=SIM_DT, t0=0.0):
+    n_steps = int(round(duration / dt))
+    return run_steps(engine, n_steps, dt, left_thrust, left_angle, right_thrust, right_angle, pp_x, pp_y, t0=t0)
+
+
+class FixedStepClock:
+    # Converte il tempo reale trascorso tra due rerun in un numero intero di
+    # passi fissi; il resto viene accumulato per il rerun successivo.
+    def __init__(self, dt=SIM_DT, max_steps=40):
+        self.dt = dt
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+        self.sim_time = 0.0
+
+    def reset(self):
+        self.accumulator = 0.0
+        self.sim_time = 0.0
+
+    def advance(self, n_steps):
+        # Passi eseguiti fuori dal tempo reale (es. tratto animato calcolato in blocco)
+        self.sim_time += n_steps * self.dt
+
+    def consume(self, elapsed):
+        self.accumulator += max(elapsed, 0.0)
+        n = int(self.accumulator / self.dt)
+        self.accumulator -= n * self.dt
+        # Se il server resta indietro si rallenta la simulazione invece di
+        # recuperare tutto in un colpo (evita la spirale di rerun lenti)
+        if n > self.max_steps:
+            n = self.max_steps
+            self.accumulator = 0.0
+        self.sim_time += n * self.dt
+        return n
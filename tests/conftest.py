@@ -0,0 +1,5 @@
+import os
+import sys
+
+# I moduli stanno nella radice del repository (niente pacchetto)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
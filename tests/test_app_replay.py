@@ -0,0 +1,39 @@
+import os
+
+import numpy as np
+import pytest
+
+from recording import Recorder
+
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def _upload(data):
+    at = AppTest.from_file(APP, default_timeout=120).run()
+    uploader = next(u for u in at.get("file_uploader") if u.label == "Replay da file")
+    uploader.set_value(("sessione.rec", data, "application/octet-stream"))
+    return at.run()
+
+
+def _recording(n_steps):
+    rec = Recorder()
+    rec.set_controls(60, 30, 40, 330, 0.0, 6.0)
+    rec.extend(np.zeros((n_steps, 6)))
+    return rec.to_bytes()
+
+
+@pytest.mark.parametrize("data", [b"non una registrazione", Recorder().to_bytes(), _recording(1)])
+def test_bad_or_short_upload_shows_error(data):
+    at = _upload(data)
+    assert not at.exception
+    assert any("registrazione" in e.value.lower() for e in at.error)
+    assert not [s for s in at.slider if s.label == "Tempo replay (s)"]
+
+
+def test_valid_upload_drives_controls():
+    at = _upload(_recording(40))
+    assert not at.exception
+    assert [s for s in at.slider if s.label == "Tempo replay (s)"]
+    assert (at.session_state.p1, at.session_state.a1, at.session_state.p2, at.session_state.a2) == (60, 30, 40, 330)
@@ -0,0 +1,60 @@
+import math
+
+from autopilot import DPAutopilot, _wrap
+from environment import Environment, uniform_from_nautical
+from physics import PhysicsEngine
+from simulation import SIM_DT, power_to_thrust
+
+
+def _simulate(autopilot, seconds, environment=None, tick=0.5):
+    # Come il __main__ di autopilot.py: un tick ogni `tick` secondi
+    engine = PhysicsEngine(environment=environment)
+    vessel = engine.vessel
+    tick_steps = int(round(tick / SIM_DT))
+    controls = None
+    for i in range(int(round(seconds / SIM_DT))):
+        state = engine.state
+        if i % tick_steps == 0:
+            env = environment.sample(state[0], state[1]) if environment is not None else None
+            controls = autopilot.solve(state, env, vessel.pp_x, vessel.pp_y)
+        p1, a1, p2, a2 = controls
+        engine.update(SIM_DT, power_to_thrust(p1, vessel), a1, power_to_thrust(p2, vessel), a2, vessel.pp_x, vessel.pp_y)
+    return engine.state
+
+
+def _errors(state, x, y, heading):
+    return math.hypot(state[0] - x, state[1] - y), abs(math.degrees(_wrap(state[2] - heading)))
+
+
+def test_no_target_no_commands():
+    assert DPAutopilot(budget=0.0).solve([0.0] * 6) is None
+
+
+def test_pd_seed_holds_against_the_current():
+    # Budget nullo: nessuna iterazione, solo il regolatore PD (deterministico)
+    autopilot = DPAutopilot(budget=0.0)
+    autopilot.hold(0.0, 20.0, math.pi / 2)
+    state = _simulate(autopilot, 90, Environment(current=uniform_from_nautical(1.0, 90)))
+    position, heading = _errors(state, 0.0, 20.0, math.pi / 2)
+    assert position < 0.1 and heading < 0.1
+    assert autopilot.last_iterations == 0 and math.isnan(autopilot.last_cost)
+    assert autopilot.report()["ticks"] == 180
+
+
+def test_predictive_hold_converges():
+    autopilot = DPAutopilot(budget=0.010)
+    autopilot.hold(0.0, 20.0, math.pi / 2)
+    state = _simulate(autopilot, 60)
+    position, heading = _errors(state, 0.0, 20.0, math.pi / 2)
+    assert position < 1.0 and heading < 2.0
+    assert autopilot.report()["rollouts"] == autopilot.last_iterations * autopilot.samples
+
+
+def test_waypoints_end_in_station_keeping():
+    autopilot = DPAutopilot(budget=0.0)
+    autopilot.follow([(0.0, 30.0), (30.0, 30.0)])
+    state = _simulate(autopilot, 120)
+    # Ultimo tratto verso Est: all'arrivo si tiene il punto con prora Est
+    assert autopilot.waypoints == [] and autopilot.target == (30.0, 30.0, 0.0)
+    position, heading = _errors(state, 30.0, 30.0, 0.0)
+    assert position < 0.5 and heading < 1.0
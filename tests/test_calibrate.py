@@ -0,0 +1,61 @@
+import json
+
+import numpy as np
+import pytest
+
+import calibrate
+from calibrate import (METRICS, PARAMS, cost, current_params, evaluate_batch, grid_samples, load_trials, random_samples,
+                       run_sweep)
+from constants import MAX_SPEED_FORWARD_KT
+
+DT = 0.25  # passo largo: bastano confronti tra lotti
+
+
+def test_grid_samples():
+    samples = grid_samples(["SHIP_MASS=500000:700000:3", "ANGULAR_DAMPING=1e7:2e7:2"])
+    assert samples.shape == (6, len(PARAMS))
+    j = PARAMS.index("SHIP_MASS")
+    assert sorted(set(samples[:, j])) == [500000.0, 600000.0, 700000.0]
+    untouched = [k for k, name in enumerate(PARAMS) if name not in ("SHIP_MASS", "ANGULAR_DAMPING")]
+    assert np.all(samples[:, untouched] == current_params()[untouched])
+    with pytest.raises(ValueError, match="sconosciuto"):
+        grid_samples(["LUNGHEZZA=1:2:2"])
+
+
+def test_random_samples_include_the_current_set():
+    samples = random_samples(50, 0.2, ["SHIP_MASS"], np.random.default_rng(0))
+    base = current_params()
+    assert np.array_equal(samples[0], base)
+    ratio = samples[:, PARAMS.index("SHIP_MASS")] / base[PARAMS.index("SHIP_MASS")]
+    assert np.all((ratio >= 0.8) & (ratio <= 1.2))
+
+
+def test_load_trials_and_cost(tmp_path):
+    path = tmp_path / "prove.json"
+    path.write_text(json.dumps({"max_speed_forward_kn": 12.5, "turn_180_time_s": {"value": 30.0, "weight": 2.0}}))
+    names, values, weights = load_trials(str(path))
+    assert names == ["max_speed_forward_kn", "turn_180_time_s"]
+    assert values.tolist() == [12.5, 30.0] and weights.tolist() == [1.0, 2.0]
+    measured = np.array([[12.5, 30.0], [12.5, 33.0], [12.5, np.nan]])
+    np.testing.assert_allclose(cost(measured, values, weights), [0.0, 2.0 * 0.1 ** 2, np.inf])
+    path.write_text(json.dumps({"velocita": 1.0}))
+    with pytest.raises(ValueError, match="sconosciuta"):
+        load_trials(str(path))
+
+
+def test_rows_do_not_depend_on_the_batch():
+    samples = random_samples(4, 0.3, PARAMS, np.random.default_rng(1))
+    metrics = list(METRICS)
+    together = evaluate_batch(samples, metrics, DT)
+    alone = np.vstack([evaluate_batch(samples[i:i + 1], metrics, DT) for i in range(len(samples))])
+    assert np.array_equal(together, alone, equal_nan=True)
+
+
+def test_sweep_in_processes_matches_serial():
+    samples = random_samples(6, 0.3, PARAMS, np.random.default_rng(2))
+    metrics = ["max_speed_forward_kn", "max_speed_reverse_kn"]
+    serial = run_sweep(samples, metrics, dt=DT, batch=2, workers=1)
+    parallel = run_sweep(samples, metrics, dt=DT, batch=2, workers=2)
+    assert np.array_equal(serial, parallel)
+    # Il set attuale raggiunge la velocita' massima tarata
+    assert serial[0, 0] == pytest.approx(MAX_SPEED_FORWARD_KT, abs=0.3)
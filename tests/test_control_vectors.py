@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from constants import G_ACCEL
+from control_vectors import control_vectors
+from physics import thruster_forces
+from simulation import power_to_thrust
+from vessel import DEFAULT_VESSEL
+
+TON = 1000 * G_ACCEL
+
+
+def test_results_are_cached_and_read_only():
+    control_vectors.cache_clear()
+    cv = control_vectors(60, 30, 40, 300, 0.0, 10.0)
+    assert control_vectors(60, 30, 40, 300, 0.0, 10.0) is cv
+    # Nave uguale per valore: stessa voce di cache
+    assert control_vectors(60, 30, 40, 300, 0.0, 10.0, DEFAULT_VESSEL.replace()) is \
+        control_vectors(60, 30, 40, 300, 0.0, 10.0, DEFAULT_VESSEL)
+    for array in (cv.F_sx_eff, cv.F_dx_eff, cv.res_vec, cv.origin_res):
+        with pytest.raises(ValueError):
+            array[0] = 1.0
+
+
+@pytest.mark.parametrize("commands", [(60, 30, 40, 300, 1.0, 5.0), (80, 0, 80, 0, 0.0, 10.0), (50, 45, 70, 225, -2.0, -8.0)])
+def test_panel_matches_the_physics(commands):
+    # Risultante e momento del pannello = forze della fisica (scia compresa),
+    # col momento riportato al pivot e positivo quando si accosta a dritta
+    p1, a1, p2, a2, pp_x, pp_y = commands
+    cv = control_vectors(*commands)
+    X, Y, N = thruster_forces(power_to_thrust(p1), a1, power_to_thrust(p2), a2)
+    assert cv.res_vec.tolist() == pytest.approx([Y / TON, X / TON], rel=1e-5, abs=1e-6)
+    assert cv.M_tm_PP == pytest.approx(-(N - pp_x * X + pp_y * Y) / TON, rel=1e-5, abs=1e-4)
+    assert cv.M_knm == pytest.approx(cv.M_tm_PP * G_ACCEL)
+
+
+def test_conventions():
+    # Poppa spinta a dritta con pivot a prua: la prua va a sinistra
+    assert control_vectors(50, 90, 50, 90, 0.0, 10.0).M_tm_PP < 0
+    # Comandi specchiati: risultante e momento specchiati
+    cv = control_vectors(60, 30, 40, 300, 0.0, 10.0)
+    mirror = control_vectors(40, 60, 60, 330, 0.0, 10.0)
+    assert mirror.res_vec[0] == pytest.approx(-cv.res_vec[0])
+    assert mirror.res_vec[1] == pytest.approx(cv.res_vec[1])
+    assert mirror.M_tm_PP == pytest.approx(-cv.M_tm_PP)
+    assert mirror.direction == pytest.approx((360 - cv.direction) % 360)
+    assert np.isfinite(cv.res_ton) and "Propulsore SX" in cv.table
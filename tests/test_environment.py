@@ -0,0 +1,108 @@
+import math
+
+import numpy as np
+import pytest
+
+from environment import KNOTS, Environment, GridField, UniformField, load_field, save_field, uniform_from_nautical
+from physics import environment_terms, euler_step
+from vessel import DEFAULT_VESSEL
+
+
+def test_nautical_conventions():
+    # Corrente: verso dove va; vento: da dove viene
+    current = uniform_from_nautical(2.0, 90.0)
+    assert current.sample(0, 0) == pytest.approx((2.0 / KNOTS, 0.0), abs=1e-12)
+    wind = uniform_from_nautical(20.0, 0.0, coming_from=True)
+    assert wind.sample(0, 0) == pytest.approx((0.0, -20.0 / KNOTS), abs=1e-12)
+
+
+@pytest.mark.parametrize("psi", [0.0, 0.7, 2.0, -2.5])
+def test_body_frame_current_is_the_world_current(psi):
+    env = (0.8, -0.3, 0.0, 0.0)
+    u_c, v_c, X, Y = environment_terms(psi, 0.0, 0.0, env)
+    c, s = math.cos(psi), math.sin(psi)
+    # Stessa rotazione della cinematica di physics: body -> mondo
+    assert (u_c * c - v_c * s, u_c * s + v_c * c) == pytest.approx((0.8, -0.3))
+    assert X == 0.0 and Y == 0.0
+
+
+def _drift(environment, state, steps=3000, dt=0.1):
+    for _ in range(steps):
+        state = euler_step(state, dt, (0.0, 0.0, 0.0), 0.0, 0.0, DEFAULT_VESSEL, environment.sample(state[0], state[1]))
+    return state
+
+
+def _world_velocity(state):
+    x, y, psi, u, v, r = state
+    c, s = math.cos(psi), math.sin(psi)
+    return u * c - v * s, u * s + v * c
+
+
+def test_ship_drifts_with_the_current():
+    environment = Environment(current=uniform_from_nautical(1.5, 45.0))
+    speed = 1.5 / KNOTS
+    # Da ferma accelera verso la corrente (il damping quadratico converge lentamente)
+    state = _drift(environment, [0.0, 0.0, 0.7, 0.0, 0.0, 0.0])
+    ve, vn = _world_velocity(state)
+    assert math.degrees(math.atan2(ve, vn)) == pytest.approx(45.0, abs=3.0)
+    assert 0.8 * speed < math.hypot(ve, vn) < speed
+    assert state[0] > 0 and state[1] > 0
+    # Trascinata alla velocita' della corrente, con l'aria che si muove allo
+    # stesso modo (nessuna resistenza del vento), e' in equilibrio
+    environment.wind = environment.current
+    psi = 0.7
+    u, v = speed * math.cos(psi - math.pi / 4), -speed * math.sin(psi - math.pi / 4)
+    state = _drift(environment, [0.0, 0.0, psi, u, v, 0.0], steps=100)
+    assert _world_velocity(state) == pytest.approx(environment.current.sample(0, 0), abs=1e-12)
+
+
+def test_wind_from_north_pushes_south():
+    x, y, *_ = _drift(Environment(wind=uniform_from_nautical(30.0, 0.0, coming_from=True)), [0.0, 0.0, 0.7, 0.0, 0.0, 0.0],
+                    steps=600)
+    assert y < 0
+    assert abs(x) < abs(y)
+
+
+def _linear_field(x0=-50.0, y0=20.0, dx=10.0, dy=5.0, nx=6, ny=4):
+    xs, ys = x0 + dx * np.arange(nx), y0 + dy * np.arange(ny)
+    X, Y = np.meshgrid(xs, ys)
+    data = np.stack([0.01 * X + 0.02 * Y, -0.03 * X + 0.5], axis=-1)
+    return xs, ys, data
+
+
+def test_grid_field_interpolates_and_clamps():
+    xs, ys, data = _linear_field()
+    field = GridField(data, xs[0], ys[0], xs[1] - xs[0], ys[1] - ys[0])
+    # Bilineare: esatta su un campo lineare, anche tornando su celle gia' viste
+    for x, y in [(-42.0, 23.0), (-3.3, 33.1), (-42.0, 23.0), (0.0, 35.0)]:
+        assert field.sample(x, y) == pytest.approx((0.01 * x + 0.02 * y, -0.03 * x + 0.5))
+    # Fuori griglia vale il bordo
+    assert field.sample(-500.0, 1000.0) == pytest.approx(field.sample(xs[0], ys[-1]))
+    assert field.sample(500.0, -1000.0) == pytest.approx(field.sample(xs[-1], ys[0]))
+    assert field.extent == (xs[0], xs[-1], ys[0], ys[-1])
+
+
+def test_field_files(tmp_path):
+    xs, ys, data = _linear_field()
+    npz = tmp_path / "corrente.npz"
+    np.savez(npz, x=xs, y=ys, u=data[..., 0], v=data[..., 1])
+    npy = tmp_path / "corrente.npy"
+    save_field(str(npy), data, xs[0], ys[0], xs[1] - xs[0], ys[1] - ys[0])
+    a, b = load_field(str(npz)), load_field(str(npy))
+    assert isinstance(b.data, np.memmap)
+    for x, y in [(-31.0, 27.5), (0.0, 20.0), (1e4, 1e4)]:
+        assert b.sample(x, y) == pytest.approx(a.sample(x, y), rel=1e-6, abs=1e-6)
+
+    np.savez(npz, x=xs ** 2, y=ys, u=data[..., 0], v=data[..., 1])
+    with pytest.raises(ValueError, match="regolare"):
+        load_field(str(npz))
+    with pytest.raises(ValueError, match="non supportato"):
+        load_field(str(tmp_path / "corrente.nc"))
+    with pytest.raises(ValueError):
+        GridField(data[:1], 0, 0, 1, 1)
+
+
+def test_environment_parts_are_optional():
+    assert Environment().sample(1, 2) == (0.0, 0.0, 0.0, 0.0)
+    env = Environment(current=UniformField(1, 2), wind=UniformField(3, 4))
+    assert env.sample(0, 0) == (1.0, 2.0, 3.0, 4.0)
@@ -0,0 +1,67 @@
+import math
+
+import numpy as np
+import pytest
+
+from constants import DEFAULT_PP_X, DEFAULT_PP_Y
+from integrators import INTEGRATORS, AdaptiveRK45, get_integrator
+from physics import PhysicsEngine, euler_step
+
+# Spinta costante con velocita' che non cambiano segno: il damping
+# quadratico resta liscio e l'ordine dei metodi si vede pulito
+FORCES = (60000.0, 40000.0, -400000.0)
+STATE0 = [0.0, 0.0, 0.3, 2.0, 0.5, -0.02]
+DURATION = 8.0
+
+
+def _run(step, dt):
+    s = list(STATE0)
+    for _ in range(int(round(DURATION / dt))):
+        s = step(s, dt, FORCES, DEFAULT_PP_X, DEFAULT_PP_Y)
+    return np.array(s)
+
+
+def _error(a, b):
+    d = np.abs(a - b)
+    d[2] = abs(math.remainder(a[2] - b[2], 2 * math.pi))
+    return d.max()
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return _run(AdaptiveRK45(rtol=1e-13, atol=1e-13), 0.05)
+
+
+@pytest.mark.parametrize("name, order", [("euler", 1), ("semi_implicit", 1), ("rk4", 4)])
+def test_convergence_order(reference, name, order):
+    step = get_integrator(name)
+    errors = [_error(_run(step, dt), reference) for dt in (0.4, 0.2, 0.1)]
+    for coarse, fine in zip(errors, errors[1:]):
+        assert math.log2(coarse / fine) == pytest.approx(order, abs=0.15)
+
+
+def test_rk45_meets_tolerance(reference):
+    rk45 = get_integrator("rk45", rtol=1e-8, atol=1e-8)
+    assert _error(_run(rk45, 0.05), reference) < 1e-6
+    assert rk45.evaluations > 0
+
+
+def test_euler_is_the_engine_default():
+    assert get_integrator("euler") is euler_step
+    assert PhysicsEngine().integrator is euler_step
+
+
+def test_fixed_step_integrators_reject_options():
+    for name in ("euler", "semi_implicit", "rk4"):
+        with pytest.raises(ValueError, match=name):
+            get_integrator(name, tol=1e-6)
+
+
+def test_stateful_integrators_are_new_per_call():
+    assert get_integrator("rk45") is not get_integrator("rk45")
+    assert set(INTEGRATORS) == {"euler", "semi_implicit", "rk4", "rk45"}
+
+
+def test_unknown_integrator():
+    with pytest.raises(ValueError, match="sconosciuto"):
+        get_integrator("leapfrog")
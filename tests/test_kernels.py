@@ -0,0 +1,61 @@
+import importlib.util
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import kernels
+from physics import thruster_forces
+from vessel import PRESETS
+
+needs_numba = pytest.mark.skipif(importlib.util.find_spec("numba") is None, reason="numba non installato")
+
+
+@pytest.fixture
+def backend():
+    before = kernels.get_backend()
+    yield kernels.set_backend
+    kernels.set_backend(before)
+
+
+def _forces(vessel):
+    return thruster_forces(0.8 * vessel.max_thrust, 25.0, 0.6 * vessel.max_thrust, 300.0, vessel)
+
+
+@needs_numba
+@pytest.mark.parametrize("name", list(PRESETS))
+def test_numba_matches_python_bit_for_bit(backend, name):
+    vessel = PRESETS[name]
+    state = np.array([5.0, -3.0, 1.2, 0.5, -0.2, 0.01])
+    out = {}
+    for b in ("python", "numba"):
+        backend(b)
+        out[b] = kernels.euler_steps(state, 400, 0.05, _forces(vessel), 0.5, 5.3, vessel=vessel)
+    assert np.array_equal(out["python"], out["numba"])
+    # Anche col deadband: nave ferma senza spinta
+    for b in ("python", "numba"):
+        backend(b)
+        out[b] = kernels.euler_steps(np.array([0.0, 0.0, 1.5, 0.005, 0.0, 0.0]), 50, 0.05, (0.0, 0.0, 0.0), 0.0, 5.3, vessel=vessel)
+    assert np.array_equal(out["python"], out["numba"])
+
+
+def test_python_backend_and_output_buffer(backend):
+    backend("python")
+    out = np.empty((11, 6))
+    traj = kernels.euler_steps([0.0, 0.0, 1.5, 0.0, 0.0, 0.0], 10, 0.05, (1e5, 0.0, 0.0), 0.0, 5.3, out=out)
+    assert traj is out and np.array_equal(out[0], [0.0, 0.0, 1.5, 0.0, 0.0, 0.0]) and out[-1, 3] > 0
+
+
+def test_unknown_backend(backend):
+    with pytest.raises(ValueError, match="non disponibile"):
+        backend("cuda")
+    assert "python" in kernels.available_backends()
+
+
+def test_numba_is_imported_on_first_use():
+    code = "import sys, kernels; kernels.get_backend(); print('numba' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(kernels.__file__)))
+    assert out.stdout.strip() == "False"
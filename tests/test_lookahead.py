@@ -0,0 +1,62 @@
+import numpy as np
+
+from integrators import get_integrator
+from lookahead import LookAhead
+from physics import PhysicsEngine
+from simulation import run_steps
+
+COMMANDS = (300000.0, 10.0, 250000.0, 350.0, 0.0, 10.0)
+
+
+def _fresh(engine, commands, horizon):
+    look = LookAhead(horizon)
+    look.update(engine, 0, *commands)
+    return look.states().copy()
+
+
+def test_incremental_update_matches_full_recompute():
+    engine = PhysicsEngine()
+    look = LookAhead(horizon=5.0)
+    look.update(engine, 0, *COMMANDS)
+    # Passi per frame irregolari: il buffer si ricompatta piu' volte
+    for steps in [1, 3, 7, 20, 50, 2, 40, 40, 40, 1]:
+        run_steps(engine, steps, look.dt, *COMMANDS)
+        look.update(engine, steps, *COMMANDS)
+        assert look.last_steps == steps
+        assert np.array_equal(look.states(), _fresh(engine, COMMANDS, 5.0))
+    assert look.recomputes == 1
+    assert look.states().shape == (look.n + 1, 6)
+    assert np.array_equal(look.states()[0], engine.state)
+
+
+def test_changes_force_a_recompute():
+    engine = PhysicsEngine()
+    look = LookAhead(horizon=5.0)
+    look.update(engine, 0, *COMMANDS)
+    other = (0.0, 0.0) + COMMANDS[2:]
+    run_steps(engine, 4, look.dt, *other)
+    look.update(engine, 4, *other)
+    assert look.recomputes == 2 and look.last_steps == look.n
+    # Stato diverso da quello previsto (per esempio dopo un reset)
+    engine.reset()
+    look.update(engine, 0, *other)
+    assert look.recomputes == 3
+    assert np.array_equal(look.states(), _fresh(engine, other, 5.0))
+
+
+def test_marks():
+    engine = PhysicsEngine()
+    look = LookAhead()
+    look.update(engine, 0, *COMMANDS)
+    marks = look.marks()
+    assert marks.shape == (3, 6)
+    assert np.array_equal(marks[-1], look.states()[-1])
+
+
+def test_stateful_integrator_is_not_touched():
+    engine = PhysicsEngine(get_integrator("rk45"))
+    before = vars(engine.integrator).copy()
+    look = LookAhead(horizon=5.0)
+    look.update(engine, 0, *COMMANDS)
+    assert look.engine.integrator is not engine.integrator
+    assert vars(engine.integrator) == before
@@ -0,0 +1,86 @@
+import math
+
+import numpy as np
+import pytest
+
+from physics import BatchPhysicsEngine, PhysicsEngine, batch_thruster_forces, euler_step, thruster_forces
+from vessel import DEFAULT_VESSEL, PRESETS
+
+N = 50
+
+
+def _commands(seed=0):
+    rng = np.random.default_rng(seed)
+    t = DEFAULT_VESSEL.max_thrust
+    return (rng.uniform(0, t, N), rng.uniform(0, 360, N), rng.uniform(0, t, N), rng.uniform(0, 360, N),
+            rng.uniform(-3, 3, N), rng.uniform(-10, 10, N))
+
+
+def test_batch_forces_match_scalar_bit_for_bit():
+    lt, la, rt, ra, _, _ = _commands()
+    X, Y, M = batch_thruster_forces(lt, la, rt, ra)
+    scalar = np.array([thruster_forces(lt[i], la[i], rt[i], ra[i]) for i in range(N)])
+    assert np.array_equal(scalar, np.stack([X, Y, M], axis=1))
+
+
+def test_batch_engine_matches_scalar_engines_bit_for_bit():
+    lt, la, rt, ra, px, py = _commands(1)
+    batch = BatchPhysicsEngine(N)
+    engines = [PhysicsEngine() for _ in range(N)]
+    for _ in range(200):
+        batch.update(0.05, lt, la, rt, ra, px, py)
+        for i, e in enumerate(engines):
+            e.update(0.05, lt[i], la[i], rt[i], ra[i], px[i], py[i])
+    assert np.array_equal(np.array([e.state for e in engines]), batch.states)
+
+
+def test_batch_engine_with_environment_matches_euler_step():
+    lt, la, rt, ra, px, py = _commands(2)
+    env = (0.4, -0.3, 6.0, 2.0)
+    batch = BatchPhysicsEngine(N)
+    states = [batch.states[i].tolist() for i in range(N)]
+    for _ in range(100):
+        forces = batch_thruster_forces(lt, la, rt, ra)
+        batch.step(0.05, forces, px, py, env)
+        states = [euler_step(s, 0.05, thruster_forces(lt[i], la[i], rt[i], ra[i]), px[i], py[i], DEFAULT_VESSEL, env)
+                  for i, s in enumerate(states)]
+    np.testing.assert_allclose(np.array(states), batch.states, rtol=0, atol=1e-9)
+
+
+def test_per_row_parameters_match_individual_vessels():
+    # Una nave diversa per riga (calibrazione): massa e damping come array
+    vessels = list(PRESETS.values())
+    batch = BatchPhysicsEngine(len(vessels), mass=np.array([v.mass for v in vessels]),
+                               inertia=np.array([v.inertia for v in vessels]),
+                               damping_surge_forward=np.array([v.damping_surge_forward for v in vessels]),
+                               damping_surge_reverse=np.array([v.damping_surge_reverse for v in vessels]),
+                               damping_sway=np.array([v.damping_sway for v in vessels]),
+                               damping_rot=np.array([v.damping_rot for v in vessels]))
+    engines = [PhysicsEngine(vessel=DEFAULT_VESSEL.replace(mass=v.mass, inertia=v.inertia,
+                                                           damping_surge_forward=v.damping_surge_forward,
+                                                           damping_surge_reverse=v.damping_surge_reverse,
+                                                           damping_sway=v.damping_sway, damping_rot=v.damping_rot))
+               for v in vessels]
+    for _ in range(100):
+        batch.update(0.05, 200000.0, 30.0, 150000.0, 300.0, 0.0, 5.3)
+        for e in engines:
+            e.update(0.05, 200000.0, 30.0, 150000.0, 300.0, 0.0, 5.3)
+    np.testing.assert_allclose(np.array([e.state for e in engines]), batch.states, rtol=1e-12, atol=1e-12)
+
+
+def test_mirrored_commands_mirror_the_motion():
+    # Propulsori simmetrici: comandi specchiati -> sway e rotazione opposti
+    a, b = PhysicsEngine(), PhysicsEngine()
+    for _ in range(200):
+        a.update(0.05, 250000.0, 40.0, 100000.0, 10.0, 0.0, 0.0)
+        b.update(0.05, 100000.0, 350.0, 250000.0, 320.0, 0.0, 0.0)
+    assert b.state[3] == pytest.approx(a.state[3])
+    assert b.state[4] == pytest.approx(-a.state[4])
+    assert b.state[5] == pytest.approx(-a.state[5])
+
+
+def test_no_thrust_stays_at_rest():
+    e = PhysicsEngine()
+    for _ in range(100):
+        e.update(0.05, 0.0, 0.0, 0.0, 0.0, 0.0, 5.3)
+    assert np.array_equal(e.state, [0.0, 0.0, math.pi / 2, 0.0, 0.0, 0.0])
@@ -0,0 +1,43 @@
+import math
+
+import numpy as np
+import pytest
+
+from physics import PhysicsEngine
+from plotly_view import CHUNK_SECONDS, KEYFRAMES_PER_SECOND, body_to_world, resample, trajectory_figure, trajectory_html
+from scene import body_to_world as scene_body_to_world
+from simulation import run_simulation
+from vessel import DEFAULT_VESSEL
+
+
+@pytest.fixture(scope="module")
+def traj():
+    return run_simulation(PhysicsEngine(), CHUNK_SECONDS, 300000.0, 30.0, 300000.0, 30.0, 0.0, 5.3)
+
+
+def test_body_to_world_matches_the_scene():
+    pts = np.array([[1.0, 5.0], [-2.0, -3.0]])
+    for psi in (0.0, math.pi / 2, 2.5):
+        np.testing.assert_allclose(body_to_world(pts, 10.0, -4.0, psi), scene_body_to_world(pts, 10.0, -4.0, psi))
+
+
+def test_resample_keeps_ends_and_unwraps_heading(traj):
+    t, x, y, psi = resample(traj, KEYFRAMES_PER_SECOND)
+    assert len(t) == int(CHUNK_SECONDS * KEYFRAMES_PER_SECOND) + 1
+    assert x[-1] == pytest.approx(traj.states[-1, 0]) and y[-1] == pytest.approx(traj.states[-1, 1])
+    # Prua continua anche quando l'angolo passa per 0 / 2*pi
+    assert np.all(np.abs(np.diff(psi)) < 0.5)
+
+
+def test_one_frame_per_keyframe_and_frame_covers_the_path(traj):
+    obstacle = np.array([[0.0, 100.0], [50.0, 100.0], [50.0, 110.0]])
+    fig = trajectory_figure(traj, DEFAULT_VESSEL.pos_sx, DEFAULT_VESSEL.pos_dx, np.array([2.0, 10.0]), np.array([2.0, 10.0]),
+                            [-5.0, 0.0], [-5.0, 0.0], obstacles=[obstacle])
+    assert len(fig.frames) == int(CHUNK_SECONDS * KEYFRAMES_PER_SECOND) + 1
+    assert [tr.name for tr in fig.data][-1] == "Ostacolo"
+    x0, x1 = fig.layout.xaxis.range
+    y0, y1 = fig.layout.yaxis.range
+    assert x0 <= traj.states[:, 0].min() and traj.states[:, 0].max() <= x1
+    assert y0 <= min(traj.states[:, 1].min(), -5.0) and traj.states[:, 1].max() <= y1
+    html = trajectory_html(fig)
+    assert "cdn.plot.ly" in html and "<html" not in html
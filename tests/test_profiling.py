@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from profiling import StageProfiler
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = StageProfiler()
+    with profiler.stage("fisica"):
+        pass
+    profiler.record("scena", 0.01)
+    assert profiler.summary() == {}
+    # Da spento il contesto e' sempre lo stesso oggetto
+    assert profiler.stage("a") is profiler.stage("b")
+
+
+def test_percentiles_over_the_window():
+    profiler = StageProfiler(window=10, enabled=True)
+    for ms in range(1, 21):
+        profiler.record("fisica", ms / 1e3)
+    s = profiler.summary()["fisica"]
+    # Solo gli ultimi 10 campioni: 11..20 ms
+    assert s["n"] == 10 and s["last_ms"] == pytest.approx(20.0)
+    assert s["p50_ms"] == pytest.approx(15.5)
+    assert 19.0 < s["p95_ms"] <= s["p99_ms"] <= 20.0
+
+
+def test_stage_times_the_block():
+    profiler = StageProfiler(enabled=True)
+    with profiler.stage("scena"):
+        sum(range(10000))
+    with pytest.raises(RuntimeError):
+        with profiler.stage("scena"):
+            raise RuntimeError
+    s = profiler.summary()["scena"]
+    assert s["n"] == 2 and s["last_ms"] >= 0.0
+
+
+def test_exports():
+    profiler = StageProfiler(window=5, enabled=True)
+    profiler.record("fisica", 0.002)
+    profiler.record("png", 0.010)
+    data = json.loads(profiler.to_json())
+    assert data["window"] == 5 and set(data["stages"]) == {"fisica", "png"}
+    lines = profiler.to_csv().splitlines()
+    assert lines[0] == "stage,n,last_ms,p50_ms,p95_ms,p99_ms"
+    assert lines[1].startswith("fisica,1,2.000,")
+    profiler.clear()
+    assert profiler.summary() == {}
@@ -0,0 +1,132 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from recording import ALIGN, MAGIC, Recorder, Recording
+
+
+def _states(start, stop):
+    i = np.arange(start, stop, dtype=float)
+    return np.stack([i, 2 * i, 0.1 * i, 1.0 + 0 * i, -i, 0.01 * i], axis=1)
+
+
+def _session():
+    # 3 passi a comandi A, 4 a comandi B, 2 ancora a B (nessuna riga nuova)
+    rec = Recorder(dt=0.05, t0=1.0, capacity=2)
+    rec.set_controls(50, 10, 50, 350, 0.0, 6.0)
+    rec.extend(_states(0, 3))
+    rec.set_controls(80, 90, 20, 270, 0.0, 4.0)
+    rec.extend(_states(3, 7))
+    rec.set_controls(80, 90, 20, 270, 0.0, 4.0)
+    rec.extend(_states(7, 9))
+    return rec
+
+
+def test_round_trip_bytes():
+    rec = _session()
+    data = rec.to_bytes(meta={"vessel": "ASD 32m"})
+    assert data.startswith(MAGIC)
+    r = Recording(data)
+    assert (r.dt, r.t0, r.n_steps, r.meta) == (0.05, 1.0, 9, {"vessel": "ASD 32m"})
+    for spec in r.header["columns"].values():
+        assert spec["offset"] % ALIGN == 0
+    np.testing.assert_array_equal(r.states, _states(0, 9))
+    np.testing.assert_array_equal(r.control_index, [0, 0, 0, 1, 1, 1, 1, 1, 1])
+    np.testing.assert_array_equal(r.control_steps, [0, 3])
+    assert r.controls_at(1.0 + 0.05 * 2) == {"p1": 50, "a1": 10, "p2": 50, "a2": 350, "pp_x": 0.0, "pp_y": 6.0}
+    assert r.controls_at(1.0 + 0.05 * 3)["p1"] == 80
+
+
+def test_round_trip_file(tmp_path):
+    path = tmp_path / "sessione.asdrec"
+    _session().save(path)
+    r = Recording.load(path)
+    np.testing.assert_array_equal(r.states, _states(0, 9))
+    assert r.duration == pytest.approx(8 * 0.05)
+
+
+def test_empty_recording_round_trip():
+    rec = Recorder()
+    r = Recording(rec.to_bytes())
+    assert r.n_steps == 0 and r.states.shape == (0, 6) and r.controls.shape == (0, 6)
+
+
+def test_bad_magic():
+    with pytest.raises(ValueError):
+        Recording(b"NOTAREC!" + bytes(64))
+
+
+def test_extend_needs_controls():
+    with pytest.raises(ValueError):
+        Recorder().extend(_states(0, 1))
+
+
+def test_lookup_clamps_and_window():
+    r = Recording(_session().to_bytes())
+    np.testing.assert_array_equal(r.state_at(-5.0), _states(0, 1)[0])
+    np.testing.assert_array_equal(r.state_at(99.0), _states(8, 9)[0])
+    np.testing.assert_array_equal(r.window(1.0 + 0.05 * 5, 0.1), _states(4, 6))
+
+
+def test_truncate_keeps_state_at_t_and_drops_later_controls():
+    rec = _session()
+    # t = passo 2: restano i passi 0..2 e solo la prima riga di comandi
+    assert rec.truncate(1.0 + 0.05 * 2) == 3
+    assert rec.n_controls == 1
+    rec.set_controls(30, 0, 30, 0, 0.0, 6.0)
+    rec.extend(_states(100, 102))
+    r = Recording(rec.to_bytes())
+    np.testing.assert_array_equal(r.states, np.concatenate([_states(0, 3), _states(100, 102)]))
+    np.testing.assert_array_equal(r.control_steps, [0, 3])
+    np.testing.assert_array_equal(r.control_index, [0, 0, 0, 1, 1])
+
+
+def test_truncate_on_control_change_step():
+    # Il cambio al passo 3 vale da un passo scartato: la riga va via
+    rec = _session()
+    assert rec.truncate(1.0 + 0.05 * 3) == 4
+    assert rec.n_controls == 2
+    assert rec.truncate(1.0 + 0.05 * 2) == 3
+    assert rec.n_controls == 1
+
+
+def test_truncate_before_start_restarts_empty():
+    rec = _session()
+    assert rec.truncate(0.5) == 0
+    assert (rec.n_steps, rec.n_controls, rec.t0) == (0, 0, 0.5)
+    rec.set_controls(0, 0, 0, 0, 0.0, 6.0)
+    rec.extend(_states(0, 1))
+    r = Recording(rec.to_bytes())
+    assert r.t0 == 0.5 and r.n_steps == 1
+
+
+def test_truncate_past_end_keeps_everything():
+    rec = _session()
+    assert rec.truncate(100.0) == 9
+    assert rec.n_controls == 2
+
+
+def test_degenerate_headers_raise_value_error():
+    data = _session().to_bytes()
+    header_end = len(MAGIC) + 4 + struct.unpack("<I", data[len(MAGIC):len(MAGIC) + 4])[0]
+    header = json.loads(data[len(MAGIC) + 4:header_end])
+    broken = [
+        b"",
+        MAGIC,                                     # troppo corto per la lunghezza dell'header
+        data[:len(MAGIC) + 4] + b"{non json",      # header JSON rotto
+        data[:header_end + 10],                    # colonne troncate
+    ]
+    for changes in ({"n_steps": 50}, {"columns": {k: v for k, v in header["columns"].items() if k != "states"}}):
+        patched = json.dumps(dict(header, **changes)).encode()
+        broken.append(MAGIC + struct.pack("<I", len(patched)) + patched + data[header_end:])
+    for buffer in broken:
+        with pytest.raises(ValueError):
+            Recording(buffer)
+
+
+def test_missing_header_field_raises_key_error():
+    patched = json.dumps({"version": 1, "columns": {}}).encode()
+    with pytest.raises(KeyError):
+        Recording(MAGIC + struct.pack("<I", len(patched)) + patched)
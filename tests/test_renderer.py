@@ -0,0 +1,77 @@
+import io
+import math
+
+import numpy as np
+import pytest
+
+from renderer import CenterPanelRenderer
+from track import TrackHistory
+from vessel import DEFAULT_VESSEL
+
+
+@pytest.fixture
+def renderer():
+    return CenterPanelRenderer(DEFAULT_VESSEL.pos_sx, DEFAULT_VESSEL.pos_dx)
+
+
+def _png(renderer):
+    buf = io.BytesIO()
+    renderer.fig.savefig(buf, format="png", dpi=20)
+    return buf.getvalue()
+
+
+def _update(renderer, state, track, a=(30.0, 60.0, 330.0, 40.0)):
+    a1, p1, a2, p2 = a
+    renderer.update_wash(a1, p1, a2, p2)
+    renderer.update_pivot(0.0, 5.3)
+    renderer.update_arrows(np.array([1.0, 5.0]), np.array([-1.0, 4.0]), np.array([0.0, 5.3]), np.array([0.0, 9.0]))
+    renderer.update_construction(np.array([0.0, 20.0]), np.array([1.0, 5.0]), np.array([-1.0, 4.0]), np.array([0.0, 9.0]), True)
+    renderer.update_propellers(a1, a2)
+    renderer.update_prediction(state, track, 80.0)
+    renderer.set_mode(True, 80.0)
+
+
+def test_updates_reuse_the_same_artists(renderer):
+    # Scena costruita una volta: gli aggiornamenti non aggiungono artisti
+    track = TrackHistory()
+    children = list(renderer.ax.get_children())
+    state = np.array([10.0, 20.0, 1.0, 2.0, 0.1, 0.01])
+    for k in range(5):
+        track.extend(np.array([[k, 2.0 * k, 1.0, 0.0, 0.0, 0.0]]))
+        _update(renderer, state + k, track)
+        _png(renderer)
+    assert renderer.ax.get_children() == children
+
+
+def test_world_to_ship_puts_the_ship_at_the_origin_bow_up(renderer):
+    state = np.array([120.0, -40.0, math.radians(30.0), 0.0, 0.0, 0.0])
+    renderer.update_prediction(state, TrackHistory(), 80.0)
+    t = renderer.world_to_ship
+    np.testing.assert_allclose(t.transform([state[0], state[1]]), [0.0, 0.0], atol=1e-9)
+    ahead = state[:2] + 10.0 * np.array([math.cos(state[2]), math.sin(state[2])])
+    np.testing.assert_allclose(t.transform(ahead), [0.0, 10.0], atol=1e-9)
+
+
+def test_same_state_draws_the_same_image(renderer):
+    track = TrackHistory()
+    track.extend(np.array([[0.0, 0.0, 1.5, 0, 0, 0], [3.0, 4.0, 1.5, 0, 0, 0]]))
+    state = np.array([3.0, 4.0, 1.5, 1.0, 0.0, 0.0])
+    _update(renderer, state, track)
+    first = _png(renderer)
+    _update(renderer, state + 50.0, track, (90.0, 100.0, 270.0, 100.0))
+    _png(renderer)
+    _update(renderer, state, track)
+    assert _png(renderer) == first
+
+
+def test_modes_and_visibility(renderer):
+    renderer.update_wash(0.0, 2.0, 0.0, 80.0)
+    assert not renderer.wash_sx.get_visible() and renderer.wash_dx.get_visible()
+    renderer.update_wash(0.0, 80.0, 0.0, 80.0, show=False)
+    assert not renderer.wash_dx.get_visible()
+    renderer.set_mode(False)
+    assert renderer.ax.get_xlim() == (-30.0, 30.0) and not renderer.track.get_visible()
+    renderer.set_mode(True, 120.0)
+    assert renderer.ax.get_xlim() == (-120.0, 120.0) and renderer.grid.get_visible()
+    renderer.update_lookahead(np.zeros((5, 6)), np.zeros((2, 6)), show=False)
+    assert not renderer.ghosts.get_visible()
@@ -0,0 +1,87 @@
+import math
+
+import numpy as np
+import pytest
+
+from constants import DEFAULT_PP_X, DEFAULT_PP_Y
+from response_table import (DEFAULT_AXES, ResponseTable, load_response_table, physics_key, steady_state_velocities,
+                            table_path)
+from vessel import DEFAULT_VESSEL, PRESETS
+
+# Griglia piccola e integrazione corta: bastano per formato e interpolazione
+AXES = ((0.0, 50.0, 3), (0.0, 90.0, 5), (0.0, 50.0, 3), (0.0, 90.0, 5), (DEFAULT_PP_Y - 8.0, 8.0, 2))
+FAST = {"dt": 0.5, "settle_time": 120.0, "average_time": 20.0}
+
+
+@pytest.fixture(scope="module")
+def table():
+    return ResponseTable.build(AXES, **FAST)
+
+
+def test_default_pivot_is_a_node():
+    start, step, n = DEFAULT_AXES[4]
+    k = (DEFAULT_PP_Y - start) / step
+    assert abs(k - round(k)) < 1e-9 and 0 <= round(k) < n
+
+
+def test_steady_surge_matches_quadratic_damping():
+    X = 2.0 * DEFAULT_VESSEL.max_thrust
+    u, v, r = steady_state_velocities(X, 0.0, 0.0, DEFAULT_PP_X, DEFAULT_PP_Y)
+    assert u == pytest.approx(math.sqrt(X / DEFAULT_VESSEL.damping_surge_forward), rel=1e-3)
+    assert v == pytest.approx(0.0, abs=1e-9) and r == pytest.approx(0.0, abs=1e-9)
+
+
+def test_lookup_one_matches_lookup(table):
+    rng = np.random.default_rng(0)
+    for p1, a1, p2, a2, pp_y in zip(rng.uniform(0, 100, 20), rng.uniform(0, 360, 20), rng.uniform(0, 100, 20),
+                                    rng.uniform(0, 360, 20), rng.uniform(-4, 6, 20)):
+        one = table.lookup_one(p1, a1, p2, a2, pp_y)
+        np.testing.assert_allclose(one[:3], table.lookup(p1, a1, p2, a2, pp_y), rtol=1e-5, atol=1e-6)
+
+
+def test_node_reliability_is_used_on_pivot_nodes(table):
+    # Errori finti: celle 5-D tutte fuori tolleranza, celle 4-D tutte dentro
+    errors = np.full_like(table.errors, 1.0)
+    node_errors = np.zeros_like(table.node_errors)
+    t = ResponseTable(table.axes, table.values, table.key, errors, node_errors, table.pp_x)
+    assert t.lookup_one(30.0, 20.0, 30.0, 20.0, DEFAULT_PP_Y).reliable
+    assert t.lookup_one(30.0, 20.0, 30.0, 20.0, DEFAULT_PP_Y - 8.0).reliable
+    assert not t.lookup_one(30.0, 20.0, 30.0, 20.0, DEFAULT_PP_Y - 4.0).reliable
+    assert t.coverage() == (0.0, 1.0)
+
+
+def test_error_estimate_scales_inside_the_cell(table):
+    # Errore al centro di 0.2 m/s: fuori tolleranza vicino al centro, dentro
+    # vicino ai nodi (stima errore * max 4*w*(1 - w)), nullo sui nodi
+    errors = np.zeros_like(table.node_errors)
+    errors[..., 0] = 0.2
+    t = ResponseTable(table.axes, table.values, table.key, table.errors, errors, table.pp_x)
+    assert not t.lookup_one(25.0, 45.0, 25.0, 45.0, DEFAULT_PP_Y).reliable
+    assert t.lookup_one(50.0, 90.0, 50.0, 90.0, DEFAULT_PP_Y).reliable
+    assert t.lookup_one(52.0, 90.0, 50.0, 90.0, DEFAULT_PP_Y).reliable
+    assert not t.lookup_one(60.0, 90.0, 50.0, 90.0, DEFAULT_PP_Y).reliable
+    # Senza stima d'errore nessun valore e' affidabile, nemmeno sui nodi
+    bare = ResponseTable(table.axes, table.values)
+    assert not bare.lookup_one(50.0, 90.0, 50.0, 90.0, DEFAULT_PP_Y).reliable
+
+
+def test_save_and_load(table, tmp_path):
+    path = str(tmp_path / "tabella.npz")
+    table.save(path)
+    loaded = load_response_table(path, build_if_missing=False)
+    assert loaded is not None and loaded.key == physics_key()
+    assert loaded.axes == table.axes and loaded.coverage() == table.coverage()
+    np.testing.assert_array_equal(loaded.values, table.values)
+    # La chiave e' quella della nave: con un'altra nave la tabella non vale
+    other = PRESETS[next(name for name in PRESETS if PRESETS[name] != DEFAULT_VESSEL)]
+    assert load_response_table(path, build_if_missing=False, vessel=other) is None
+
+
+def test_missing_table_is_not_built(tmp_path):
+    assert load_response_table(str(tmp_path / "assente.npz"), build_if_missing=False) is None
+
+
+def test_each_vessel_has_its_own_file():
+    paths = {table_path(vessel) for vessel in PRESETS.values()}
+    assert len(paths) == len(PRESETS)
+    assert len({physics_key(vessel) for vessel in PRESETS.values()}) == len(PRESETS)
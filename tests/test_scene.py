@@ -0,0 +1,88 @@
+import math
+
+import numpy as np
+import pytest
+
+from scene import CONTACT, PROXIMITY, SCENARIOS, Obstacle, Scene, polygon_distance, quay_wall
+
+SQUARE = np.array([(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)])
+
+
+def test_polygon_distance():
+    assert polygon_distance(SQUARE, SQUARE + (3.0, 0.0)) == pytest.approx(2.0)
+    assert polygon_distance(SQUARE, SQUARE + (3.0, 4.0)) == pytest.approx(math.hypot(2.0, 3.0))
+    assert polygon_distance(SQUARE, SQUARE + (0.5, 0.5)) == 0.0
+    # Uno dentro l'altro, senza lati che si attraversano
+    assert polygon_distance(SQUARE * 10.0 - 5.0, SQUARE) == 0.0
+
+
+def _scene_with_quay(y=60.0, thickness=15.0):
+    scene = Scene()
+    sv = scene.add_vessel("Rimorchiatore")
+    scene.add_obstacle(quay_wall("Banchina", -100.0, y, 100.0, y, thickness=thickness))
+    return scene, sv
+
+
+def test_step_reports_contact_with_quay():
+    scene, sv = _scene_with_quay()
+    assert scene.check() == []
+    sv.set_controls(300000.0, 0.0, 300000.0, 0.0)
+    events = scene.run(int(60.0 / scene.dt))
+    kinds = [e.kind for e in events]
+    assert PROXIMITY in kinds and CONTACT in kinds
+    first = events[kinds.index(CONTACT)]
+    assert first.a == "Rimorchiatore" and first.b == "Banchina"
+    assert kinds.index(PROXIMITY) < kinds.index(CONTACT)
+
+
+def _path(y0, y1, n=101):
+    states = np.zeros((n, 6))
+    states[:, 1] = np.linspace(y0, y1, n)
+    states[:, 2] = math.pi / 2
+    return states, np.linspace(10.0, 15.0, n)
+
+
+def test_check_path_finds_contact_missed_at_the_end_pose():
+    # Banchina sottile attraversata: alla fine del tratto la nave e' oltre
+    scene, sv = _scene_with_quay(y=60.0, thickness=1.0)
+    states, times = _path(0.0, 200.0)
+    sv.engine.state[:] = states[-1]
+    assert scene.check() == []
+    events = scene.check_path(0, states, times)
+    assert [e.kind for e in events] == [CONTACT]
+    # Primo istante in cui la prua tocca: prima del centro sulla banchina
+    half = sv.radius
+    k = np.searchsorted(states[:, 1], 60.0 - half)
+    assert times[k - 1] <= events[0].t < times[np.searchsorted(states[:, 1], 60.0)]
+
+
+def test_check_path_reports_closest_approach():
+    scene, sv = _scene_with_quay(y=60.0)
+    bow = sv.outline[:, 1].max()
+    states, times = _path(0.0, 60.0 - bow - 2.0)
+    events = scene.check_path(0, states, times)
+    assert len(events) == 1 and events[0].kind == PROXIMITY
+    assert events[0].distance == pytest.approx(2.0, abs=0.05)
+    assert events[0].t == pytest.approx(times[-1])
+
+
+def test_check_path_far_from_obstacles_is_empty():
+    scene, sv = _scene_with_quay(y=1000.0)
+    states, times = _path(0.0, 50.0)
+    assert scene.check_path(0, states, times) == []
+    assert scene.check_path(0, states[:0], times[:0]) == []
+
+
+def test_vessels_in_separate_cells_are_not_candidates():
+    scene = Scene()
+    scene.add_vessel("A", x=0.0, y=0.0)
+    scene.add_vessel("B", x=0.0, y=500.0)
+    scene.add_vessel("C", x=0.0, y=20.0)
+    boxes, vessel_pairs, obstacle_pairs = scene.candidate_pairs()
+    assert (0, 1) not in vessel_pairs and (0, 2) in vessel_pairs
+    assert [e.kind for e in scene.check()] == [CONTACT]
+
+
+def test_scenarios_build_obstacles():
+    for name, build in SCENARIOS.items():
+        assert all(isinstance(ob, Obstacle) for ob in build())
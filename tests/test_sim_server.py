@@ -0,0 +1,120 @@
+import asyncio
+import json
+import math
+
+import numpy as np
+import pytest
+
+from physics import BatchPhysicsEngine, batch_thruster_forces
+from sim_server import SERVER_INTEGRATOR, SimServer, parse_address
+from simulation import power_to_thrust
+from vessel import DEFAULT_VESSEL
+
+COMMANDS = {1: (60.0, 10.0, 40.0, 350.0), 2: (30.0, 90.0, 30.0, 90.0), 3: (80.0, 180.0, 20.0, 0.0)}
+
+
+def _alone(state, commands, n_steps, dt):
+    # La stessa sessione da sola in un motore a una riga
+    engine = BatchPhysicsEngine(1)
+    engine.states[0] = state
+    p1, a1, p2, a2 = (np.array([c]) for c in commands)
+    forces = batch_thruster_forces(power_to_thrust(p1), a1, power_to_thrust(p2), a2)
+    for _ in range(n_steps):
+        engine.step(dt, forces, np.array([DEFAULT_VESSEL.pp_x]), np.array([DEFAULT_VESSEL.pp_y]))
+    return engine.states[0]
+
+
+def test_remove_session_swaps_the_last_row():
+    server = SimServer()
+    sids = [server.add_session() for _ in range(3)]
+    for sid in sids:
+        server.set_controls(sid, *COMMANDS[sid])
+        server.place(sid, 10.0 * sid, 0.0, 0.3 * sid)
+    for _ in range(20):
+        server.step()
+    before = {sid: server.state(sid).copy() for sid in sids}
+
+    server.remove_session(1)
+    assert server.ids == [3, 2] and server.rows == {3: 0, 2: 1} and server.engine.n == 2
+    assert server.controls[0, :4].tolist() == list(COMMANDS[3])
+    for sid in (2, 3):
+        assert np.array_equal(server.state(sid), before[sid])
+    # Dopo lo scambio ogni sessione continua come se fosse da sola
+    for _ in range(20):
+        server.step()
+    for sid in (2, 3):
+        assert np.array_equal(server.state(sid), _alone(before[sid], COMMANDS[sid], 20, server.dt))
+
+    server.remove_session(2)
+    server.remove_session(3)
+    assert server.n_sessions == 0 and server.engine.states.shape == (0, 6)
+    server.step()
+
+
+def test_session_time_and_reset():
+    server = SimServer()
+    first = server.add_session()
+    for _ in range(10):
+        server.step()
+    second = server.add_session()
+    for _ in range(5):
+        server.step()
+    assert server.session_time(first) == pytest.approx(15 * server.dt)
+    assert server.session_time(second) == pytest.approx(5 * server.dt)
+    server.set_controls(first, 50, 0, 50, 0)
+    server._dispatch(first, None, {"type": "reset"})
+    assert server.session_time(first) == 0.0
+    assert server.state(first).tolist() == [0.0, 0.0, math.pi / 2, 0.0, 0.0, 0.0]
+    assert server.controls[server.rows[first], :4].tolist() == [0.0] * 4
+    with pytest.raises(ValueError, match="sconosciuto"):
+        server._dispatch(first, None, {"type": "teleport"})
+
+
+def test_unchanged_controls_keep_the_forces():
+    server = SimServer()
+    sid = server.add_session()
+    server.set_controls(sid, 50, 10, 50, 350)
+    server.step()
+    forces = server._forces
+    server.set_controls(sid, 50, 10, 50, 350)
+    assert server._forces is forces
+    server.set_controls(sid, 50, 10, 60, 350)
+    assert server._forces is None
+
+
+def test_parse_address():
+    assert parse_address("8765") == ("127.0.0.1", 8765)
+    assert parse_address("0.0.0.0:9000") == ("0.0.0.0", 9000)
+    with pytest.raises(ValueError, match="non valido"):
+        parse_address("localhost:porta")
+
+
+def test_protocol():
+    async def session():
+        server = SimServer(port=0)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            welcome = json.loads(await reader.readline())
+            assert welcome == {"type": "welcome", "id": 1, "dt": server.dt, "vessel": DEFAULT_VESSEL.name,
+                               "integrator": SERVER_INTEGRATOR}
+            writer.write(b'{"type": "subscribe", "scene": true}\n{"type": "controls", "p1": 50, "a1": 0, "p2": 50, "a2": 0}\n')
+            writer.write(b'{"type": "volo"}\n')
+            messages = [json.loads(await asyncio.wait_for(reader.readline(), 5.0)) for _ in range(20)]
+            errors = [m for m in messages if m["type"] == "error"]
+            states = [m for m in messages if m["type"] == "state"]
+            assert len(errors) == 1 and "volo" in errors[0]["message"]
+            assert all(b["t"] > a["t"] for a, b in zip(states, states[1:]))
+            assert states[-1]["scene"][0][0] == 1 and len(states[-1]["state"]) == 6
+            assert states[-1]["state"][3] > 0
+            writer.close()
+            await writer.wait_closed()
+            for _ in range(100):
+                if server.n_sessions == 0:
+                    break
+                await asyncio.sleep(0.01)
+            assert server.n_sessions == 0
+        finally:
+            await server.close()
+
+    asyncio.run(session())
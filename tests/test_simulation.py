@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from integrators import get_integrator
+from physics import PhysicsEngine
+from simulation import SIM_DT, FixedStepClock, power_to_thrust, run_simulation, run_steps
+from vessel import PRESETS
+
+COMMANDS = (250000.0, 20.0, 200000.0, 330.0, 0.0, 5.3)
+
+
+def test_clock_keeps_the_remainder():
+    clock = FixedStepClock(0.25)
+    assert clock.consume(0.625) == 2
+    assert clock.accumulator == 0.125
+    assert clock.consume(0.125) == 1
+    assert clock.accumulator == 0.0
+    assert clock.sim_time == 0.75
+    assert clock.consume(-1.0) == 0
+
+
+def test_clock_slows_down_instead_of_catching_up():
+    clock = FixedStepClock(0.05, max_steps=40)
+    assert clock.consume(10.0) == 40
+    assert clock.accumulator == 0.0
+    assert clock.sim_time == pytest.approx(2.0)
+    clock.advance(20)
+    assert clock.sim_time == pytest.approx(3.0)
+    clock.reset()
+    assert clock.sim_time == 0.0
+
+
+@pytest.mark.parametrize("integrator", ["euler", "rk4"])
+def test_trajectory_does_not_depend_on_chunking(integrator):
+    # Stessi passi fissi in un blocco o in tanti rerun: stessa traiettoria
+    whole = PhysicsEngine(get_integrator(integrator))
+    traj = run_steps(whole, 120, SIM_DT, *COMMANDS)
+    chunked = PhysicsEngine(get_integrator(integrator))
+    parts = [run_steps(chunked, n, SIM_DT, *COMMANDS, t0=t0 * SIM_DT) for t0, n in ((0, 7), (7, 50), (57, 1), (58, 62))]
+    assert np.array_equal(whole.state, chunked.state)
+    assert np.array_equal(traj.states, np.concatenate([parts[0].states] + [p.states[1:] for p in parts[1:]]))
+    np.testing.assert_allclose(traj.t, np.concatenate([parts[0].t] + [p.t[1:] for p in parts[1:]]))
+
+
+def test_run_steps_matches_engine_update():
+    engine = PhysicsEngine()
+    traj = run_steps(engine, 80, SIM_DT, *COMMANDS, t0=2.0)
+    reference = PhysicsEngine()
+    for i in range(80):
+        reference.update(SIM_DT, *COMMANDS)
+    assert np.array_equal(engine.state, reference.state)
+    assert traj.states.shape == (81, 6) and traj.t[0] == 2.0 and traj.t[-1] == pytest.approx(6.0)
+    assert engine.current_pp_y == COMMANDS[-1]
+
+
+def test_run_simulation_rounds_duration_to_steps():
+    traj = run_simulation(PhysicsEngine(), 1.0, *COMMANDS)
+    assert len(traj.t) == int(round(1.0 / SIM_DT)) + 1
+
+
+def test_power_to_thrust_uses_the_vessel():
+    for vessel in PRESETS.values():
+        assert power_to_thrust(100, vessel) == vessel.max_thrust
+        assert power_to_thrust(50, vessel) == pytest.approx(vessel.max_thrust / 2)
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from physics import PhysicsEngine
+from simulation import SIM_DT, power_to_thrust, run_steps
+from timeline import Timeline
+
+# Checkpoint ogni 10 passi: i tratti sotto li attraversano in punti diversi
+EVERY = 10
+A = (power_to_thrust(70), 20, power_to_thrust(40), 340, 0.0, 6.0)
+B = (power_to_thrust(30), 120, power_to_thrust(60), 200, 0.0, -4.0)
+C = (power_to_thrust(90), 0, power_to_thrust(90), 0, 0.0, 2.0)
+
+
+def _reference(*segments):
+    # Stati passo per passo di una corsa unica, senza linea temporale
+    engine = PhysicsEngine()
+    states = [engine.state.copy()]
+    for n, controls in segments:
+        states.extend(run_steps(engine, n, SIM_DT, *controls).states[1:])
+    return np.array(states)
+
+
+def _timeline(*segments):
+    timeline = Timeline(PhysicsEngine(), checkpoint_interval=EVERY * SIM_DT)
+    for n, controls in segments:
+        timeline.run(n, *controls)
+    return timeline
+
+
+def test_checkpoints_fall_on_multiples():
+    timeline = _timeline((23, A), (17, B))
+    reference = _reference((23, A), (17, B))
+    assert timeline.n_checkpoints == 5
+    np.testing.assert_array_equal(timeline.checkpoints[:5], reference[::EVERY])
+    assert timeline.segment_starts == [0, 23]
+
+
+def test_seek_every_step_is_bit_exact():
+    segments = ((23, A), (17, B))
+    timeline = _timeline(*segments)
+    reference = _reference(*segments)
+    for k in list(range(41)) + [7, 40, 0, 33]:
+        state = timeline.seek(k * SIM_DT)
+        assert timeline.step == k and timeline.end_step == 40
+        np.testing.assert_array_equal(state, reference[k])
+        # Pivot Y del tratto che ha portato al passo k
+        assert timeline.engine.current_pp_y == (A if k <= 23 else B)[5]
+
+
+def test_seek_clamps_to_simulated_range():
+    timeline = _timeline((23, A))
+    timeline.seek(-1.0)
+    assert timeline.step == 0
+    timeline.seek(100.0)
+    assert timeline.step == 23
+    assert timeline.time == pytest.approx(23 * SIM_DT)
+
+
+def test_rewind_then_run_truncates_the_future():
+    # Riavvolto a meta' del tratto B (fra due checkpoint), poi comandi C:
+    # deve coincidere con A, B fino al passo 31, poi C
+    timeline = _timeline((23, A), (17, B))
+    timeline.rewind(9 * SIM_DT)
+    assert timeline.step == 31
+    timeline.run(14, *C)
+    assert timeline.end_step == 45
+    assert timeline.segment_starts == [0, 23, 31]
+    reference = _reference((23, A), (8, B), (14, C))
+    np.testing.assert_array_equal(timeline.engine.state, reference[-1])
+    np.testing.assert_array_equal(timeline.checkpoints[:timeline.n_checkpoints], reference[::EVERY])
+    for k in (0, 22, 23, 30, 31, 32, 40, 45):
+        np.testing.assert_array_equal(timeline.seek(k * SIM_DT), reference[k])
+
+
+def test_rewind_onto_segment_start_and_checkpoint():
+    # Arrivo esattamente sull'inizio del tratto B (passo 23) e su un
+    # checkpoint (passo 20): il tratto B sparisce del tutto
+    for back in (17, 20):
+        timeline = _timeline((23, A), (17, B))
+        timeline.rewind(back * SIM_DT)
+        step = timeline.step
+        timeline.run(5, *C)
+        assert timeline.segment_starts == [0, step]
+        reference = _reference((step, A), (5, C))
+        np.testing.assert_array_equal(timeline.engine.state, reference[-1])
+        assert timeline.n_checkpoints == (step + 5) // EVERY + 1
+
+
+def test_same_commands_after_rewind_reproduce_the_run():
+    timeline = _timeline((40, A))
+    end = timeline.engine.state.copy()
+    timeline.rewind(25 * SIM_DT)
+    timeline.run(25, *A)
+    np.testing.assert_array_equal(timeline.engine.state, end)
+    assert timeline.segment_starts == [0]
+
+
+def test_fast_forward_rounds_seconds_to_steps():
+    timeline = _timeline()
+    traj = timeline.fast_forward(1.01, *A)
+    assert timeline.step == len(traj.t) - 1 == 20
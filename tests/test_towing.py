@@ -0,0 +1,65 @@
+import math
+
+import numpy as np
+import pytest
+
+from simulation import SIM_DT, power_to_thrust
+from towing import ASSISTED_SHIP, Towline, TowingSystem, body_point, bow_towline, push_setup, towing_setup
+
+
+def _run(system, seconds, power, angle):
+    thrust = power_to_thrust(power, system.tug)
+    return system.run(int(round(seconds / SIM_DT)), SIM_DT, thrust, angle, thrust, angle,
+                      system.tug.pp_x, system.tug.pp_y), 2 * thrust
+
+
+def _line_length(system):
+    line = system.links[0]
+    return math.dist(body_point(system.tug_state, line.tug_point), body_point(system.ship_state, line.ship_point))
+
+
+def test_body_point_convention():
+    # Prua a Nord: la dritta e' a Est
+    assert body_point((10.0, 20.0, math.pi / 2), (1.0, 5.0)) == pytest.approx((11.0, 25.0))
+    assert body_point((0.0, 0.0, 0.0), (1.0, 5.0)) == pytest.approx((5.0, -1.0))
+
+
+def test_towline_pulls_the_ship_astern():
+    system = towing_setup()
+    traj, total_thrust = _run(system, 120, 60, 180)
+    tension = traj.forces[-1, 0]
+    assert 0 < tension < total_thrust
+    # Nave e rimorchiatore vanno verso Sud insieme, col cavo allungato di T/k
+    assert traj.ship[-1, 1] < -50 and traj.tug[-1, 3] == pytest.approx(traj.ship[-1, 3], abs=1e-3)
+    assert _line_length(system) == pytest.approx(system.links[0].length + tension / system.links[0].stiffness, abs=1e-3)
+    # Azione e reazione
+    assert system.tug_load[:2] == pytest.approx(tuple(-f for f in system.ship_load[:2]))
+    assert system.tug_load[1] == pytest.approx(tension)
+
+
+def test_slack_towline_carries_no_force():
+    system = TowingSystem(links=[bow_towline(length=60.0)])
+    system.place((0.0, -ASSISTED_SHIP.length / 2 - 45.0, math.pi / 2), (0.0, 0.0, math.pi / 2))
+    traj, _ = _run(system, 10, 30, 180)
+    assert np.all(traj.forces == 0.0)
+    assert np.all(traj.ship == traj.ship[0])
+
+
+def test_stiff_steel_line_is_stable_at_the_simulation_step():
+    system = towing_setup(axial_stiffness=4.0e8)
+    traj, total_thrust = _run(system, 60, 60, 180)
+    assert np.isfinite(traj.tug).all() and np.isfinite(traj.ship).all()
+    assert traj.forces.max() < 2 * total_thrust
+    line = system.links[0]
+    assert _line_length(system) == pytest.approx(line.length + line.force / line.stiffness, abs=1e-3)
+
+
+def test_side_push_moves_the_ship_to_port():
+    system = push_setup()
+    traj, total_thrust = _run(system, 60, 50, 0)
+    assert 0 < traj.forces[-1, 0] < total_thrust
+    # Nave con prua a Nord spinta dalla dritta: va verso Ovest, il
+    # rimorchiatore la segue restando sul fender
+    assert traj.ship[-1, 0] < -5
+    assert traj.ship[-1, 4] > 0 and traj.tug[-1, 3] == pytest.approx(traj.ship[-1, 4], abs=1e-3)
+    assert traj.tug[-1, 0] - traj.ship[-1, 0] == pytest.approx(traj.tug[0, 0] - traj.ship[0, 0], abs=0.5)
@@ -0,0 +1,89 @@
+import numpy as np
+
+from track import RingBuffer, TrackHistory
+
+
+def _rows(start, stop):
+    # Righe (x, y, psi) riconoscibili dall'indice globale
+    i = np.arange(start, stop, dtype=float)
+    return np.stack([i, -i, 0.5 * i], axis=1)
+
+
+def test_ring_buffer_append_wraps_in_order():
+    buf = RingBuffer(4, 3)
+    evicted = [buf.append(row) for row in _rows(0, 7)]
+    assert all(e is None for e in evicted[:4])
+    np.testing.assert_array_equal(np.array(evicted[4:]), _rows(0, 3))
+    np.testing.assert_array_equal(buf.view(), _rows(3, 7))
+    assert buf.start == 3 and len(buf) == 4
+
+
+def test_ring_buffer_extend_across_the_end():
+    buf = RingBuffer(5, 3)
+    buf.extend(_rows(0, 4))
+    evicted = buf.extend(_rows(4, 8))
+    np.testing.assert_array_equal(evicted, _rows(0, 3))
+    np.testing.assert_array_equal(buf.view(), _rows(3, 8))
+    # La vista resta contigua anche dopo il giro
+    assert buf.view().base is buf.data
+
+
+def test_ring_buffer_extend_longer_than_capacity():
+    buf = RingBuffer(3, 3)
+    buf.extend(_rows(0, 2))
+    evicted = buf.extend(_rows(2, 10))
+    np.testing.assert_array_equal(evicted, _rows(0, 7))
+    np.testing.assert_array_equal(buf.view(), _rows(7, 10))
+
+
+def test_ring_buffer_drop_last_after_wrap():
+    buf = RingBuffer(4, 3)
+    buf.extend(_rows(0, 6))
+    assert buf.drop_last(3) == 3
+    np.testing.assert_array_equal(buf.view(), _rows(2, 3))
+    assert buf.drop_last(10) == 1
+    assert len(buf) == 0
+    buf.extend(_rows(6, 9))
+    np.testing.assert_array_equal(buf.view(), _rows(6, 9))
+
+
+def test_track_archive_keeps_every_decimation_th_point():
+    track = TrackHistory(capacity=10, archive_capacity=100, decimation=4)
+    track.extend(_rows(0, 23))
+    np.testing.assert_array_equal(track.recent(), _rows(13, 23)[:, :3])
+    np.testing.assert_array_equal(track.archive(), _rows(0, 13)[::4])
+    # Stesso risultato un punto alla volta
+    single = TrackHistory(capacity=10, archive_capacity=100, decimation=4)
+    for x, y, psi in _rows(0, 23):
+        single.append(x, y, psi)
+    np.testing.assert_array_equal(single.archive(), track.archive())
+    np.testing.assert_array_equal(single.recent(), track.recent())
+
+
+def test_track_without_archive():
+    track = TrackHistory(capacity=5, archive_capacity=0)
+    track.extend(_rows(0, 12))
+    assert len(track) == 5
+    assert len(track.archive()) == 0
+    np.testing.assert_array_equal(track.last(), _rows(11, 12)[0])
+
+
+def test_track_drop_last_into_archive():
+    # Riavvolgendo di n punti restano solo punti precedenti all'istante di
+    # arrivo (i punti a piena risoluzione gia' archiviati non tornano);
+    # ripartendo, la traccia coincide con una corsa senza riavvolgimento
+    capacity, d = 10, 4
+    for total in (23, 30, 41):
+        evicted = total - capacity
+        for n in range(total + 3):
+            end = max(total - n, 0)
+            track = TrackHistory(capacity=capacity, archive_capacity=100, decimation=d)
+            track.extend(_rows(0, total))
+            track.drop_last(n)
+            np.testing.assert_array_equal(track.recent(), _rows(min(evicted, end), end))
+            np.testing.assert_array_equal(track.archive(), _rows(0, min(evicted, end))[::d])
+            track.extend(_rows(end, total + 5))
+            expected = TrackHistory(capacity=capacity, archive_capacity=100, decimation=d)
+            expected.extend(_rows(0, total + 5))
+            np.testing.assert_array_equal(track.recent(), expected.recent())
+            np.testing.assert_array_equal(track.archive(), expected.archive())
@@ -0,0 +1,56 @@
+import math
+import pickle
+
+import pytest
+
+from constants import G_ACCEL
+from environment import KNOTS
+from vessel import DEFAULT_VESSEL, FIELDS, PRESETS, VesselParams, get_vessel
+
+
+def test_value_semantics():
+    copy = DEFAULT_VESSEL.replace(mass=DEFAULT_VESSEL.mass)
+    assert copy is not DEFAULT_VESSEL
+    assert copy == DEFAULT_VESSEL and hash(copy) == hash(DEFAULT_VESSEL)
+    assert len({DEFAULT_VESSEL, copy}) == 1
+    heavier = DEFAULT_VESSEL.replace(mass=2 * DEFAULT_VESSEL.mass)
+    assert heavier != DEFAULT_VESSEL
+    assert pickle.loads(pickle.dumps(heavier)) == heavier
+
+
+def test_immutable():
+    with pytest.raises(AttributeError):
+        DEFAULT_VESSEL.mass = 1.0
+    with pytest.raises(AttributeError):
+        del DEFAULT_VESSEL.mass
+    with pytest.raises(ValueError, match="sconosciuti"):
+        DEFAULT_VESSEL.replace(massa=1.0)
+    with pytest.raises(ValueError):
+        DEFAULT_VESSEL.replace(inertia=0.0)
+
+
+def test_derived_values_follow_replace():
+    vessel = DEFAULT_VESSEL.replace(mass=500000.0, thruster_x=3.0, bollard_pull=40.0)
+    assert vessel.inv_mass == 1.0 / 500000.0
+    assert vessel.pos_sx == (-3.0, vessel.thruster_y) and vessel.pos_dx == (3.0, vessel.thruster_y)
+    assert get_vessel("ASD 24m").max_thrust == 30.0 * 1000 * G_ACCEL
+    assert vessel.coefficients == (vessel.damping_surge_forward, vessel.damping_surge_reverse, vessel.damping_sway,
+                                   vessel.damping_rot, vessel.inv_mass, vessel.inv_inertia)
+    assert VesselParams(*(getattr(vessel, f) for f in FIELDS)) == vessel
+
+
+@pytest.mark.parametrize("name, forward_kt, reverse_kt", [("ASD 24m", 12.0, 11.5), ("ASD 40m", 13.0, 12.2)])
+def test_preset_top_speeds(name, forward_kt, reverse_kt):
+    # A regime la spinta dei due motori bilancia il damping quadratico
+    vessel = get_vessel(name)
+    forward = math.sqrt(2 * vessel.max_thrust / vessel.damping_surge_forward) * KNOTS
+    reverse = math.sqrt(2 * vessel.max_thrust / vessel.damping_surge_reverse) * KNOTS
+    assert forward == pytest.approx(forward_kt, abs=0.2)
+    assert reverse == pytest.approx(reverse_kt, abs=0.2)
+
+
+def test_get_vessel():
+    assert get_vessel("ASD 32m") is DEFAULT_VESSEL
+    assert set(PRESETS) >= {"ASD 24m", "ASD 32m", "ASD 40m"}
+    with pytest.raises(ValueError, match="Nave sconosciuta"):
+        get_vessel("Rimorchiatore")
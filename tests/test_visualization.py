@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from vessel import DEFAULT_VESSEL, PRESETS
+from visualization import (clock_png, fender_path, hull_path, hull_polygon, hull_silhouettes, propeller_outline,
+                           wash_vertices)
+
+
+def test_static_geometry_is_shared_and_read_only():
+    # Stessi oggetti per ogni sessione: cache per processo, in sola lettura
+    assert hull_path(DEFAULT_VESSEL) is hull_path(DEFAULT_VESSEL.replace())
+    assert fender_path() is fender_path()
+    outline = hull_polygon()
+    assert outline is hull_polygon() and not outline.flags.writeable
+    x, y = propeller_outline(30.0)
+    assert propeller_outline(30.4)[0] is x and propeller_outline(390.0)[0] is x
+    assert not x.flags.writeable and not y.flags.writeable
+    with pytest.raises(ValueError):
+        outline[0, 0] = 1.0
+
+
+def test_clock_png_is_rendered_once_per_azimuth():
+    png = clock_png(45.0, "red")
+    assert png.startswith(b"\x89PNG")
+    assert clock_png(45.2, "red") is png and clock_png(405.0, "red") is png
+    assert clock_png(45.0, "green") is not png
+
+
+def test_hull_scales_with_the_vessel():
+    for vessel in PRESETS.values():
+        outline = hull_polygon(vessel)
+        assert outline[:, 0].max() - outline[:, 0].min() == pytest.approx(vessel.width)
+        assert outline[:, 1].max() - outline[:, 1].min() == pytest.approx(vessel.length)
+
+
+def test_hull_silhouettes_place_the_hull_at_each_pose():
+    poses = np.array([[0.0, 0.0, np.pi / 2], [100.0, 50.0, 0.0]])
+    out = hull_silhouettes(poses)
+    outline = hull_polygon()
+    np.testing.assert_allclose(out[0], outline, atol=1e-12)
+    # Prua a Est: la prua (y nave) va su x mondo, la dritta verso Sud
+    np.testing.assert_allclose(out[1][:, 0], 100.0 + outline[:, 1])
+    np.testing.assert_allclose(out[1][:, 1], 50.0 - outline[:, 0])
+
+
+def test_wash_vertices_below_threshold():
+    assert wash_vertices((0.0, -10.0), 0.0, 4.0) is None
+    verts = wash_vertices((0.0, -10.0), 0.0, 100.0)
+    # Azimuth 0: la scia va verso poppa
+    assert verts[:, 1].min() < -10.0 - 20.0
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from vessel import DEFAULT_VESSEL, PRESETS
+from wash import (_NODES, _SCALE, STEP_DEG, WASH_MAX_LOSS, WashTable, batch_power_factor, jet_loss,
+                  power_factor, wash_table)
+
+
+def test_table_layout():
+    table = wash_table()
+    assert table.values.dtype == np.uint8
+    assert table.values.shape == (2, _NODES, _NODES)
+    assert not table.values.flags.writeable
+    assert wash_table(DEFAULT_VESSEL) is wash_table(DEFAULT_VESSEL)
+    np.testing.assert_array_equal(wash_table(DEFAULT_VESSEL).values, table.values)
+
+
+def test_quantisation_error_at_nodes():
+    # Sui nodi la tabella a 8 bit sbaglia al massimo di mezzo livello
+    grid = STEP_DEG * np.arange(_NODES)
+    a1, a2 = np.meshgrid(grid, grid, indexing='ij')
+    for vessel in PRESETS.values():
+        table = WashTable(vessel)
+        exact_l = jet_loss(a2, a1, vessel.pos_dx, vessel.pos_sx)
+        exact_r = jet_loss(a1, a2, vessel.pos_sx, vessel.pos_dx)
+        assert np.abs(table.values[0] * _SCALE - exact_l).max() <= _SCALE / 2 + 1e-12
+        assert np.abs(table.values[1] * _SCALE - exact_r).max() <= _SCALE / 2 + 1e-12
+        loss_l, loss_r = table.batch_losses(a1, a2)
+        np.testing.assert_allclose(loss_l, exact_l, rtol=0, atol=_SCALE / 2 + 1e-12)
+        np.testing.assert_allclose(loss_r, exact_r, rtol=0, atol=_SCALE / 2 + 1e-12)
+
+
+def test_jet_hits_the_other_thruster():
+    # Getto del destro verso sinistra (azimuth 90: spinta a dritta) sul sinistro
+    table = wash_table()
+    loss_l, loss_r = table.losses(90.0, 90.0)
+    assert loss_l > 0.5 * WASH_MAX_LOSS
+    assert loss_r == 0.0
+    assert 0.0 <= min(table.losses(0.0, 0.0)) and max(table.losses(0.0, 0.0)) < 0.01
+
+
+def test_scalar_matches_batch():
+    rng = np.random.default_rng(0)
+    a1 = rng.uniform(-720.0, 720.0, 2000)
+    a2 = rng.uniform(-720.0, 720.0, 2000)
+    t1 = rng.uniform(0.0, 40.0, 2000)
+    t2 = rng.uniform(0.0, 40.0, 2000)
+    t1[:100] = 0.0
+    t2[50:150] = t1[50:150]
+    table = wash_table()
+    batch_l, batch_r = table.batch_losses(a1, a2)
+    eff_l, eff_r = table.batch_efficiencies(t1, a1, t2, a2)
+    for i in range(len(a1)):
+        assert table.losses(a1[i], a2[i]) == (batch_l[i], batch_r[i])
+        assert table.efficiencies(t1[i], a1[i], t2[i], a2[i]) == (eff_l[i], eff_r[i])
+
+
+@pytest.mark.parametrize("a1, a2", [(0.0, 0.0), (359.5, 0.25), (90.0, 270.0), (137.3, 359.99)])
+def test_azimuth_wraps_at_360(a1, a2):
+    table = wash_table()
+    expected = table.losses(a1, a2)
+    for k in (-2, -1, 1, 3):
+        assert table.losses(a1 + 360.0 * k, a2 + 360.0 * k) == pytest.approx(expected, abs=1e-12)
+    assert table.losses(360.0, 360.0) == table.losses(0.0, 0.0)
+    l, r = table.batch_losses([a1, a1 + 360.0, a1 - 360.0], a2)
+    np.testing.assert_allclose(l, expected[0], atol=1e-12)
+    np.testing.assert_allclose(r, expected[1], atol=1e-12)
+
+
+def test_interpolation_is_continuous_across_zero():
+    table = wash_table()
+    for a2 in (0.0, 45.0, 200.0):
+        below, above = table.losses(-1e-9, a2), table.losses(1e-9, a2)
+        assert below == pytest.approx(above, abs=1e-6)
+
+
+def test_power_factor():
+    assert power_factor(0.0, 10.0) == 0.0
+    assert power_factor(10.0, 5.0) == 1.0
+    assert power_factor(10.0, 10.0) == 1.0
+    assert power_factor(4.0, 16.0) == pytest.approx(0.5)
+    src = np.array([0.0, 10.0, 10.0, 4.0])
+    dst = np.array([10.0, 5.0, 10.0, 16.0])
+    np.testing.assert_array_equal(batch_power_factor(src, dst), [power_factor(s, d) for s, d in zip(src, dst)])
@@ -0,0 +1,341 @@
+import functools
+import math
+
+import numpy as np
+
+from constants import *
+from vessel import DEFAULT_VESSEL
+from wash import WASH_MAX_LOSS, wash_table
+
+# Allocazione inversa: da una richiesta (Fx, Fy, N) ai comandi (p1, a1, p2, a2).
+#   Fx: spinta longitudinale [t] (+ = avanti)
+#   Fy: spinta trasversale [t] (+ = dritta)
+#   N : momento attorno al pivot manuale [t*m] (+ = accostata a dritta),
+#       stessa convenzione del "Momento (PP)" in telemetria.
+# Si cercano le componenti di spinta (surge, sway) dei due propulsori che
+# realizzano la richiesta minimizzando la potenza totale, con il limite del
+# 100% per motore e la perdita per scia dell'altro propulsore letta dalla
+# stessa tabella della fisica (wash.py). Il fattore di potenza della perdita
+# usa le spinte realizzate al posto di quelle comandate (approssimazione).
+# Posizioni dei propulsori, tiro a punto fisso e tabella di scia vengono
+# dalla nave (VesselParams).
+# allocate (una richiesta) prova prima un percorso scalare in forma chiusa:
+# l'ottimo senza scia e' anche l'ottimo con la scia quando li' la scia e'
+# nulla, perche' la scia puo' solo aumentare la potenza (efficienza <= 1).
+# Solo se nel punto trovato un getto investe l'altro propulsore si passa alla
+# ricerca vettoriale.
+
+# Punti della ricerca lungo lo spazio nullo (griglia + raffinamento locale)
+GRID_POINTS = 65
+REFINE_POINTS = 17
+CAPABILITY_BISECTION_STEPS = 14
+_GRID = np.linspace(0.0, 1.0, GRID_POINTS)
+_REFINE = np.linspace(-1.0, 1.0, REFINE_POINTS)
+
+
+@functools.lru_cache(maxsize=256)
+def _allocation_basis(vessel, pp_x, pp_y):
+    # Matrice B tale che B @ [c1, s1, c2, s2] = [Fx, Fy, N] attorno al pivot,
+    # con la sua pseudo-inversa e un vettore dello spazio nullo (tre equazioni,
+    # quattro incognite: resta un grado di liberta' da ottimizzare).
+    rows = []
+    for x, y in (vessel.pos_sx, vessel.pos_dx):
+        # contributo a (Fx, Fy, N) di surge e sway del propulsore
+        rows.append(((1.0, 0.0, -(x - pp_x)), (0.0, 1.0, (y - pp_y))))
+    B = np.array([rows[0][0], rows[0][1], rows[1][0], rows[1][1]]).T
+    B_pinv = np.linalg.pinv(B)
+    null = tuple(np.linalg.svd(B)[2][-1].tolist())
+    return B_pinv, null
+
+
+def _feasible_interval(px, py, nx, ny, radius):
+    # Intervallo di lam per cui |(px, py) + lam*(nx, ny)| <= radius
+    a = nx * nx + ny * ny
+    b = px * nx + py * ny
+    c = px * px + py * py - radius * radius
+    disc = b * b - a * c
+    if a == 0:
+        inside = c <= 0
+        return np.where(inside, -np.inf, np.inf), np.where(inside, np.inf, -np.inf)
+    root = np.sqrt(np.maximum(disc, 0.0))
+    ok = disc >= 0
+    return np.where(ok, (-b - root) / a, np.inf), np.where(ok, (-b + root) / a, -np.inf)
+
+
+def _interval(base, null, t_max):
+    lo1, hi1 = _feasible_interval(base[:, 0], base[:, 1], null[0], null[1], t_max)
+    lo2, hi2 = _feasible_interval(base[:, 2], base[:, 3], null[2], null[3], t_max)
+    return np.maximum(lo1, lo2), np.minimum(hi1, hi2)
+
+
+def _evaluate(base, null, lam, t_max, wash):
+    # Potenza comandata [t] per ogni lam, tenendo conto della scia.
+    # base: (n, 4), lam: (n, k) -> cost (n, k) e componenti (n, k, 4)
+    comps = base[:, None, :] + lam[..., None] * np.array(null)
+    c1, s1, c2, s2 = comps[..., 0], comps[..., 1], comps[..., 2], comps[..., 3]
+    t1 = np.hypot(c1, s1)
+    t2 = np.hypot(c2, s2)
+    eff1, eff2 = wash.batch_efficiencies(t1, np.degrees(np.arctan2(s1, c1)), t2, np.degrees(np.arctan2(s2, c2)))
+    cmd1 = t1 / eff1
+    cmd2 = t2 / eff2
+    limit = t_max * (1 + 1e-9)
+    cost = np.where((cmd1 <= limit) & (cmd2 <= limit), cmd1 + cmd2, np.inf)
+    return cost, cmd1, cmd2, comps
+
+
+def _azimuth(s, c):
+    # Azimuth [0, 360) dalle componenti: per angoli negativi piccolissimi
+    # x % 360 arrotonda a 360.0
+    a = math.degrees(math.atan2(s, c)) % 360.0
+    return a if a < 360.0 else 0.0
+
+
+def _batch_azimuth(s, c):
+    a = np.degrees(np.arctan2(s, c)) % 360.0
+    return np.where(a < 360.0, a, 0.0)
+
+
+def _grid_min(objective, lo, hi):
+    # Minimo di objective (lam (n, k) -> (n, k)) su [lo, hi] per ogni riga:
+    # griglia sull'intervallo, poi raffinamento attorno al punto migliore
+    rows = np.arange(len(lo))
+    lam = lo[:, None] + (hi - lo)[:, None] * _GRID
+    cost = objective(lam)
+    k = np.argmin(cost, axis=1)
+    center = lam[rows, k]
+    step = (hi - lo) / (GRID_POINTS - 1)
+    lam = np.clip(center[:, None] + step[:, None] * _REFINE, lo[:, None], hi[:, None])
+    lam[:, REFINE_POINTS // 2] = center
+    cost = objective(lam)
+    k = np.argmin(cost, axis=1)
+    return lam[rows, k], cost[rows, k]
+
+
+def _search(base, null, t_max, wash):
+    # Minimo della potenza lungo lo spazio nullo, nell'intervallo in cui
+    # entrambi i motori restano entro il limite.
+    # Restituisce (lam migliore, fattibile con la scia).
+    lo, hi = _interval(base, null, t_max)
+    empty = lo > hi
+    lo = np.where(empty, 0.0, lo)
+    hi = np.where(empty, 0.0, hi)
+    lam, cost = _grid_min(lambda lam: _evaluate(base, null, lam, t_max, wash)[0], lo, hi)
+    return lam, ~empty & np.isfinite(cost)
+
+
+def _min_max_norm(base, null):
+    # Senza scia: mu che minimizza max(|p1 + mu*n1|, |p2 + mu*n2|) in forma
+    # chiusa. I due quadrati sono parabole in mu (convesse: lo spazio nullo
+    # muove sempre entrambi i propulsori), il minimo del massimo sta nel
+    # vertice di una delle due o dove si incrociano.
+    n = np.array(null)
+    a1, a2 = n[0] ** 2 + n[1] ** 2, n[2] ** 2 + n[3] ** 2
+    b1 = base[:, 0] * n[0] + base[:, 1] * n[1]
+    b2 = base[:, 2] * n[2] + base[:, 3] * n[3]
+    c1 = base[:, 0] ** 2 + base[:, 1] ** 2
+    c2 = base[:, 2] ** 2 + base[:, 3] ** 2
+    da, db, dc = a1 - a2, b1 - b2, c1 - c2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if abs(da) < 1e-12:
+            crossings = [-dc / (2 * db)]
+        else:
+            root = np.sqrt(np.maximum(db * db - da * dc, 0.0))
+            crossings = [(-db - root) / da, (-db + root) / da]
+    mu = np.stack([-b1 / a1, -b2 / a2] + crossings, axis=1)
+    mu = np.where(np.isfinite(mu), mu, mu[:, :1])
+    value = np.maximum(a1 * mu * mu + 2 * b1[:, None] * mu + c1[:, None], a2 * mu * mu + 2 * b2[:, None] * mu + c2[:, None])
+    k = np.argmin(value, axis=1)
+    rows = np.arange(len(base))
+    return mu[rows, k], np.sqrt(np.maximum(value[rows, k], 0.0))
+
+
+def _max_scale(base, null, t_max, wash, mu0, g0):
+    # Massimo fattore s per cui la richiesta s*base e' realizzabile, con il
+    # suo lam. Lungo lam = s*mu azimuth e rapporto tra le spinte non cambiano
+    # con s, e quindi neanche la scia: la potenza di ogni motore e'
+    # s * g_i(mu) e s = t_max / min_mu max_i g_i(mu). L'efficienza non scende
+    # sotto 1 - WASH_MAX_LOSS, quindi il mu migliore con la scia sta dove
+    # senza scia max_i g_i non supera il minimo diviso per quel fattore: li'
+    # si cerca con la stessa griglia della ricerca normale (un solo passaggio).
+    # mu0, g0: da _min_max_norm
+    lo, hi = _interval(base, null, g0 / (1.0 - WASH_MAX_LOSS))
+    lo, hi = np.minimum(lo, mu0), np.maximum(hi, mu0)
+
+    def worst_engine(mu):
+        cmd1, cmd2 = _evaluate(base, null, mu, np.inf, wash)[1:3]
+        return np.maximum(cmd1, cmd2)
+
+    mu, g = _grid_min(worst_engine, lo, hi)
+    scale = np.minimum(1.0, t_max / np.maximum(g, 1e-12))
+    return scale, mu * scale
+
+
+def allocate_batch(Fx, Fy, N, pp_x=DEFAULT_PP_X, pp_y=DEFAULT_PP_Y, vessel=DEFAULT_VESSEL):
+    # Versione vettoriale: Fx, Fy, N array della stessa forma (pivot comune).
+    # Restituisce (p1, a1, p2, a2, achieved): potenze in %, azimuth in gradi,
+    # achieved = frazione della richiesta realizzata (1.0 se fattibile).
+    Fx, Fy, N = np.broadcast_arrays(np.asarray(Fx, dtype=float), np.asarray(Fy, dtype=float), np.asarray(N, dtype=float))
+    shape = Fx.shape
+    target = np.stack([Fx.ravel(), Fy.ravel(), N.ravel()], axis=-1)
+    B_pinv, null = _allocation_basis(vessel, float(pp_x), float(pp_y))
+    base = target @ B_pinv.T
+    t_max = vessel.bollard_pull
+    wash = wash_table(vessel)
+
+    # Oltre il limite gia' senza scia: inutile cercare la potenza minima
+    mu0, g0 = _min_max_norm(base, null)
+    infeasible = g0 > t_max * (1 + 1e-9)
+    lam = np.zeros(len(base))
+    achieved = np.ones(len(base))
+    rest = np.flatnonzero(~infeasible)
+    if len(rest):
+        lam[rest], feasible = _search(base[rest], null, t_max, wash)
+        infeasible[rest[~feasible]] = True
+
+    # Richieste oltre i limiti: si riduce la richiesta (stessa direzione)
+    # al massimo realizzabile
+    bad = np.flatnonzero(infeasible)
+    if len(bad):
+        scale, lam[bad] = _max_scale(base[bad], null, t_max, wash, mu0[bad], g0[bad])
+        achieved[bad] = scale
+        base[bad] *= scale[:, None]
+
+    cost, cmd1, cmd2, comps = _evaluate(base, null, lam[:, None], np.inf, wash)
+    c1, s1, c2, s2 = comps[:, 0].T
+    p1 = np.minimum(cmd1[:, 0] / t_max * 100.0, 100.0)
+    p2 = np.minimum(cmd2[:, 0] / t_max * 100.0, 100.0)
+    a1 = _batch_azimuth(s1, c1)
+    a2 = _batch_azimuth(s2, c2)
+    return (p1.reshape(shape), a1.reshape(shape), p2.reshape(shape), a2.reshape(shape), achieved.reshape(shape))
+
+
+def _quadratics(base, null):
+    # |p_i + lam*n_i|^2 = a_i lam^2 + 2 b_i lam + c_i per i due propulsori
+    c1, s1, c2, s2 = base
+    n0, n1, n2, n3 = null
+    return ((n0 * n0 + n1 * n1, c1 * n0 + s1 * n1, c1 * c1 + s1 * s1),
+            (n2 * n2 + n3 * n3, c2 * n2 + s2 * n3, c2 * c2 + s2 * s2))
+
+
+def _least_power_lam(q1, q2):
+    # Minimo di |p1 + lam*n1| + |p2 + lam*n2| (convessa): sta tra i vertici
+    # dei due termini, dove la derivata si annulla. Newton sulla derivata,
+    # con bisezione quando il passo esce dall'intervallo (punti angolosi)
+    (a1, b1, c1), (a2, b2, c2) = q1, q2
+    lo, hi = sorted((-b1 / a1, -b2 / a2))
+    lam = 0.5 * (lo + hi)
+    for i in range(60):
+        r1 = math.sqrt(max(a1 * lam * lam + 2 * b1 * lam + c1, 1e-24))
+        r2 = math.sqrt(max(a2 * lam * lam + 2 * b2 * lam + c2, 1e-24))
+        slope = (a1 * lam + b1) / r1 + (a2 * lam + b2) / r2
+        if slope == 0.0:
+            return lam
+        if slope > 0.0:
+            hi = lam
+        else:
+            lo = lam
+        curvature = (a1 * c1 - b1 * b1) / (r1 * r1 * r1) + (a2 * c2 - b2 * b2) / (r2 * r2 * r2)
+        step = lam - slope / curvature if curvature > 0.0 else lo - 1.0
+        new = step if lo <= step <= hi else 0.5 * (lo + hi)
+        if abs(new - lam) <= 1e-12 * (1.0 + abs(lam)):
+            return new
+        lam = new
+    return lam
+
+
+def _min_max_lam(q1, q2):
+    # Versione scalare di _min_max_norm: (mu, max delle due norme in mu)
+    (a1, b1, c1), (a2, b2, c2) = q1, q2
+    candidates = [-b1 / a1, -b2 / a2]
+    da, db, dc = a1 - a2, b1 - b2, c1 - c2
+    if abs(da) < 1e-12:
+        if db != 0.0:
+            candidates.append(-dc / (2 * db))
+    else:
+        root = math.sqrt(max(db * db - da * dc, 0.0))
+        candidates += [(-db - root) / da, (-db + root) / da]
+    value, mu = min((max(a1 * m * m + 2 * b1 * m + c1, a2 * m * m + 2 * b2 * m + c2), m) for m in candidates)
+    return mu, math.sqrt(max(value, 0.0))
+
+
+def _allocate_no_wash(Fx, Fy, N, pp_x, pp_y, vessel):
+    # Percorso scalare di allocate: ottimo senza scia (minima potenza, o
+    # massima frazione realizzabile oltre i limiti). None se li' la scia non
+    # e' nulla o se l'ottimo senza vincoli supera il limite di un motore
+    # (minimo sul bordo: ci pensa la ricerca)
+    B_pinv, null = _allocation_basis(vessel, float(pp_x), float(pp_y))
+    base = (B_pinv @ (float(Fx), float(Fy), float(N))).tolist()
+    t_max = vessel.bollard_pull
+    q1, q2 = _quadratics(base, null)
+    mu, g = _min_max_lam(q1, q2)
+    if g > t_max * (1 + 1e-9):
+        # Fuori dai limiti: richiesta ridotta a t_max / g (come _max_scale)
+        lam, scale = mu, t_max / g
+    else:
+        lam, scale = _least_power_lam(q1, q2), 1.0
+    c1, s1, c2, s2 = (scale * (b + lam * n) for b, n in zip(base, null))
+    t1, t2 = math.hypot(c1, s1), math.hypot(c2, s2)
+    if max(t1, t2) > t_max * (1 + 1e-9):
+        return None
+    a1, a2 = _azimuth(s1, c1), _azimuth(s2, c2)
+    if wash_table(vessel).losses(a1, a2) != (0.0, 0.0):
+        return None
+    return min(t1 / t_max * 100.0, 100.0), a1, min(t2 / t_max * 100.0, 100.0), a2, scale
+
+
+def allocate(Fx, Fy, N, pp_x=DEFAULT_PP_X, pp_y=DEFAULT_PP_Y, vessel=DEFAULT_VESSEL):
+    # Singola richiesta: restituisce (p1, a1, p2, a2, achieved) come float
+    fast = _allocate_no_wash(Fx, Fy, N, pp_x, pp_y, vessel)
+    if fast is not None:
+        return fast
+    p1, a1, p2, a2, achieved = allocate_batch(Fx, Fy, N, pp_x, pp_y, vessel)
+    return float(p1), float(a1), float(p2), float(a2), float(achieved)
+
+
+def allocate_least_norm(Fx, Fy, N, pp_x=DEFAULT_PP_X, pp_y=DEFAULT_PP_Y, vessel=DEFAULT_VESSEL):
+    # Allocazione rapida (pochi microsecondi) per chi ha un budget stretto:
+    # soluzione di minima norma (pseudo-inversa, nessuna ricerca sullo spazio
+    # nullo, niente scia), ridotta in scala se un motore supera il 100%.
+    # Stesso risultato di allocate: (p1, a1, p2, a2, achieved)
+    B_pinv, null = _allocation_basis(vessel, float(pp_x), float(pp_y))
+    c1, s1, c2, s2 = (B_pinv @ (float(Fx), float(Fy), float(N))).tolist()
+    t1, t2 = math.hypot(c1, s1), math.hypot(c2, s2)
+    achieved = min(1.0, vessel.bollard_pull / max(t1, t2, 1e-12))
+    return (t1 * achieved / vessel.bollard_pull * 100.0, _azimuth(s1, c1),
+            t2 * achieved / vessel.bollard_pull * 100.0, _azimuth(s2, c2), achieved)
+
+
+def _max_force_batch(theta_deg, N, pp_x, pp_y, vessel, f_max):
+    # Bisezione sul modulo della spinta lungo ogni direzione, a momento fisso
+    B_pinv, null = _allocation_basis(vessel, float(pp_x), float(pp_y))
+    t_max = vessel.bollard_pull
+    wash = wash_table(vessel)
+    rad = np.radians(theta_deg)
+    direction = np.stack([np.cos(rad), np.sin(rad), np.zeros_like(rad)], axis=-1) @ B_pinv.T
+    moment = np.stack([np.zeros_like(rad), np.zeros_like(rad), np.broadcast_to(N, rad.shape)], axis=-1) @ B_pinv.T
+
+    feasible_at_zero = _search(moment, null, t_max, wash)[1]
+    lo, hi = np.zeros(len(rad)), np.full(len(rad), f_max)
+    for i in range(CAPABILITY_BISECTION_STEPS):
+        mid = 0.5 * (lo + hi)
+        ok = _search(moment + direction * mid[:, None], null, t_max, wash)[1]
+        lo = np.where(ok, mid, lo)
+        hi = np.where(ok, hi, mid)
+    return np.where(feasible_at_zero, lo, np.nan)
+
+
+@functools.lru_cache(maxsize=64)
+def _capability_cached(pp_x, pp_y, N, n_directions, vessel):
+    theta = np.arange(n_directions) * (360.0 / n_directions)
+    force = _max_force_batch(theta, N, pp_x, pp_y, vessel, 2.0 * vessel.bollard_pull)
+    theta.flags.writeable = False
+    force.flags.writeable = False
+    return theta, force
+
+
+def capability_envelope(N=0.0, pp_x=DEFAULT_PP_X, pp_y=DEFAULT_PP_Y, n_directions=360, vessel=DEFAULT_VESSEL):
+    # Diagramma di capacita': per ogni direzione (0° = avanti, 90° = dritta)
+    # la massima spinta [t] ottenibile mantenendo il momento N [t*m] attorno
+    # al pivot, con perdite per scia. NaN se il momento da solo non e'
+    # realizzabile. Risultato in cache per pivot e momento (arrotondati).
+    return _capability_cached(round(float(pp_x), 2), round(float(pp_y), 2), round(float(N), 1), int(n_directions), vessel)
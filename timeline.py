@@ -0,0 +1,109 @@
+import bisect
+
+import numpy as np
+
+from constants import *
+from simulation import SIM_DT, run_steps
+
+# Linea temporale della predizione: salva lo stato del motore ogni
+# `checkpoint_interval` secondi e i tratti a comandi costanti. Avanti veloce =
+# integrazione in blocco senza disegnare; riavvolgimento = ultimo checkpoint
+# prima dell'istante richiesto + re-integrazione del solo intervallo mancante.
+# A passo fisso l'integrazione e' deterministica: lo stato ritrovato e' lo
+# stesso (bit per bit) della prima corsa. Fa eccezione rk45, che ricorda il
+# passo adattivo tra una chiamata e l'altra (differenze entro la tolleranza).
+
+
+class Timeline:
+    def __init__(self, engine, dt=SIM_DT, checkpoint_interval=5.0):
+        self.engine = engine
+        self.dt = dt
+        self.checkpoint_every = max(int(round(checkpoint_interval / dt)), 1)
+        self.reset()
+
+    def reset(self):
+        # Riparte dallo stato attuale del motore (passo 0)
+        self.step = 0
+        self.end_step = 0
+        self.checkpoints = np.empty((64, 6))
+        self.checkpoints[0] = self.engine.state
+        self.n_checkpoints = 1
+        # Tratti a comandi costanti: passo di inizio, (integratore, ambiente, argomenti di run_steps)
+        self.segment_starts = []
+        self.segments = []
+
+    @property
+    def time(self):
+        return self.step * self.dt
+
+    @property
+    def duration(self):
+        return self.end_step * self.dt
+
+    def _truncate(self):
+        # Dopo un riavvolgimento il "futuro" registrato non vale piu'
+        if self.end_step == self.step:
+            return
+        self.n_checkpoints = self.step // self.checkpoint_every + 1
+        k = bisect.bisect_left(self.segment_starts, self.step)
+        del self.segment_starts[k:]
+        del self.segments[k:]
+        self.end_step = self.step
+
+    def run(self, n_steps, left_thrust, left_angle, right_thrust, right_angle, pp_x, pp_y):
+        # Come run_steps, registrando comandi e checkpoint
+        self._truncate()
+        args = (left_thrust, left_angle, right_thrust, right_angle, pp_x, pp_y)
+        segment = (self.engine.integrator, self.engine.environment, args)
+        if not self.segments or self.segments[-1] != segment:
+            self.segment_starts.append(self.step)
+            self.segments.append(segment)
+
+        start = self.step
+        traj = run_steps(self.engine, n_steps, self.dt, *args, t0=start * self.dt)
+        self.step = self.end_step = start + int(n_steps)
+
+        # Checkpoint: righe della traiettoria che cadono sui multipli di checkpoint_every
+        first = -(-start // self.checkpoint_every) * self.checkpoint_every
+        rows = traj.states[first - start::self.checkpoint_every]
+        if first == start and len(rows):
+            rows = rows[1:]  # stato iniziale gia' salvato
+        needed = self.n_checkpoints + len(rows)
+        if needed > len(self.checkpoints):
+            grown = np.empty((max(needed, 2 * len(self.checkpoints)), 6))
+            grown[:self.n_checkpoints] = self.checkpoints[:self.n_checkpoints]
+            self.checkpoints = grown
+        self.checkpoints[self.n_checkpoints:needed] = rows
+        self.n_checkpoints = needed
+        return traj
+
+    def fast_forward(self, seconds, left_thrust, left_angle, right_thrust, right_angle, pp_x, pp_y):
+        # Avanza di `seconds` a comandi costanti, senza frame intermedi
+        return self.run(int(round(seconds / self.dt)), left_thrust, left_angle, right_thrust, right_angle, pp_x, pp_y)
+
+    def seek(self, t):
+        # Porta il motore all'istante t (entro la parte gia' simulata)
+        target = min(max(int(round(t / self.dt)), 0), self.end_step)
+        k = min(target // self.checkpoint_every, self.n_checkpoints - 1)
+        step = k * self.checkpoint_every
+        self.engine.state[:] = self.checkpoints[k]
+
+        # Re-integrazione del tratto tra checkpoint e target, tratto per tratto
+        integrator, environment = self.engine.integrator, self.engine.environment
+        j = bisect.bisect_right(self.segment_starts, step) - 1
+        while step < target:
+            seg_end = self.segment_starts[j + 1] if j + 1 < len(self.segments) else self.end_step
+            n = min(target, seg_end) - step
+            self.engine.integrator, self.engine.environment, args = self.segments[j]
+            run_steps(self.engine, n, self.dt, *args)
+            step += n
+            j += 1
+        self.engine.integrator, self.engine.environment = integrator, environment
+        if self.segments:
+            j = max(bisect.bisect_right(self.segment_starts, max(target - 1, 0)) - 1, 0)
+            self.engine.current_pp_y = self.segments[j][2][5]
+        self.step = target
+        return self.engine.state
+
+    def rewind(self, seconds):
+        return self.seek(self.time - seconds)
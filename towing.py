@@ -0,0 +1,327 @@
+import argparse
+import math
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from constants import *
+from integrators import semi_implicit_euler_step
+from physics import thruster_forces
+from simulation import SIM_DT, power_to_thrust
+from vessel import DEFAULT_VESSEL, VesselParams
+
+# Rimorchio e spinta: il rimorchiatore e una nave assistita integrati insieme,
+# collegati da un cavo elastico (lavora solo in trazione) o dal contatto del
+# fender di prua contro la murata (solo compressione, con attrito).
+# La forza del collegamento agisce su entrambi i corpi.
+#   python towing.py --mode cavo --power 60 --angle 180
+#   python towing.py --mode spinta --power 50 --duration 120
+# Il sistema e' rigido (cavo d'acciaio: decine di MN/m contro 650 t di
+# rimorchiatore): con Eulero esplicito servirebbero passi di millisecondi.
+# Qui ogni passo e':
+#   1. passo semi-implicito di ciascun corpo da solo (damping implicito)
+#   2. forze dei collegamenti come vincoli "morbidi": molla e smorzatore
+#      valutati sulla velocita' di fine passo (Eulero implicito sulla sola
+#      direzione del collegamento, un'equazione scalare in forma chiusa),
+#      stabili per qualsiasi rigidezza a passo SIM_DT
+#   3. posizioni dalle velocita' aggiornate (come semi_implicit_euler_step)
+
+TOWLINE = "CAVO"
+PUSH = "SPINTA"
+
+# t: (n+1,); tug, ship: (n+1, 6) [x, y, psi, u, v, r]; forces: (n+1, collegamenti) [N]
+CoupledTrajectory = namedtuple("CoupledTrajectory", ["t", "tug", "ship", "forces"])
+
+# Nave assistita di riferimento: portacontainer 180 m, 25 000 t, senza
+# propulsione (thruster e tiro a punto fisso nulli, pivot al centro).
+# Damping dalla resistenza al moto (~0.6 MN a 15 kn) e dall'area laterale
+# immersa (L*T = 180 * 9 m^2, Cd ~1) integrata lungo lo scafo per la rotazione.
+ASSISTED_SHIP = VesselParams(
+    "Nave 180m", 180.0, 30.0, 25.0e6, 25.0e6 * 45.0**2,
+    1.0e4, 1.5e4, 8.3e5, 1.5e11,
+    0.0, -80.0, 0.0, pp_x=0.0, pp_y=0.0, wind_area_front=600.0, wind_area_side=3000.0)
+
+
+# --- GEOMETRIA ---
+def body_point(state, point):
+    # point in coordinate nave (x = dritta, y = prua) -> mondo
+    x, y, psi = state[0], state[1], state[2]
+    c, s = math.cos(psi), math.sin(psi)
+    return x + point[1] * c + point[0] * s, y + point[1] * s - point[0] * c
+
+
+def body_direction(state, direction):
+    c, s = math.cos(state[2]), math.sin(state[2])
+    return direction[1] * c + direction[0] * s, direction[1] * s - direction[0] * c
+
+
+# --- VINCOLI MORBIDI ---
+# Corpo durante il passo: [x, y, vx, vy, r, inv_mass, inv_inertia, Fx, Fy, M],
+# velocita' lineari in coordinate mondo (le masse sono uguali in surge e
+# sway); Fx, Fy, M accumulano la forza dei collegamenti del passo.
+def _body(state, vessel):
+    x, y, psi, u, v, r = state
+    c, s = math.cos(psi), math.sin(psi)
+    return [x, y, u * c - v * s, u * s + v * c, r, vessel.inv_mass, vessel.inv_inertia, 0.0, 0.0, 0.0]
+
+
+def _to_body(psi, load):
+    # (Fx, Fy, M) mondo -> (X, Y, N) nel body frame di physics
+    c, s = math.cos(psi), math.sin(psi)
+    return load[0] * c + load[1] * s, load[1] * c - load[0] * s, load[2]
+
+
+def _row(A, pa, B, pb, nx, ny):
+    # Bracci (rho x n), velocita' relativa dei due punti lungo n (B rispetto
+    # ad A) e massa inversa efficace del collegamento
+    ra = (pa[0] - A[0]) * ny - (pa[1] - A[1]) * nx
+    rb = (pb[0] - B[0]) * ny - (pb[1] - B[1]) * nx
+    rel = (B[2] * nx + B[3] * ny + B[4] * rb) - (A[2] * nx + A[3] * ny + A[4] * ra)
+    w = A[5] + ra * ra * A[6] + B[5] + rb * rb * B[6]
+    return ra, rb, rel, w
+
+
+def _apply(A, B, ra, rb, nx, ny, f, dt):
+    # Forza f lungo n su A, uguale e contraria su B, per la durata dt
+    ia, ib = f * dt * A[5], f * dt * B[5]
+    A[2] += ia * nx; A[3] += ia * ny; A[4] += f * dt * A[6] * ra
+    B[2] -= ib * nx; B[3] -= ib * ny; B[4] -= f * dt * B[6] * rb
+    A[7] += f * nx; A[8] += f * ny; A[9] += f * ra
+    B[7] -= f * nx; B[8] -= f * ny; B[9] -= f * rb
+
+
+def _damping(damping_ratio, stiffness, w):
+    # Smorzatore come frazione del critico sulla massa efficace 1/w
+    return 2.0 * damping_ratio * math.sqrt(stiffness / w)
+
+
+class Towline:
+    # Cavo elastico tra un punto del rimorchiatore e uno della nave. Tensione
+    # T = k * allungamento + c * velocita' di allungamento, nulla se lasco.
+    # axial_stiffness: EA [N] (HMPE 64 mm ~1e8, acciaio 60 mm ~4e8); k = EA / length
+    kind = TOWLINE
+
+    def __init__(self, tug_point, ship_point, length, axial_stiffness=1.0e8, damping_ratio=0.3):
+        self.tug_point = tuple(tug_point)
+        self.ship_point = tuple(ship_point)
+        self.length = float(length)
+        self.stiffness = axial_stiffness / self.length
+        self.damping_ratio = damping_ratio
+        self.force = 0.0
+
+    def solve(self, A, tug_state, B, ship_state, dt):
+        pa = body_point(tug_state, self.tug_point)
+        pb = body_point(ship_state, self.ship_point)
+        dx, dy = pb[0] - pa[0], pb[1] - pa[1]
+        d = math.hypot(dx, dy)
+        self.force = 0.0
+        if d < 1e-9:
+            return
+        nx, ny = dx / d, dy / d
+        ra, rb, rel, w = _row(A, pa, B, pb, nx, ny)
+        k = self.stiffness
+        kc = k * dt + _damping(self.damping_ratio, k, w)
+        # T = k*(g + dt*g'_fine) + c*g'_fine, con g'_fine = rel - dt*w*T
+        tension = (k * (d - self.length) + kc * rel) / (1.0 + kc * dt * w)
+        if tension > 0.0:
+            _apply(A, B, ra, rb, nx, ny, tension, dt)
+            self.force = tension
+
+
+class PushContact:
+    # Fender di prua del rimorchiatore (tug_point, la punta di fender_path)
+    # contro un tratto dritto di murata: ship_point, normale uscente e mezza
+    # lunghezza del tratto in coordinate nave. Il punto di contatto scorre
+    # lungo la murata e fuori dal tratto il contatto si perde; l'attrito
+    # della gomma e' viscoso e limitato a friction * forza normale (contatto
+    # in un punto: a comandi fissi il rimorchiatore puo' ruotare e scivolare).
+    # stiffness: rigidezza del fender [N/m] (~1 MN a 20 cm di schiacciamento)
+    kind = PUSH
+
+    def __init__(self, tug_point, ship_point, normal, half_length, stiffness=5.0e6, damping_ratio=0.5,
+                 friction=0.3, slip_damping=1.0e7):
+        nx, ny = normal
+        norm = math.hypot(nx, ny)
+        self.tug_point = tuple(tug_point)
+        self.ship_point = tuple(ship_point)
+        self.normal = (nx / norm, ny / norm)
+        self.half_length = float(half_length)
+        self.stiffness = stiffness
+        self.damping_ratio = damping_ratio
+        self.friction = friction
+        self.slip_damping = slip_damping
+        self.force = 0.0
+
+    def solve(self, A, tug_state, B, ship_state, dt):
+        self.force = 0.0
+        pa = body_point(tug_state, self.tug_point)
+        p0 = body_point(ship_state, self.ship_point)
+        nx, ny = body_direction(ship_state, self.normal)
+        tx, ty = -ny, nx
+        along = (pa[0] - p0[0]) * tx + (pa[1] - p0[1]) * ty
+        if abs(along) > self.half_length:
+            return
+        pb = (p0[0] + along * tx, p0[1] + along * ty)
+        gap = (pa[0] - pb[0]) * nx + (pa[1] - pb[1]) * ny
+
+        # Normale: N spinge il rimorchiatore lungo n (fuori dalla murata)
+        ra, rb, rel, w = _row(A, pa, B, pb, nx, ny)
+        k = self.stiffness
+        kc = k * dt + _damping(self.damping_ratio, k, w)
+        normal_force = -(k * gap - kc * rel) / (1.0 + kc * dt * w)
+        if normal_force <= 0.0:
+            return
+        _apply(A, B, ra, rb, nx, ny, normal_force, dt)
+        self.force = normal_force
+
+        # Attrito lungo la murata, dopo la normale (una sola passata)
+        ra, rb, rel, w = _row(A, pa, B, pb, tx, ty)
+        c = self.slip_damping
+        limit = self.friction * normal_force
+        friction_force = min(max(c * rel / (1.0 + c * dt * w), -limit), limit)
+        _apply(A, B, ra, rb, tx, ty, friction_force, dt)
+
+
+def bow_towline(tug=DEFAULT_VESSEL, ship=ASSISTED_SHIP, length=40.0, ship_end="poppa", **kwargs):
+    # Cavo dal verricello di prua del rimorchiatore al passacavo di poppa o di prua della nave
+    ship_y = -ship.length / 2 if ship_end == "poppa" else ship.length / 2
+    return Towline((0.0, tug.length / 2 - 1.5), (0.0, ship_y), length, **kwargs)
+
+
+def side_push(tug=DEFAULT_VESSEL, ship=ASSISTED_SHIP, side="dritta", position=0.0, **kwargs):
+    # Spinta di prua sulla murata, tratto dritto centrale (~60% della lunghezza);
+    # position: distanza dal centro nave verso prua [m]
+    sign = 1.0 if side == "dritta" else -1.0
+    return PushContact((0.0, tug.length / 2), (sign * ship.width / 2, position), (sign, 0.0), 0.3 * ship.length, **kwargs)
+
+
+# --- SISTEMA ACCOPPIATO ---
+class TowingSystem:
+    def __init__(self, tug=DEFAULT_VESSEL, ship=ASSISTED_SHIP, links=(), environment=None):
+        # links: Towline / PushContact; environment: environment.Environment
+        self.tug = tug
+        self.ship = ship
+        self.links = list(links)
+        self.environment = environment
+        self.ship_forces = (0.0, 0.0, 0.0)
+        self.tug_state = np.zeros(6)
+        self.ship_state = np.zeros(6)
+        # Forza dei collegamenti al passo precedente (Fx, Fy, M) in coordinate mondo
+        self.tug_load = self.ship_load = (0.0, 0.0, 0.0)
+
+    def place(self, tug_state, ship_state):
+        # Stati iniziali [x, y, psi, u, v, r] (anche solo i primi tre)
+        self.tug_state[:] = 0.0
+        self.ship_state[:] = 0.0
+        self.tug_state[:len(tug_state)] = tug_state
+        self.ship_state[:len(ship_state)] = ship_state
+        self.tug_load = self.ship_load = (0.0, 0.0, 0.0)
+        for link in self.links:
+            link.force = 0.0
+
+    def forces(self):
+        return [link.force for link in self.links]
+
+    def step(self, dt, tug_forces, pp_x, pp_y):
+        # tug_forces: (X, Y, N) dei propulsori (physics.thruster_forces)
+        tug, ship = self.tug, self.ship
+        ts, ss = self.tug_state.tolist(), self.ship_state.tolist()
+        env_t = env_s = None
+        if self.environment is not None:
+            env_t = self.environment.sample(ts[0], ts[1])
+            env_s = self.environment.sample(ss[0], ss[1])
+
+        # 1. Ciascun corpo da solo: contano solo le nuove velocita'. La forza
+        # dei collegamenti del passo precedente entra come forza esterna (cosi'
+        # damping implicito e soglia di arresto la vedono) e poi si toglie:
+        # al punto 2 i collegamenti vengono risolti da capo.
+        tug_total = [a + b for a, b in zip(tug_forces, _to_body(ts[2], self.tug_load))]
+        ship_total = [a + b for a, b in zip(self.ship_forces, _to_body(ss[2], self.ship_load))]
+        A = _body(ts[:3] + semi_implicit_euler_step(ts, dt, tug_total, pp_x, pp_y, tug, env_t)[3:], tug)
+        B = _body(ss[:3] + semi_implicit_euler_step(ss, dt, ship_total, ship.pp_x, ship.pp_y, ship, env_s)[3:], ship)
+        for body, load in ((A, self.tug_load), (B, self.ship_load)):
+            body[2] -= load[0] * dt * body[5]
+            body[3] -= load[1] * dt * body[5]
+            body[4] -= load[2] * dt * body[6]
+
+        # 2. Collegamenti sulla geometria di inizio passo
+        for link in self.links:
+            link.solve(A, ts, B, ss, dt)
+        self.tug_load, self.ship_load = tuple(A[7:]), tuple(B[7:])
+
+        # 3. Posizioni (heading di inizio passo, come negli integratori)
+        for state, body in ((ts, A), (ss, B)):
+            x, y, psi = state[0], state[1], state[2]
+            c, s = math.cos(psi), math.sin(psi)
+            vx, vy, r = body[2], body[3], body[4]
+            state[:] = [x + vx * dt, y + vy * dt, (psi + r * dt) % (2 * math.pi), vx * c + vy * s, vy * c - vx * s, r]
+        self.tug_state[:] = ts
+        self.ship_state[:] = ss
+
+    def run(self, n_steps, dt, left_thrust, left_angle, right_thrust, right_angle, pp_x, pp_y, t0=0.0):
+        # Comandi costanti come simulation.run_steps
+        n_steps = int(n_steps)
+        t = t0 + dt * np.arange(n_steps + 1)
+        tug = np.empty((n_steps + 1, 6))
+        ship = np.empty((n_steps + 1, 6))
+        forces = np.empty((n_steps + 1, len(self.links)))
+        tug[0], ship[0], forces[0] = self.tug_state, self.ship_state, self.forces()
+        thrust = thruster_forces(left_thrust, left_angle, right_thrust, right_angle, self.tug)
+        for i in range(1, n_steps + 1):
+            self.step(dt, thrust, pp_x, pp_y)
+            tug[i], ship[i], forces[i] = self.tug_state, self.ship_state, self.forces()
+        return CoupledTrajectory(t, tug, ship, forces)
+
+
+def towing_setup(tug=DEFAULT_VESSEL, ship=ASSISTED_SHIP, length=40.0, **kwargs):
+    # Nave con prua a Nord all'origine, rimorchiatore a poppa rivolto verso
+    # la nave (tira indietro: azimuth 180), cavo appena in tiro
+    line = bow_towline(tug, ship, length, "poppa", **kwargs)
+    system = TowingSystem(tug, ship, [line])
+    tug_y = -ship.length / 2 - length - line.tug_point[1]
+    system.place((0.0, tug_y, math.pi / 2), (0.0, 0.0, math.pi / 2))
+    return system
+
+
+def push_setup(tug=DEFAULT_VESSEL, ship=ASSISTED_SHIP, position=0.0, **kwargs):
+    # Nave con prua a Nord, rimorchiatore a dritta con la prua sul fender
+    # contro la murata (spinge verso Ovest con azimuth 0)
+    contact = side_push(tug, ship, "dritta", position, **kwargs)
+    system = TowingSystem(tug, ship, [contact])
+    system.place((ship.width / 2 + tug.length / 2, position, math.pi), (0.0, 0.0, math.pi / 2))
+    return system
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rimorchio a cavo o spinta su una nave assistita")
+    parser.add_argument("--mode", choices=("cavo", "spinta"), default="cavo")
+    parser.add_argument("--power", type=float, default=60.0, help="potenza dei due propulsori [%%]")
+    parser.add_argument("--angle", type=float, default=None, help="azimuth [°] (default: 180 col cavo, 0 in spinta)")
+    parser.add_argument("--duration", type=float, default=300.0, help="durata [s]")
+    parser.add_argument("--dt", type=float, default=SIM_DT, help="passo di integrazione [s]")
+    parser.add_argument("--length", type=float, default=40.0, help="lunghezza del cavo [m]")
+    parser.add_argument("--stiffness", type=float, default=None, help="EA del cavo [N] o rigidezza del fender [N/m]")
+    args = parser.parse_args()
+
+    options = {} if args.stiffness is None else {("axial_stiffness" if args.mode == "cavo" else "stiffness"): args.stiffness}
+    if args.mode == "cavo":
+        system = towing_setup(length=args.length, **options)
+        angle = 180.0 if args.angle is None else args.angle
+    else:
+        system = push_setup(**options)
+        angle = 0.0 if args.angle is None else args.angle
+    thrust = power_to_thrust(args.power, system.tug)
+
+    n_steps = int(round(args.duration / args.dt))
+    t0 = time.perf_counter()
+    traj = system.run(n_steps, args.dt, thrust, angle, thrust, angle, system.tug.pp_x, system.tug.pp_y)
+    elapsed = time.perf_counter() - t0
+
+    KNOTS = 1.94384
+    force_t = traj.forces[:, 0] / (1000 * G_ACCEL)
+    ship_speed = np.hypot(traj.ship[:, 3], traj.ship[:, 4]) * KNOTS
+    print(f"{n_steps} passi in {elapsed:.2f} s: {args.duration / elapsed:.0f}x tempo reale")
+    print(f"forza {system.links[0].kind.lower()}: max {force_t.max():.1f} t, finale {force_t[-1]:.1f} t")
+    print(f"nave: velocita' finale {ship_speed[-1]:.2f} kn, rotta {(90 - math.degrees(traj.ship[-1, 2])) % 360:.1f}°, "
+          f"rateo {math.degrees(traj.ship[-1, 5]) * 60:.1f} °/min")
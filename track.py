@@ -0,0 +1,133 @@
+import numpy as np
+
+from constants import *
+
+
+class RingBuffer:
+    # Buffer circolare a capacita' fissa per righe di n_fields float.
+    # Ogni riga viene scritta due volte (in i e in i + capacity): cosi' le
+    # righe in ordine cronologico sono sempre una fetta contigua dell'array
+    # e view() non copia nulla.
+    def __init__(self, capacity, n_fields):
+        self.capacity = int(capacity)
+        self.data = np.zeros((2 * self.capacity, n_fields))
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def clear(self):
+        self.start = 0
+        self.size = 0
+
+    def append(self, row):
+        # Restituisce la riga eliminata se il buffer era pieno, altrimenti None
+        evicted = None
+        if self.size == self.capacity:
+            evicted = self.data[self.start].copy()
+            i = self.start
+            self.start = (self.start + 1) % self.capacity
+        else:
+            i = (self.start + self.size) % self.capacity
+            self.size += 1
+        self.data[i] = row
+        self.data[i + self.capacity] = row
+        return evicted
+
+    def extend(self, rows):
+        # Restituisce le righe eliminate (in ordine) per far posto alle nuove
+        rows = np.asarray(rows, dtype=float)
+        if len(rows) > self.capacity:
+            dropped = np.concatenate([self.view(), rows[:-self.capacity]])
+            self.clear()
+            self.extend(rows[-self.capacity:])
+            return dropped
+        n_evict = max(self.size + len(rows) - self.capacity, 0)
+        evicted = self.view()[:n_evict].copy()
+
+        i = (self.start + self.size) % self.capacity
+        first = min(len(rows), self.capacity - i)
+        for block, pos in ((rows[:first], i), (rows[first:], 0)):
+            if len(block):
+                self.data[pos:pos + len(block)] = block
+                self.data[pos + self.capacity:pos + self.capacity + len(block)] = block
+
+        self.start = (self.start + n_evict) % self.capacity
+        self.size = min(self.size + len(rows), self.capacity)
+        return evicted
+
+    def drop_last(self, n):
+        # Toglie le ultime n righe (le piu' recenti); restituisce quante ne ha tolte
+        n = min(max(int(n), 0), self.size)
+        self.size -= n
+        return n
+
+    def view(self):
+        # Righe in ordine cronologico, senza copia (vista sull'array interno)
+        return self.data[self.start:self.start + self.size]
+
+
+class TrackHistory:
+    # Traccia della nave: [x, y, psi] per passo. Gli ultimi `capacity` punti
+    # sono a piena risoluzione; quelli piu' vecchi passano in un archivio che
+    # ne tiene uno ogni `decimation` (archive_capacity = 0 -> nessun archivio).
+    def __init__(self, capacity=TRACK_CAPACITY, archive_capacity=TRACK_ARCHIVE_CAPACITY, decimation=TRACK_DECIMATION):
+        self.recent_buffer = RingBuffer(capacity, 3)
+        self.archive_buffer = RingBuffer(archive_capacity, 3) if archive_capacity > 0 else None
+        self.decimation = max(int(decimation), 1)
+        self._evicted_count = 0
+
+    def __len__(self):
+        return len(self.recent_buffer) + (len(self.archive_buffer) if self.archive_buffer is not None else 0)
+
+    def clear(self):
+        self.recent_buffer.clear()
+        if self.archive_buffer is not None:
+            self.archive_buffer.clear()
+        self._evicted_count = 0
+
+    def _archive(self, rows):
+        if self.archive_buffer is None or len(rows) == 0:
+            return
+        # Tiene le righe con indice globale multiplo di decimation
+        first = (-self._evicted_count) % self.decimation
+        self.archive_buffer.extend(rows[first::self.decimation])
+        self._evicted_count += len(rows)
+
+    def append(self, x, y, psi):
+        evicted = self.recent_buffer.append((x, y, psi))
+        if evicted is not None:
+            self._archive(evicted[None, :])
+
+    def extend(self, states):
+        # states: array (n, >=3) con colonne x, y, psi (es. Trajectory.states)
+        self._archive(self.recent_buffer.extend(np.asarray(states)[:, :3]))
+
+    def drop_last(self, n):
+        # Riavvolgimento: toglie gli ultimi n punti. Se sono piu' di quelli a
+        # piena risoluzione si continua nell'archivio, togliendo i punti
+        # decimati che cadono nel tratto riavvolto
+        n -= self.recent_buffer.drop_last(n)
+        if n <= 0 or self._evicted_count == 0:
+            return
+        kept = max(self._evicted_count - n, 0)
+        if self.archive_buffer is not None:
+            # Punti archiviati (indice globale multiplo di decimation) nel
+            # tratto [kept, _evicted_count)
+            d = self.decimation
+            archived = -(-self._evicted_count // d)
+            still_archived = -(-kept // d)
+            self.archive_buffer.drop_last(archived - still_archived)
+        self._evicted_count = kept
+
+    def recent(self):
+        return self.recent_buffer.view()
+
+    def archive(self):
+        if self.archive_buffer is None:
+            return self.recent_buffer.view()[:0]
+        return self.archive_buffer.view()
+
+    def last(self):
+        return self.recent_buffer.view()[-1] if len(self.recent_buffer) else None
@@ -0,0 +1,26 @@
+import numpy as np
+
+# Geometria dei vettori di spinta nel piano nave (x = dritta, y = prua), in tonnellate.
+
+
+def check_wash_hit(origin, wash_vec, target_pos, threshold=2.0):
+    wash_len = np.linalg.norm(wash_vec)
+    if wash_len < 0.1: return False
+    wash_dir = wash_vec / wash_len
+    to_target = target_pos - origin
+    proj_length = np.dot(to_target, wash_dir)
+    if proj_length > 0: 
+        perp_dist = np.linalg.norm(to_target - (proj_length * wash_dir))
+        return perp_dist < threshold
+    return False
+
+
+def intersect_lines(p1, angle1_deg, p2, angle2_deg):
+    th1, th2 = np.radians(90 - angle1_deg), np.radians(90 - angle2_deg)
+    v1, v2 = np.array([np.cos(th1), np.sin(th1)]), np.array([np.cos(th2), np.sin(th2)])
+    matrix = np.column_stack((v1, -v2))
+    if abs(np.linalg.det(matrix)) < 1e-4: return None
+    try:
+        t = np.linalg.solve(matrix, p2 - p1)[0]
+        return p1 + t * v1
+    except: return None
@@ -0,0 +1,111 @@
+from constants import *
+
+# Parametri di una nave: masse, damping, geometria e propulsori in un oggetto
+# immutabile da passare a PhysicsEngine e alle funzioni di disegno.
+# Le grandezze derivate (inverso di massa e inerzia, posizioni dei
+# propulsori, spinta massima) si calcolano una volta alla creazione e non a
+# ogni passo. Immutabile e confrontabile per valore: si puo' usare come
+# chiave di cache e condividere tra motori e sessioni.
+
+FIELDS = ("name", "length", "width", "mass", "inertia",
+          "damping_surge_forward", "damping_surge_reverse", "damping_sway", "damping_rot",
+          "thruster_x", "thruster_y", "bollard_pull", "max_thrust", "pp_x", "pp_y",
+          "wind_area_front", "wind_area_side")
+
+
+class VesselParams:
+    __slots__ = FIELDS + ("inv_mass", "inv_inertia", "pos_sx", "pos_dx", "coefficients", "wind_coeff_x", "wind_coeff_y", "_hash")
+
+    def __init__(self, name, length, width, mass, inertia,
+                 damping_surge_forward, damping_surge_reverse, damping_sway, damping_rot,
+                 thruster_x, thruster_y, bollard_pull, max_thrust=None, pp_x=DEFAULT_PP_X, pp_y=DEFAULT_PP_Y,
+                 wind_area_front=WIND_AREA_FRONT, wind_area_side=WIND_AREA_SIDE):
+        # bollard_pull: tiro a punto fisso per motore [t]; max_thrust [N]
+        # (default: bollard_pull convertito in Newton); aree del vento [m^2]
+        if max_thrust is None:
+            max_thrust = bollard_pull * 1000 * G_ACCEL
+        values = (name, float(length), float(width), float(mass), float(inertia),
+                  float(damping_surge_forward), float(damping_surge_reverse), float(damping_sway), float(damping_rot),
+                  float(thruster_x), float(thruster_y), float(bollard_pull), float(max_thrust), float(pp_x), float(pp_y),
+                  float(wind_area_front), float(wind_area_side))
+        for field, value in zip(FIELDS, values):
+            object.__setattr__(self, field, value)
+        if self.mass <= 0 or self.inertia <= 0:
+            raise ValueError(f"{name}: massa e inerzia devono essere positive")
+
+        # --- DERIVATI ---
+        object.__setattr__(self, "inv_mass", 1.0 / self.mass)
+        object.__setattr__(self, "inv_inertia", 1.0 / self.inertia)
+        # Propulsori in coordinate nave (x = dritta, y = prua): sinistro, destro
+        object.__setattr__(self, "pos_sx", (-self.thruster_x, self.thruster_y))
+        object.__setattr__(self, "pos_dx", (self.thruster_x, self.thruster_y))
+        # Coefficienti del passo di integrazione in una tupla: un solo accesso
+        # ad attributo per passo invece di sei
+        object.__setattr__(self, "coefficients", (self.damping_surge_forward, self.damping_surge_reverse, self.damping_sway,
+                                                  self.damping_rot, self.inv_mass, self.inv_inertia))
+        # Vento (environment.py): forza = coeff * velocita' relativa * |velocita' relativa|
+        object.__setattr__(self, "wind_coeff_x", 0.5 * AIR_DENSITY * WIND_DRAG_COEFF * self.wind_area_front)
+        object.__setattr__(self, "wind_coeff_y", 0.5 * AIR_DENSITY * WIND_DRAG_COEFF * self.wind_area_side)
+        # Hash calcolato una volta: la nave e' chiave di cache nei percorsi per passo
+        object.__setattr__(self, "_hash", hash(self._values()))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"VesselParams e' immutabile (usare replace per cambiare {name})")
+
+    def __delattr__(self, name):
+        raise AttributeError("VesselParams e' immutabile")
+
+    def _values(self):
+        return tuple(getattr(self, field) for field in FIELDS)
+
+    def __eq__(self, other):
+        if not isinstance(other, VesselParams):
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        # pickle (pool di processi): si ricostruisce dai parametri
+        return (VesselParams, self._values())
+
+    def __repr__(self):
+        return f"VesselParams({self.name!r}, L={self.length:g} m, B={self.width:g} m, {self.mass / 1000:g} t)"
+
+    def replace(self, **changes):
+        # Copia con alcuni parametri cambiati (i derivati vengono ricalcolati)
+        unknown = set(changes) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Parametri sconosciuti: {', '.join(sorted(unknown))} (validi: {', '.join(FIELDS)})")
+        params = dict(zip(FIELDS, self._values()))
+        params.update(changes)
+        return VesselParams(**params)
+
+
+# --- PRESET ---
+# ASD 32m: la taratura di constants.py. Gli altri sono scalati da questa
+# (inerzia ~ m*L^2, damping dalle velocita' massime e dall'area laterale).
+PRESETS = {
+    "ASD 32m": VesselParams(
+        "ASD 32m", SHIP_LENGTH, SHIP_WIDTH, SHIP_MASS, MOMENT_OF_INERTIA,
+        QUADRATIC_DAMPING_SURGE_FORWARD, QUADRATIC_DAMPING_SURGE_REVERSE, QUADRATIC_DAMPING_SWAY, ANGULAR_DAMPING,
+        POS_THRUSTERS_X, POS_THRUSTERS_Y, BOLLARD_PULL_PER_ENGINE, MAX_THRUST, DEFAULT_PP_X, DEFAULT_PP_Y),
+    # Porto: 2 x 30 t, V_max ~12 / 11.5 kt
+    "ASD 24m": VesselParams(
+        "ASD 24m", 24.5, 11.3, 400000.0, 4500000.0,
+        15400.0, 16800.0, 98000.0, 5600000.0,
+        2.6, -9.0, 30.0, pp_y=4.0, wind_area_front=75.0, wind_area_side=130.0),
+    # Altura / terminal: 2 x 45 t, V_max ~13 / 12.2 kt
+    "ASD 40m": VesselParams(
+        "ASD 40m", 40.0, 14.0, 1100000.0, 33000000.0,
+        19700.0, 22400.0, 199000.0, 49000000.0,
+        3.2, -14.8, 45.0, pp_y=6.5, wind_area_front=115.0, wind_area_side=260.0),
+}
+DEFAULT_VESSEL = PRESETS["ASD 32m"]
+
+
+def get_vessel(name):
+    if name not in PRESETS:
+        raise ValueError(f"Nave sconosciuta: {name} (disponibili: {', '.join(PRESETS)})")
+    return PRESETS[name]
@@ -1,12 +1,18 @@
+import functools
+import io
+
 import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib.patches import PathPatch
 from matplotlib.path import Path
 from matplotlib.transforms import Affine2D
 
-def draw_wash(ax, pos, angle_deg, power_pct):
-    # Mostra la scia solo se c'è un minimo di potenza
-    if power_pct < 5: return
+from constants import *
+from vessel import DEFAULT_VESSEL
+
+def wash_vertices(pos, angle_deg, power_pct):
+    # Vertici del poligono di scia, None sotto il 5% di potenza
+    if power_pct < 5: return None
     
     angle_wash_rad = np.radians(angle_deg + 180)
     
@@ -24,12 +30,28 @@ def draw_wash(ax, pos, angle_deg, power_pct):
     p3 = pos + (d_vec * length) - p_vec * (w_end / 2)
     p4 = pos + (d_vec * length) + p_vec * (w_end / 2)
     
-    verts = [p1, p2, p3, p4]
+    return np.array([p1, p2, p3, p4])
+
+def draw_wash(ax, pos, angle_deg, power_pct):
+    # Mostra la scia solo se c'è un minimo di potenza
+    verts = wash_vertices(pos, angle_deg, power_pct)
+    if verts is None: return
     
     # MODIFICA: Colore Ciano (#00FFFF) semi-trasparente (alpha=0.3)
     ax.add_patch(plt.Polygon(verts, facecolor='#00FFFF', alpha=0.3, edgecolor='none', zorder=1.0))
 
-def draw_propeller(ax, pos, angle_deg, color='black', scale=1.0, is_polar=False):
+# --- CACHE DI PROCESSO ---
+# Geometrie e quadranti dipendono solo da azimuth (intero) e colore: sono
+# calcolati una volta per processo e condivisi da tutte le sessioni.
+# Gli array restituiti sono in sola lettura.
+
+def _readonly(*arrays):
+    for a in arrays:
+        a.flags.writeable = False
+    return arrays
+
+@functools.lru_cache(maxsize=1024)
+def _propeller_outline_cached(angle_deg, scale):
     angle_rad = np.radians(angle_deg + 90)
     t = np.linspace(0, 2 * np.pi, 60)
     a = 1.6 * scale
@@ -38,6 +60,14 @@ def draw_propeller(ax, pos, angle_deg, color='black', scale=1.0, is_polar=False)
     c, s = np.cos(-angle_rad), np.sin(-angle_rad)
     x_rot = x_base * c - y_base * s
     y_rot = x_base * s + y_base * c
+    return _readonly(x_rot, y_rot)
+
+def propeller_outline(angle_deg, scale=1.0):
+    # Profilo dell'elica (lemniscata) ruotato secondo l'azimuth, centrato in 0
+    return _propeller_outline_cached(int(round(angle_deg)) % 360, float(scale))
+
+def draw_propeller(ax, pos, angle_deg, color='black', scale=1.0, is_polar=False):
+    x_rot, y_rot = propeller_outline(angle_deg, scale)
     if is_polar:
         theta = np.arctan2(x_rot, y_rot)
         r = np.sqrt(x_rot**2 + y_rot**2)
@@ -61,35 +91,95 @@ def plot_clock(azimuth_deg, color):
     fig.patch.set_alpha(0)
     return fig
 
-def get_hull_path():
-    hw, stern, bow_tip, shoulder = 5.85, -16.25, 16.25, 8.0
+@functools.lru_cache(maxsize=1024)
+def _clock_png_cached(azimuth_deg, color):
+    fig = plot_clock(azimuth_deg, color)
+    buf = io.BytesIO()
+    # stessi parametri di st.pyplot
+    fig.savefig(buf, format='png', bbox_inches='tight', dpi=200)
+    plt.close(fig)
+    return buf.getvalue()
+
+def clock_png(azimuth_deg, color):
+    # Quadrante dell'azimuth gia' renderizzato (PNG), per st.image
+    return _clock_png_cached(int(round(azimuth_deg)) % 360, color)
+
+def plot_capability(theta_deg, force_ton, moment_tm, current=None):
+    # Diagramma polare di capacita' (0° = prua, senso orario come le bussole)
+    fig, ax = plt.subplots(figsize=(5, 5), subplot_kw={'projection': 'polar'})
+    ax.set_theta_zero_location('N')
+    ax.set_theta_direction(-1)
+    theta = np.radians(np.append(theta_deg, theta_deg[0]))
+    r = np.nan_to_num(np.append(force_ton, force_ton[0]))
+    ax.fill(theta, r, color='#1f77b4', alpha=0.25, zorder=2)
+    ax.plot(theta, r, color='#1f77b4', lw=2, zorder=3)
+    if current is not None:
+        # Spinta risultante attuale (direzione nautica, modulo in t)
+        ax.plot([np.radians(current[0])], [current[1]], 'o', color='blue', markeredgecolor='black', zorder=4)
+    ax.set_title(f"Spinta max [t] con momento {moment_tm:.0f} t*m", fontsize=10)
+    ax.grid(True, alpha=0.3)
+    fig.patch.set_alpha(0)
+    return fig
+
+def get_hull_path(vessel=DEFAULT_VESSEL):
+    # Sagoma del 32m scalata sulle dimensioni della nave (per l'ASD 32m i fattori valgono 1)
+    kx, ky = vessel.width / SHIP_WIDTH, vessel.length / SHIP_LENGTH
+    hw, stern, bow_tip, shoulder = vessel.width / 2, -vessel.length / 2, vessel.length / 2, 8.0 * ky
     return [
         (Path.MOVETO, (-hw, stern)), (Path.LINETO, (hw, stern)), (Path.LINETO, (hw, shoulder)),
-        (Path.CURVE4, (hw, 14.0)), (Path.CURVE4, (4.0, bow_tip)), (Path.CURVE4, (0, bow_tip)),     
-        (Path.CURVE4, (-4.0, bow_tip)), (Path.CURVE4, (-hw, 14.0)), (Path.CURVE4, (-hw, shoulder)), 
+        (Path.CURVE4, (hw, 14.0 * ky)), (Path.CURVE4, (4.0 * kx, bow_tip)), (Path.CURVE4, (0, bow_tip)),     
+        (Path.CURVE4, (-4.0 * kx, bow_tip)), (Path.CURVE4, (-hw, 14.0 * ky)), (Path.CURVE4, (-hw, shoulder)), 
         (Path.LINETO, (-hw, stern)), (Path.CLOSEPOLY, (-hw, stern))
     ]
 
-def draw_static_elements(ax, pos_sx, pos_dx):
-    path_data = get_hull_path()
-    codes, verts = zip(*path_data)
-    
+@functools.lru_cache(maxsize=None)
+def hull_path(vessel=DEFAULT_VESSEL):
+    codes, verts = zip(*get_hull_path(vessel))
+    return Path(verts, codes, readonly=True)
+
+@functools.lru_cache(maxsize=None)
+def hull_polygon(vessel=DEFAULT_VESSEL, points_per_curve=12):
+    # Contorno dello scafo (da hull_path) come poligono (n, 2) in sola
+    # lettura: le curve di Bezier vengono campionate. Coordinate nave
+    # (x = dritta, y = prua), senza ripetere il primo punto.
+    pts = []
+    t = np.linspace(0.0, 1.0, points_per_curve)
+    for segment, code in hull_path(vessel).iter_bezier():
+        if segment.degree == 0:
+            pts.append(segment.control_points[0])
+        else:
+            pts.extend(segment.point_at_t(t[1:]))
+    outline = np.array(pts)
+    # niente punti ripetuti (chiusura del path)
+    outline = outline[np.any(np.abs(outline - np.roll(outline, -1, axis=0)) > 1e-9, axis=1)]
+    return _readonly(outline)[0]
+
+@functools.lru_cache(maxsize=None)
+def fender_path(vessel=DEFAULT_VESSEL):
+    # Il fender segue la prua dello scafo (dal mascone in avanti)
+    fender_data = get_hull_path(vessel)[2:9]
+    fender_data[0] = (Path.MOVETO, fender_data[0][1])
+    f_codes, f_verts = zip(*fender_data)
+    return Path(f_verts, f_codes, readonly=True)
+
+def draw_static_elements(ax, pos_sx, pos_dx, vessel=DEFAULT_VESSEL):
     # MODIFICA: facecolor='none' per rendere lo scafo trasparente, solo contorno nero
-    ax.add_patch(PathPatch(Path(verts, codes), facecolor='none', edgecolor='black', lw=2, zorder=5))
+    ax.add_patch(PathPatch(hull_path(vessel), facecolor='none', edgecolor='black', lw=2, zorder=5))
     
-    hw, bow_tip, shoulder = 5.85, 16.25, 8.0
-    fender_data = [(Path.MOVETO, (hw, shoulder)), (Path.CURVE4, (hw, 14.0)), (Path.CURVE4, (4.0, bow_tip)), (Path.CURVE4, (0, bow_tip)), (Path.CURVE4, (-4.0, bow_tip)), (Path.CURVE4, (-hw, 14.0)), (Path.CURVE4, (-hw, shoulder))]
-    f_codes, f_verts = zip(*fender_data)
-    ax.add_patch(PathPatch(Path(f_verts, f_codes), facecolor='none', edgecolor='#111111', lw=6, capstyle='round', zorder=6))
+    ax.add_patch(PathPatch(fender_path(vessel), facecolor='none', edgecolor='#111111', lw=6, capstyle='round', zorder=6))
     
     # Cerchi indicativi posizione thruster
     ax.add_patch(plt.Circle(pos_sx, 2.0, color='black', fill=False, lw=1, ls='--', alpha=0.3, zorder=4))
     ax.add_patch(plt.Circle(pos_dx, 2.0, color='black', fill=False, lw=1, ls='--', alpha=0.3, zorder=4))
 
-def draw_hull_silhouette(ax, x, y, heading_deg, alpha=0.1):
-    path_data = get_hull_path()
-    codes, verts = zip(*path_data)
-    path = Path(verts, codes)
-    t = Affine2D().rotate_deg(-heading_deg).translate(x, y) + ax.transData
-    patch = PathPatch(path, facecolor='blue', alpha=alpha, edgecolor='blue', lw=0.5, transform=t, zorder=0.5)
-    ax.add_patch(patch)
+def hull_silhouettes(poses, vessel=DEFAULT_VESSEL):
+    # Sagome dello scafo in coordinate mondo per k pose [x, y, psi, ...]:
+    # (k, n, 2), da passare tutte insieme a una PolyCollection
+    poses = np.asarray(poses, dtype=float)
+    hull = hull_polygon(vessel)
+    c = np.cos(poses[:, 2:3])
+    s = np.sin(poses[:, 2:3])
+    out = np.empty((len(poses), len(hull), 2))
+    out[..., 0] = poses[:, 0:1] + hull[:, 1] * c + hull[:, 0] * s
+    out[..., 1] = poses[:, 1:2] + hull[:, 1] * s - hull[:, 0] * c
+    return out
@@ -0,0 +1,131 @@
+import functools
+import math
+
+import numpy as np
+
+from constants import *
+from vessel import DEFAULT_VESSEL
+
+# Perdita di spinta per interazione di scia tra i due propulsori.
+# Il getto di un propulsore parte dall'elica in direzione opposta alla spinta
+# e si allarga con la distanza; il propulsore che lo riceve nell'aspirazione
+# perde una frazione di spinta che dipende da:
+#   - scostamento laterale dall'asse del getto (profilo gaussiano)
+#   - distanza lungo il getto (nucleo a velocita' costante, poi ~ 1/s)
+#   - allineamento tra getto e aspirazione del ricevente (massima se il
+#     getto entra lungo l'asse, minima se arriva controcorrente)
+#   - rapporto tra le spinte: velocita' del getto ~ sqrt(spinta), un getto
+#     debole disturba poco un propulsore molto piu' carico
+# La parte geometrica dipende solo dagli azimuth: si calcola una volta per
+# nave su una griglia (a1, a2) a passo di 1 grado, quantizzata su 8 bit
+# (~260 KB per due tabelle), e si legge per interpolazione bilineare. Il
+# fattore di potenza si applica sopra, a parte.
+
+JET_RADIUS = 1.2        # raggio del getto all'elica [m]
+JET_SPREAD = 0.12       # allargamento del raggio per metro percorso
+JET_CORE = 8.0          # lunghezza del nucleo del getto [m]
+WASH_MAX_LOSS = 0.3     # perdita con getto centrato, pieno e allineato
+WASH_MIN_ALIGN = 0.5    # frazione della perdita con getto controcorrente
+
+STEP_DEG = 1.0
+_NODES = int(round(360.0 / STEP_DEG)) + 1    # 360 = 0 incluso, niente casi particolari
+_LEVELS = 255
+_SCALE = WASH_MAX_LOSS / _LEVELS
+
+
+def jet_loss(a_src, a_dst, pos_src, pos_dst):
+    # Perdita geometrica (0..WASH_MAX_LOSS) del propulsore in pos_dst con
+    # azimuth a_dst, investito dal getto del propulsore in pos_src con
+    # azimuth a_src. Angoli in gradi (array), posizioni in coordinate nave.
+    rad_src = np.radians(a_src)
+    jet_x, jet_y = -np.sin(rad_src), -np.cos(rad_src)
+    to_x, to_y = pos_dst[0] - pos_src[0], pos_dst[1] - pos_src[1]
+    along = to_x * jet_x + to_y * jet_y
+    offset = to_x * jet_y - to_y * jet_x
+    s = np.maximum(along, 1e-9)
+    width = JET_RADIUS + JET_SPREAD * s
+    intensity = np.where(along > 0, np.minimum(1.0, JET_CORE / s) * np.exp(-(offset / width) ** 2), 0.0)
+    align = WASH_MIN_ALIGN + (1.0 - WASH_MIN_ALIGN) * 0.5 * (1.0 + np.cos(rad_src - np.radians(a_dst)))
+    return WASH_MAX_LOSS * intensity * align
+
+
+def power_factor(thrust_src, thrust_dst):
+    # Peso della perdita dal rapporto tra le spinte (stesse unita')
+    if thrust_src <= 0.0:
+        return 0.0
+    if thrust_dst <= thrust_src:
+        return 1.0
+    return math.sqrt(thrust_src / thrust_dst)
+
+
+def batch_power_factor(thrust_src, thrust_dst):
+    # Versione vettoriale di power_factor (stesse operazioni)
+    thrust_src, thrust_dst = np.broadcast_arrays(np.asarray(thrust_src, dtype=float), np.asarray(thrust_dst, dtype=float))
+    ratio = np.sqrt(thrust_src / np.where(thrust_dst > thrust_src, thrust_dst, 1.0))
+    return np.where(thrust_src <= 0.0, 0.0, np.where(thrust_dst <= thrust_src, 1.0, ratio))
+
+
+class WashTable:
+    def __init__(self, vessel=DEFAULT_VESSEL):
+        # Tabelle (a1, a2): perdita del sinistro (getto del destro) e del
+        # destro (getto del sinistro), in un unico array (2, nodi, nodi)
+        grid = STEP_DEG * np.arange(_NODES)
+        a1, a2 = np.meshgrid(grid, grid, indexing='ij')
+        loss = np.stack((jet_loss(a2, a1, vessel.pos_dx, vessel.pos_sx),
+                         jet_loss(a1, a2, vessel.pos_sx, vessel.pos_dx)))
+        self.values = np.round(loss / _SCALE).astype(np.uint8)
+        self.values.flags.writeable = False
+        self._flat = self.values.ravel()
+        # Copia in bytes per il percorso scalare: indicizzare bytes da' un int
+        # Python senza passare da NumPy
+        self._bytes = self.values.tobytes()
+
+    def losses(self, a1, a2):
+        # Percorso veloce per un solo set di azimuth: (perdita SX, perdita DX)
+        f1 = (a1 % 360.0) / STEP_DEG
+        f2 = (a2 % 360.0) / STEP_DEG
+        i1 = min(int(f1), _NODES - 2)
+        i2 = min(int(f2), _NODES - 2)
+        w1 = f1 - i1
+        w2 = f2 - i2
+        v1, v2 = 1.0 - w1, 1.0 - w2
+        q = self._bytes
+        b = i1 * _NODES + i2
+        loss_l = ((q[b] * v2 + q[b + 1] * w2) * v1 + (q[b + _NODES] * v2 + q[b + _NODES + 1] * w2) * w1) * _SCALE
+        b += _NODES * _NODES
+        loss_r = ((q[b] * v2 + q[b + 1] * w2) * v1 + (q[b + _NODES] * v2 + q[b + _NODES + 1] * w2) * w1) * _SCALE
+        return loss_l, loss_r
+
+    def batch_losses(self, a1, a2):
+        # Versione vettoriale di losses (stesse operazioni)
+        f1 = (np.asarray(a1, dtype=float) % 360.0) / STEP_DEG
+        f2 = (np.asarray(a2, dtype=float) % 360.0) / STEP_DEG
+        f1, f2 = np.broadcast_arrays(f1, f2)
+        i1 = np.minimum(f1.astype(np.intp), _NODES - 2)
+        i2 = np.minimum(f2.astype(np.intp), _NODES - 2)
+        w1 = f1 - i1
+        w2 = f2 - i2
+        v1, v2 = 1.0 - w1, 1.0 - w2
+        q = self._flat
+        b = i1 * _NODES + i2
+        loss_l = ((q[b] * v2 + q[b + 1] * w2) * v1 + (q[b + _NODES] * v2 + q[b + _NODES + 1] * w2) * w1) * _SCALE
+        b = b + _NODES * _NODES
+        loss_r = ((q[b] * v2 + q[b + 1] * w2) * v1 + (q[b + _NODES] * v2 + q[b + _NODES + 1] * w2) * w1) * _SCALE
+        return loss_l, loss_r
+
+    def efficiencies(self, left_thrust, left_angle, right_thrust, right_angle):
+        # Frazione di spinta che resta a ciascun propulsore (1 = nessuna perdita)
+        loss_l, loss_r = self.losses(left_angle, right_angle)
+        return (1.0 - loss_l * power_factor(right_thrust, left_thrust),
+                1.0 - loss_r * power_factor(left_thrust, right_thrust))
+
+    def batch_efficiencies(self, left_thrust, left_angle, right_thrust, right_angle):
+        loss_l, loss_r = self.batch_losses(left_angle, right_angle)
+        return (1.0 - loss_l * batch_power_factor(right_thrust, left_thrust),
+                1.0 - loss_r * batch_power_factor(left_thrust, right_thrust))
+
+
+@functools.lru_cache(maxsize=None)
+def wash_table(vessel=DEFAULT_VESSEL):
+    # Una tabella per geometria di nave, costruita al primo uso (pochi ms)
+    return WashTable(vessel)